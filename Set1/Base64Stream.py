@@ -0,0 +1,310 @@
+"""
+Streaming, table-driven Base64 encoder, and streaming decoder.
+
+The input is fed in chunks of arbitrary size, and Base64 text
+is returned for every complete 3-byte group seen so far.
+At most two bytes are carried over between calls, so files
+of any size can be encoded in constant memory.
+
+Each 3-byte group (24 bits) is split into two 12-bit halves,
+and each half is looked up in a 4096-entry table holding the
+two corresponding Base64 characters.
+
+The decoder works the same way in reverse, on complete 4-character
+groups (decoded with binascii), carrying at most three characters
+over between calls. Whitespace and line breaks are skipped.
+
+See Wikipedia: https://en.wikipedia.org/wiki/Base64
+"""
+
+# Standard library imports
+import binascii
+
+base64Alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+# Lookup table from 12 bits to two Base64 characters
+base64PairTable = [base64Alphabet[i >> 6] + base64Alphabet[i & 0x3f] for i in range(4096)]
+
+class Base64Encoder:
+    """
+    Incremental Base64 encoder.
+
+    Usage:
+    encoder = Base64Encoder()
+    output = encoder.update(chunk1) + encoder.update(chunk2) + encoder.finalize()
+    """
+
+    def __init__(self):
+        self.carry = b'' # Zero, one or two bytes left over from the previous chunk
+
+    def update(self, data):
+        """
+        Encodes data, returns the Base64 text for all
+        complete 3-byte groups. Leftover bytes are kept
+        until the next call to update() or finalize().
+
+        Input:
+        data [bytes-like]
+
+        Output:
+        base64Text [str]
+        """
+        if self.carry:
+            data = self.carry + bytes(data)
+
+        completeLength = len(data) - len(data) % 3
+
+        self.carry = bytes(data[completeLength:])
+
+        return encodeGroups(memoryview(data)[:completeLength])
+
+    def finalize(self):
+        """
+        Encodes the leftover bytes, adding "=" padding.
+        The encoder can be reused afterwards.
+
+        Output:
+        base64Text [str]
+        """
+        carry = self.carry
+        self.carry = b''
+
+        if len(carry) == 1:
+            return base64PairTable[carry[0] << 4] + "=="
+
+        if len(carry) == 2:
+            value = (carry[0] << 16) | (carry[1] << 8)
+            return base64PairTable[value >> 12] + base64Alphabet[(value >> 6) & 0x3f] + "="
+
+        return ""
+
+def encodeGroups(data):
+    """
+    Encodes data, whose length must be a multiple of three,
+    using the 12-bit lookup table.
+
+    Input:
+    data [bytes-like]
+
+    Output:
+    base64Text [str]
+    """
+    table = base64PairTable
+    byteIterator = iter(data)
+
+    return "".join([table[(a << 4) | (b >> 4)] + table[((b & 0x0f) << 8) | c] for a, b, c in zip(byteIterator, byteIterator, byteIterator)])
+
+def encodeStream(chunks):
+    """
+    Generator which encodes an iterable of byte chunks,
+    yielding Base64 text as it becomes available.
+
+    Input:
+    chunks [iterable of bytes-like]
+
+    Output:
+    base64Text [str], one for each chunk, and a final one containing the padding
+    """
+    encoder = Base64Encoder()
+
+    for chunk in chunks:
+        encodedChunk = encoder.update(chunk)
+        if encodedChunk:
+            yield encodedChunk
+
+    encodedChunk = encoder.finalize()
+    if encodedChunk:
+        yield encodedChunk
+
+def encodeFile(inputFile, outputFile, chunkSize=3*2**16):
+    """
+    Encodes the binary file object inputFile, writing
+    the Base64 text to the text file object outputFile.
+    Only one chunk is held in memory at a time.
+
+    Input:
+    inputFile [binary file object]
+    outputFile [text file object]
+    chunkSize [int]: Number of bytes read at a time
+    """
+    chunks = iter(lambda: inputFile.read(chunkSize), b'')
+
+    for encodedChunk in encodeStream(chunks):
+        outputFile.write(encodedChunk)
+
+class Base64Decoder:
+    """
+    Incremental Base64 decoder.
+
+    Usage:
+    decoder = Base64Decoder()
+    output = decoder.update(text1) + decoder.update(text2) + decoder.finalize()
+    """
+
+    def __init__(self):
+        self.carry = b'' # Zero to three characters left over from the previous chunk
+        self.finished = False # True after the group holding the "=" padding
+
+    def update(self, text):
+        """
+        Decodes the complete 4-character groups of the text
+        seen so far. Raises ValueError (binascii.Error) on
+        characters outside the Base64 alphabet, and on text
+        after the padding.
+
+        Input:
+        text [str or bytes-like]
+
+        Output:
+        data [bytes]
+        """
+        if isinstance(text, str):
+            text = text.encode('ascii')
+
+        text = self.carry + bytes(text).translate(None, b" \t\n\r\v\f")
+        if not text:
+            return b''
+
+        if self.finished:
+            raise binascii.Error("Base64 text after the padding")
+
+        completeLength = len(text) - len(text) % 4
+
+        # Only the last group may hold padding
+        paddingIndex = text.find(b'=')
+        if 0 <= paddingIndex < completeLength:
+            if paddingIndex < completeLength - 4 or completeLength < len(text):
+                raise binascii.Error("Base64 padding before the end of the text")
+            self.finished = True
+
+        self.carry = text[completeLength:]
+
+        return binascii.a2b_base64(text[:completeLength], strict_mode=True)
+
+    def finalize(self):
+        """
+        Checks that no characters are left over, the
+        decoder can be reused afterwards.
+
+        Output:
+        data [bytes]: Always empty
+        """
+        carry = self.carry
+        self.carry = b''
+        self.finished = False
+
+        if carry:
+            raise binascii.Error("Truncated Base64 text: %i characters left over" % len(carry))
+
+        return b''
+
+def decodeStream(chunks):
+    """
+    Generator which decodes an iterable of Base64 text
+    chunks, yielding bytes as they become available.
+
+    Input:
+    chunks [iterable of str or bytes-like]
+
+    Output:
+    data [bytes], one for each chunk giving bytes
+    """
+    decoder = Base64Decoder()
+
+    for chunk in chunks:
+        decodedChunk = decoder.update(chunk)
+        if decodedChunk:
+            yield decodedChunk
+
+    decoder.finalize()
+
+def hexStreamToBytes(hexChunks):
+    """
+    Generator which converts an iterable of hexadecimal
+    text chunks into bytes. Whitespace is ignored, and
+    an odd trailing digit is carried over to the next chunk.
+
+    Input:
+    hexChunks [iterable of str]
+
+    Output:
+    byteChunks [bytes]
+    """
+    carry = ""
+
+    for hexChunk in hexChunks:
+        hexChunk = carry + "".join(hexChunk.split())
+        evenLength = len(hexChunk) - len(hexChunk) % 2
+        carry = hexChunk[evenLength:]
+        yield bytes.fromhex(hexChunk[:evenLength])
+
+    if carry:
+        raise ValueError("Odd number of hexadecimal digits in input")
+
+if __name__ == "__main__":
+
+    """
+    Compare the encoder to the builtin base64 module,
+    both for correctness and speed.
+    """
+
+    import base64
+    import os
+    import time
+
+    # Correctness, for all carry lengths and a range of chunk sizes
+    numSuccesses = 0
+    numTests = 0
+    for length in range(50):
+        data = os.urandom(length)
+        for chunkSize in range(1, 8):
+            chunks = [data[i:i+chunkSize] for i in range(0, len(data), chunkSize)]
+            numTests += 1
+            if "".join(encodeStream(chunks)) == base64.b64encode(data).decode():
+                numSuccesses += 1
+
+    # Decoding, with line breaks, for all chunk sizes
+    for length in range(50):
+        data = os.urandom(length)
+        text = base64.encodebytes(data)
+        for chunkSize in range(1, 8):
+            chunks = [text[i:i+chunkSize] for i in range(0, len(text), chunkSize)]
+            numTests += 1
+            if b"".join(decodeStream(chunks)) == data:
+                numSuccesses += 1
+
+    # Invalid text is rejected
+    for text in ["QUJD!", "QUJ", "QQ==QUJD", "QQ==\nQUJD", "QQ=a"]:
+        numTests += 1
+        try:
+            b"".join(decodeStream([text[:2], text[2:]]))
+        except ValueError:
+            numSuccesses += 1
+
+    if numSuccesses == numTests:
+        print("All", numTests, "tests passed.")
+    else:
+        print(str(numTests - numSuccesses), "failed")
+
+    # Benchmark
+    chunkSize = 3*2**16
+    for size in [2**10, 2**20, 2**24]:
+        data = os.urandom(size)
+
+        startTime = time.perf_counter()
+        encoded = "".join(encodeStream(data[i:i+chunkSize] for i in range(0, size, chunkSize)))
+        encoderTime = time.perf_counter() - startTime
+
+        startTime = time.perf_counter()
+        builtinEncoded = base64.b64encode(data).decode()
+        builtinTime = time.perf_counter() - startTime
+
+        assert encoded == builtinEncoded
+
+        startTime = time.perf_counter()
+        decoded = b"".join(decodeStream(encoded[i:i+4*chunkSize//3] for i in range(0, len(encoded), 4*chunkSize//3)))
+        decoderTime = time.perf_counter() - startTime
+
+        assert decoded == data
+
+        print("%10i bytes: Base64Encoder %8.2f MB/s, base64.b64encode %8.2f MB/s, Base64Decoder %8.2f MB/s" % (size, size / encoderTime / 1e6, size / builtinTime / 1e6, size / decoderTime / 1e6))
@@ -0,0 +1,301 @@
+"""
+Batch conversion of many short hex records.
+
+Instead of converting each record on its own, the records are
+joined and converted in a single call (bytes.fromhex,
+base64.b64encode or bytes.decode), and the result is then
+sliced back into records. When NumPy is available, records
+of equal length can also be returned as a 2-D uint8 array,
+one row per record.
+"""
+
+# Standard library imports
+import base64
+from functools import lru_cache
+
+# Custom imports
+from LazyNumPy import isNumpyArray, loadNumpy
+
+def joinHexRecords(hexRecords):
+    """
+    Joins hex records into one string, and returns it
+    together with the number of hex digits in each record.
+
+    Input:
+    hexRecords [list of str/bytes, or 2-D NumPy array of characters]:
+        Either one hex string per record, or one row
+        of hex digits per record
+
+    Output:
+    hexText [str]
+    recordLengths [list of int]
+    """
+    if isNumpyArray(hexRecords) and hexRecords.ndim == 2:
+        rows = ["".join(row) for row in hexRecords.astype(str).tolist()]
+    else:
+        rows = list(hexRecords)
+        if rows and isinstance(rows[0], (bytes, bytearray)):
+            rows = [record.decode() for record in rows]
+
+    # Surrounding whitespace (e.g. newlines from readlines()) is not counted,
+    # bytes.fromhex() skips it when the joined text is converted
+    return "".join(rows), list(map(len, map(str.strip, rows)))
+
+def splitRecords(data, recordLengths):
+    """
+    Slices data (bytes or str) back into records
+    of the given lengths.
+    """
+    if len(set(recordLengths)) == 1:
+        recordLength = recordLengths[0]
+        if recordLength == 0:
+            return [data[:0]] * len(recordLengths)
+        return [data[i:i+recordLength] for i in range(0, recordLength * len(recordLengths), recordLength)]
+
+    records = []
+    offset = 0
+    for recordLength in recordLengths:
+        records.append(data[offset:offset+recordLength])
+        offset += recordLength
+
+    return records
+
+def hexRecordsToBytes(hexRecords):
+    """
+    Converts a batch of hex records to bytes,
+    with a single call to bytes.fromhex().
+
+    Input:
+    hexRecords [list of str, or 2-D NumPy array of characters]
+
+    Output:
+    byteRecords [list of bytes]
+    """
+    return splitRecords(*hexRecordsToJoinedBytes(hexRecords))
+
+def hexRecordsToJoinedBytes(hexRecords):
+    """
+    Converts a batch of hex records to one bytes object,
+    returned with the number of bytes in each record.
+    """
+    hexText, recordLengths = joinHexRecords(hexRecords)
+
+    if any(recordLength % 2 for recordLength in set(recordLengths)):
+        raise ValueError("Hex records must contain an even number of digits")
+
+    return bytes.fromhex(hexText), [recordLength // 2 for recordLength in recordLengths]
+
+def hexRecordsToArray(hexRecords):
+    """
+    Converts a batch of equal-length hex records to
+    a 2-D NumPy uint8 array with one row per record.
+
+    Input:
+    hexRecords [list of str, or 2-D NumPy array of characters]
+
+    Output:
+    byteMatrix [numpy.ndarray]: Shape (number of records, bytes per record)
+    """
+    numpy = loadNumpy()
+    if numpy is None:
+        raise ImportError("hexRecordsToArray() requires NumPy")
+
+    hexText, recordLengths = joinHexRecords(hexRecords)
+
+    if len(set(recordLengths)) > 1:
+        raise ValueError("Hex records must all have the same length")
+
+    if recordLengths and recordLengths[0] % 2:
+        raise ValueError("Hex records must contain an even number of digits")
+
+    recordLength = recordLengths[0] // 2 if recordLengths else 0
+
+    return numpy.frombuffer(bytes.fromhex(hexText), dtype=numpy.uint8).reshape(len(recordLengths), recordLength)
+
+def recordsToRows(byteRecords):
+    """
+    Returns the records as a list of bytes-like rows,
+    accepting both lists and 2-D NumPy arrays.
+    """
+    if isNumpyArray(byteRecords):
+        numpy = loadNumpy()
+        byteRecords = numpy.ascontiguousarray(byteRecords, dtype=numpy.uint8)
+        return [row.tobytes() for row in byteRecords] if byteRecords.ndim == 2 else [byteRecords.tobytes()]
+
+    return byteRecords
+
+def recordsToLatin1(byteRecords):
+    """
+    Decodes a batch of byte records as latin-1,
+    with a single call to bytes.decode().
+
+    Input:
+    byteRecords [list of bytes, or 2-D NumPy uint8 array]
+
+    Output:
+    latin1Strings [list of str]
+    """
+    if isNumpyArray(byteRecords) and byteRecords.ndim == 2:
+        numRecords, recordLength = byteRecords.shape
+        return splitRecords(loadNumpy().ascontiguousarray(byteRecords).tobytes().decode('latin1'), [recordLength] * numRecords)
+
+    byteRecords = recordsToRows(byteRecords)
+
+    return splitRecords(b''.join(byteRecords).decode('latin1'), [len(record) for record in byteRecords])
+
+def recordsToBase64(byteRecords):
+    """
+    Base64 encodes a batch of byte records,
+    with a single call to base64.b64encode().
+
+    Each record is zero-padded to a multiple of three bytes,
+    so that records do not share Base64 characters. The characters
+    which only encode the zero-padding are then replaced by "=".
+
+    Input:
+    byteRecords [list of bytes, or 2-D NumPy uint8 array]
+
+    Output:
+    base64Strings [list of str]
+    """
+    byteRecords = recordsToRows(byteRecords)
+
+    recordLengths = set(map(len, byteRecords))
+
+    # Records of equal length are padded and joined in a single call
+    if len(recordLengths) == 1:
+        recordLength = recordLengths.pop()
+        paddingLength = -recordLength % 3
+        padding = b'\x00' * paddingLength
+        encodedLength = 4 * ((recordLength + paddingLength) // 3)
+        keptLength = encodedLength - paddingLength
+
+        encodedText = base64.b64encode(padding.join(byteRecords) + padding).decode()
+
+        if paddingLength == 0:
+            return splitRecords(encodedText, [encodedLength] * len(byteRecords))
+
+        return [encodedText[i:i+keptLength] + "=" * paddingLength for i in range(0, len(encodedText), encodedLength)]
+
+    paddedRecords = []
+    encodedLengths = []
+    for record in byteRecords:
+        paddingLength = -len(record) % 3
+        paddedRecords.append(bytes(record) + b'\x00' * paddingLength)
+        encodedLengths.append(4 * ((len(record) + paddingLength) // 3))
+
+    encodedRecords = splitRecords(base64.b64encode(b''.join(paddedRecords)).decode(), encodedLengths)
+
+    for i, record in enumerate(byteRecords):
+        paddingLength = -len(record) % 3
+        if paddingLength:
+            encodedRecords[i] = encodedRecords[i][:-paddingLength] + "=" * paddingLength
+
+    return encodedRecords
+
+def decodeHexRecords(hexRecords, output="bytes"):
+    """
+    Converts a batch of hex records in one pass.
+
+    Input:
+    hexRecords [list of str, or 2-D NumPy array of characters]
+    output [str]: "bytes", "array" (2-D NumPy array), "base64" or "latin1"
+
+    Output:
+    records [list of bytes/str, or numpy.ndarray]
+    """
+    if output == "array":
+        return hexRecordsToArray(hexRecords)
+
+    data, recordLengths = hexRecordsToJoinedBytes(hexRecords)
+
+    if output == "bytes":
+        return splitRecords(data, recordLengths)
+    if output == "base64":
+        # Records made of whole 3-byte groups can be encoded without splitting them first
+        if len(set(recordLengths)) == 1 and recordLengths[0] % 3 == 0:
+            return splitRecords(base64.b64encode(data).decode(), [4 * (recordLength // 3) for recordLength in recordLengths])
+        return recordsToBase64(splitRecords(data, recordLengths))
+    if output == "latin1":
+        return splitRecords(data.decode('latin1'), recordLengths)
+
+    raise ValueError("Unknown output format: " + str(output))
+
+def singleByteXORCandidates(record):
+    """
+    XORs record with each of the 256 possible single-byte
+    keys, returning one candidate record per key (the key
+    is the index). With NumPy, the candidates are computed
+    in one broadcast operation, and returned as a 256 x len(record)
+    uint8 array.
+
+    Input:
+    record [bytes]
+
+    Output:
+    candidates [list of bytes, or numpy.ndarray]
+    """
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        recordArray = numpy.frombuffer(bytes(record), dtype=numpy.uint8)
+        return recordArray[numpy.newaxis, :] ^ numpy.arange(256, dtype=numpy.uint8)[:, numpy.newaxis]
+
+    record = bytes(record)
+
+    return [record.translate(table) for table in xorTranslationTables()]
+
+@lru_cache(maxsize=None)
+def xorTranslationTables():
+    """
+    Returns 256 translation tables for bytes.translate(),
+    where table number key maps each byte b to b XOR key.
+    Built on first use.
+    """
+    return [bytes(b ^ key for b in range(256)) for key in range(256)]
+
+if __name__ == "__main__":
+
+    """
+    Compare the batch conversions to converting the records one by one.
+    """
+
+    import binascii
+    import os
+    import time
+
+    from Challenge1 import hex2base64
+
+    numpy = loadNumpy()
+
+    for recordLength in [1, 2, 3, 30]:
+        byteRecords = [os.urandom(recordLength) for _ in range(100)]
+        hexRecords = [record.hex() for record in byteRecords]
+
+        assert decodeHexRecords(hexRecords) == byteRecords
+        assert decodeHexRecords(hexRecords, "base64") == [hex2base64(hexRecord) for hexRecord in hexRecords]
+        assert decodeHexRecords(hexRecords, "latin1") == [record.decode('latin1') for record in byteRecords]
+        if numpy is not None:
+            assert decodeHexRecords(hexRecords, "array").tobytes() == b''.join(byteRecords)
+            assert recordsToBase64(decodeHexRecords(hexRecords, "array")) == decodeHexRecords(hexRecords, "base64")
+
+    print("All tests passed.")
+
+    # Benchmark: 100000 records of 30 bytes, like the lines in 4.txt
+    hexRecords = [os.urandom(30).hex() for _ in range(100000)]
+
+    startTime = time.perf_counter()
+    for hexRecord in hexRecords:
+        hex2base64(hexRecord)
+    hex2base64Time = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for hexRecord in hexRecords:
+        binascii.b2a_base64(bytes.fromhex(hexRecord), newline=False).decode()
+    binasciiTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    decodeHexRecords(hexRecords, "base64")
+    batchTime = time.perf_counter() - startTime
+
+    print("hex2base64 one by one: %.3f s, binascii one by one: %.3f s, batch: %.3f s" % (hex2base64Time, binasciiTime, batchTime))
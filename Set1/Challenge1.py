@@ -6,10 +6,18 @@ Converting hex to Base64.
 Challenge website: https://cryptopals.com/sets/1/challenges/1
 """
 
+from Base64Stream import Base64Encoder
+
 def hex2base64(number):
     """
     Function which converts an integer in hexadecimal 
     to its Base64 representation.
+
+    Whole bytes are encoded with the table-driven 
+    Base64Encoder. An odd number of hexadecimal digits 
+    is completed with a zero nibble at the end, and the 
+    characters encoding only that nibble are replaced 
+    by the padding of the original bit string.
     
     Arguments:
     number [str]: Hexadecimal number to convert
@@ -18,65 +26,17 @@ def hex2base64(number):
     base64number [str]: Base64 representation of "number"
     """
 
-    # Convert hexadecimal string to binary
-    
-    hexNumber = int(number, 16)
-    
-    binaryNumber = bin(hexNumber)
-
-    binaryNumber = binaryNumber[2:] # Remove the 0b part
-
-    leadingZeros = ""
-
-    # Add leading zeros to binary string, since Python automatically removes them
-    if len(binaryNumber) % 4:
-        for i in range(4 - len(binaryNumber) % 4):
-           leadingZeros = "0" + leadingZeros
-
-    # Add leading zeros to input string, note that four zeros are added to the binary string 
-    # for each hexadecimal zero in the input string
-    if len(number) != len(hex(int(number,16))[2:]):
-        for i in range(len(number) - len(hex(int(number,16))[2:])):
-            leadingZeros = "0000" + leadingZeros
-
-    binaryNumber = leadingZeros + binaryNumber
-
-    # Make the binary to Base64 lookup table (see Wikipedia: https://en.wikipedia.org/wiki/Base64)
-    binary2Base64Dict = {}
-    base64Alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
-
-    base64Number = ""
-
-    # Populate the conversion table (dictionary)
-    for i in range(len(base64Alphabet)):
-        binary2Base64Dict[i] = base64Alphabet[i]
-
-    # Check if length of input binary string is a multiple of 6, used for controlling padding
-    paddingLength = 0
-    if len(binaryNumber) % 6 == 4: # Four bits in last sextet
-        binaryNumber = binaryNumber + "00"
-        paddingLength = 1 # Add one "=" as padding the output
-
-    if len(binaryNumber) % 6 == 2: # Two bits in last sextet
-        binaryNumber = binaryNumber + "0000"
-        paddingLength = 2 # Add two "=" as padding the output
+    oddLength = len(number) % 2
 
+    encoder = Base64Encoder()
+    base64Number = encoder.update(bytes.fromhex(number + "0" * oddLength)) + encoder.finalize()
 
-    # Convert binary to Base64 according to the definition
-
-    # Loop through the binary number, discarding last part if
-    # the length of the binary number is not a multiple of 6.
-    for i in range(0,len(binaryNumber), 6):
-        currentBinaryNumber = binaryNumber[i:i+6]
-        base64Number = base64Number + binary2Base64Dict[int(currentBinaryNumber, 2)]
-
-    # Add the padding to the output, either one or two equals signs.
-
-    if paddingLength == 1:
-        base64Number = base64Number + "="
-    
-    if paddingLength == 2:
-        base64Number = base64Number + "=="
+    if oddLength:
+        # The bit string has 4 * len(number) bits, in sextets padded with zeros
+        numBits = 4 * len(number)
+        numCharacters = -(-numBits // 6)
+        paddingLength = {0: 0, 4: 1, 2: 2}[numBits % 6]
+        base64Number = base64Number[:numCharacters] + "=" * paddingLength
 
     return base64Number
 
@@ -104,6 +64,7 @@ if __name__ == "__main__":
     import random
 
     hexAlphabet = "0123456789abcdef"
+    base64Alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
 
     numStrings = 10
     stringLength = 100
@@ -114,12 +75,20 @@ if __name__ == "__main__":
 
         randomHexString = ""
 
-        for j in range(stringLength):
+        # Odd lengths too, which do not make up whole bytes
+        for j in range(stringLength + i % 2):
             # Generate hexadecimal string
             randomHexString = randomHexString + random.choice(hexAlphabet)
 
-        # Test string against builtin function
-        correctBase64String = base64.b64encode(bytes.fromhex(randomHexString)).decode('utf-8')
+        # Test string against builtin function, for odd lengths
+        # against the padded big integer (see the challenge 2 solution)
+        if len(randomHexString) % 2:
+            numBits = 4 * len(randomHexString)
+            bits = bin(int(randomHexString, 16))[2:].zfill(numBits)
+            bits = bits + "0" * (-numBits % 6)
+            correctBase64String = "".join(base64Alphabet[int(bits[k:k+6], 2)] for k in range(0, len(bits), 6)) + "=" * {0: 0, 4: 1, 2: 2}[numBits % 6]
+        else:
+            correctBase64String = base64.b64encode(bytes.fromhex(randomHexString)).decode('utf-8')
         convertedString = hex2base64(randomHexString)
 
         if correctBase64String == convertedString:
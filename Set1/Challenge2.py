@@ -6,6 +6,8 @@ Fixed XOR.
 Challenge website: https://cryptopals.com/sets/1/challenges/2
 """
 
+from XORKernel import xorBytes
+
 def fixedXOR(hexStr1, hexStr2):
     """
     This function takes two strings represented as hex, 
@@ -19,12 +21,17 @@ def fixedXOR(hexStr1, hexStr2):
     str1xorStr2 [str]: The exclusive OR (XOR) or hexStr1 and hexStr2
     """
 
-    str1xorStr2 = int(hexStr1, 16) ^ int(hexStr2, 16) # Use builtin XOR function
+    if len(hexStr1) != len(hexStr2):
+        raise ValueError("Inputs to fixedXOR must have the same length")
+
+    # An odd number of digits is padded with a leading zero nibble,
+    # which is removed again from the result
+    oddLength = len(hexStr1) % 2
 
-    str1xorStr2 = hex(str1xorStr2)[2:] # Remove '0x' part
+    bytes1 = bytes.fromhex("0" * oddLength + hexStr1)
+    bytes2 = bytes.fromhex("0" * oddLength + hexStr2)
 
-    if len(str1xorStr2) < len(hexStr1): # Since Python removes leading zeros
-        str1xorStr2 = ("0" * (len(hexStr1) - len(str1xorStr2))) + str1xorStr2
+    str1xorStr2 = xorBytes(bytes1, bytes2).hex()[oddLength:]
 
     return str1xorStr2
 
@@ -40,6 +47,9 @@ if __name__ == "__main__":
 
     functionResult = fixedXOR(hexStr1, hexStr2)
 
+    # An odd number of hex digits
+    assert fixedXOR("abc", "123") == "b9f"
+
     if correctResult == functionResult:
         print("The results match.")
     else:
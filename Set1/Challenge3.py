@@ -6,48 +6,35 @@ Single-byte XOR cipher.
 Here we find the single byte key which was 
 used to XOR the provided string. Decision is 
 done using character frequency of the 
-English language.
+English language, computed for all keys at 
+once from the byte histogram of the ciphertext 
+(see HistogramScorer).
 
-Uses the fixedXOR function from challenge 2, 
-where we for the second hex-string repeat each byte 
-so that lengths of input strings to fixedXOR function 
-match.
+The 256 candidate strings are XORed and decoded 
+in one batch, using the BatchCodec module.
 
 Challenge website: https://cryptopals.com/sets/1/challenges/3
 """
 
-from Challenge1 import hex2base64
-from Challenge2 import fixedXOR
+# Standard library imports
+from collections import Counter
+
+# Custom imports
+import LanguageModel
+from BatchCodec import hexRecordsToBytes, recordsToLatin1, singleByteXORCandidates
+from HistogramScorer import rankSingleByteKeys
+from KeyPruning import PruningStats, printableMask
 
 hexEncodedString = "1b37373331363f78151b7f2b783431333d78397828372d363c78373e783a393b3736"
 
 def getEnglishCharacterFrequency():
-    englishCharacterFrequency = {"a": 8.497,
-                             "b": 1.492,
-                             "c": 2.202,
-                             "d": 4.253,
-                             "e": 11.162,
-                             "f": 2.228,
-                             "g": 2.015,
-                             "h": 6.094,
-                             "i": 7.546,
-                             "j": 0.153,
-                             "k": 1.292,
-                             "l": 4.025,
-                             "m": 2.406,
-                             "n": 6.749,
-                             "o": 7.507,
-                             "p": 1.929,
-                             "q": 0.095,
-                             "r": 7.587,
-                             "s": 6.327,
-                             "t": 9.356,
-                             "u": 2.758,
-                             "v": 0.978,
-                             "w": 2.560,
-                             "x": 0.150,
-                             "y": 1.994,
-                             "z": 0.077}
+    """
+    Returns the frequency (in percent) of each letter in 
+    English text, and the same frequencies normalized to 
+    fractions. New dictionaries are returned on each call, 
+    built from the table in the LanguageModel module.
+    """
+    englishCharacterFrequency = {character: frequency for character, frequency in LanguageModel.englishCharacterFrequency.items() if character.isalpha()}
 
     # Normalize character frequencies
     englishCharacterFrequencyNormalized = {}
@@ -56,8 +43,6 @@ def getEnglishCharacterFrequency():
 
     return englishCharacterFrequency, englishCharacterFrequencyNormalized
 
-englishCharacterFrequency, englishCharacterFrequencyNormalized = getEnglishCharacterFrequency()
-
 def computeCharacterFrequency(asciiString):
     """
     Compute character frequency of string 
@@ -65,38 +50,18 @@ def computeCharacterFrequency(asciiString):
 
     Taken from: https://en.wikipedia.org/wiki/Letter_frequency
     """
-    numEnglishChar = 0 # Counts number of English characters
-    numNonEnglishChar = 0 # Counts number of non-English characters
-
-    englishCharacterFrequency, englishCharacterFrequencyNormalized = getEnglishCharacterFrequency()
+    englishCharacters = [character for character in LanguageModel.englishCharacterFrequency if character.isalpha()]
 
-    englishCharacters = list(englishCharacterFrequency.keys())
+    # Count all characters in one pass, case-insensitively
+    characterCounts = Counter(character.lower() for character in asciiString)
 
-    asciiStringCharacterFrequency = englishCharacterFrequency
-    for key in asciiStringCharacterFrequency.keys():
-        asciiStringCharacterFrequency[key] = 0
+    asciiStringRelativeCharacterFrequency = {}
+    numEnglishChar = sum(characterCounts[englishCharacter] for englishCharacter in englishCharacters)
 
     for englishCharacter in englishCharacters:
-
-        for character in asciiString:
-
-            if str(character).isalpha():
-
-                if character.lower() == englishCharacter:
-
-                    asciiStringCharacterFrequency[englishCharacter] += 1
-
-                    numEnglishChar += 1
-
-                else:
-
-                    numNonEnglishChar += 1
-
-    asciiStringRelativeCharacterFrequency = asciiStringCharacterFrequency
-    for key in asciiStringRelativeCharacterFrequency.keys():
+        asciiStringRelativeCharacterFrequency[englishCharacter] = characterCounts[englishCharacter]
         if numEnglishChar > 0:
-            #asciiStringRelativeCharacterFrequency[key] = asciiStringRelativeCharacterFrequency[key] / numEnglishChar
-            asciiStringRelativeCharacterFrequency[key] = asciiStringRelativeCharacterFrequency[key] / len(asciiString)
+            asciiStringRelativeCharacterFrequency[englishCharacter] = characterCounts[englishCharacter] / len(asciiString)
 
     return asciiStringRelativeCharacterFrequency
 
@@ -122,66 +87,34 @@ def compareCharacterFrequencyToEnglish(asciiCharacterFrequency):
 def decodeHexStringToASCII(hexString):
     """
     Iterate through the 256 possible byte values, 
-    generating the candidate input string using 
-    the fixedXOR function
-    """
-
-    # Make a dictionary with the 256 possible byte values as keys, 
-    # while the repeated byte values as values.
-    repeatedBytes = {} # Containing e.g. efefefef...
-    decodedStrings = {} # RepeatedBytes XORed with hexEncodedString
-    base64Strings = {} # Base64 encoded strings from decodedStrings dict
-    asciiStrings = {} # ASCII encoded strings from decodedStrings dict
-
-    numBytesInHexEncodedString = int(len(hexString)/2)
+    generating the candidate input string for each.
 
-    for currentByte in range(256):
-        currentByteHex = hex(currentByte)[2:]
-
-        if len(currentByteHex) == 1:
-            currentByteHex = '0' + currentByteHex
-
-        repeatedBytes[currentByte] = currentByteHex * numBytesInHexEncodedString
-
-        decodedStrings[currentByte] = fixedXOR( repeatedBytes[currentByte], hexString)
+    All 256 candidates are XORed and decoded to latin-1 
+    in one batch (see BatchCodec), instead of one 
+    hex string conversion per candidate.
+    """
 
-        base64Strings[currentByte] = hex2base64(decodedStrings[currentByte])
+    candidates = singleByteXORCandidates(hexRecordsToBytes([hexString])[0])
 
-        asciiStrings[currentByte] = bytearray.fromhex(decodedStrings[currentByte]).decode('latin1')
+    # Dictionary with the 256 possible byte values as keys, 
+    # and the decoded strings as values.
+    asciiStrings = dict(enumerate(recordsToLatin1(candidates)))
 
     return asciiStrings
 
 if __name__ == "__main__":
 
-    asciiStrings = decodeHexStringToASCII(hexEncodedString)
-
-    asciiCharacterFrequency = {}
-    asciiCharacterSquaredDistance = {}
-    asciiCharacterAbsDistance = {}
+    ciphertext = bytes.fromhex(hexEncodedString)
 
-    for key in asciiStrings.keys():
-        asciiCharacterFrequency[key] = computeCharacterFrequency(asciiStrings[key])
-        asciiCharacterSquaredDistance[key], asciiCharacterAbsDistance[key] = compareCharacterFrequencyToEnglish(asciiCharacterFrequency[key])
+    # Discard the keys giving non-printable plaintext, then score the 
+    # rest from the byte histogram of the ciphertext, without 
+    # decrypting with each of them, and keep the ten best
+    stats = PruningStats()
+    ranking = rankSingleByteKeys(ciphertext, k=10, allowedMask=printableMask, stats=stats)
 
-    # Sort character frequency of the tables in ascending order
-    # (from: https://stackoverflow.com/questions/613183/how-do-i-sort-a-dictionary-by-value)
-    asciiCharacterSquaredDistanceSorted = {k: v for k, v in sorted(asciiCharacterSquaredDistance.items(), key=lambda item: item[1])}
-    asciiCharacterAbsDistanceSorted = {k: v for k, v in sorted(asciiCharacterAbsDistance.items(), key=lambda item: item[1])}
+    print(stats.report())
 
     # Print results:
-    print("For squared distance, the ten strings with character distribution closest to English are:")
-    num = 0
-    for key, value in asciiCharacterSquaredDistanceSorted.items():
-        print(asciiStrings[key], "with distance: ", value)
-        num += 1
-        if num == 10:
-            break
-
-    print("\n===================================================================================================\n")
-    print("For absolute value distance, the ten strings with character distribution closest to English are:")
-    num = 0
-    for key, value in asciiCharacterAbsDistanceSorted.items():
-        print(asciiStrings[key], "with distance: ", value)
-        num += 1
-        if num == 10:
-            break
\ No newline at end of file
+    print("The ten strings with character distribution closest to English are:")
+    for key, score in ranking:
+        print(bytes(b ^ key for b in ciphertext).decode('latin1'), "with key", key, "and score: ", score)
\ No newline at end of file
@@ -6,6 +6,18 @@ Detect single-character XOR.
 The file 4.txt contains one 60-character string 
 that has been encrypted with single-character XOR.
 
+The lines are streamed through the detector in 
+Detector.py, which scores each line against all 
+256 keys on a process pool, and only keeps the 
+best candidates across all lines. If the environment
+variable CRYPTOPALS_RESULT_CACHE names a directory,
+the scores of each chunk of lines are cached there
+(see ResultCache), so running this again skips scoring.
+
+With a stop threshold, the detector stops reading
+the file once it has found a line which decrypts
+to confident English.
+
 Challenge website: https://cryptopals.com/sets/1/challenges/4
 """
 
@@ -13,83 +25,36 @@ Challenge website: https://cryptopals.com/sets/1/challenges/4
 import os
 
 # Custom imports
-from Challenge3 import computeCharacterFrequency, compareCharacterFrequencyToEnglish, decodeHexStringToASCII, getEnglishCharacterFrequency
-
-# Ensure correct directory
-filename = "4.txt"
-filepath = os.path.dirname(__file__) + "/" + filename
-
-savefilepath = os.path.dirname(__file__) + "/" + "4sorted.txt"
-
-fileContents = [] # One string in each position in the list
-asciiStrings = [] # Each entry contains a dictionary, with the 256 possible bytes (keys) used for decryption
-
-# Read file
-with open(filepath, "r") as f:
-    fileContents = f.readlines()
-
-for string in fileContents:
-    asciiStrings.append(decodeHexStringToASCII(string.rstrip()))
-
-# asciiStrings is a list, and each list is a dictionary. Each dictionary contains 256 key-value 
-# pairs, one for each possible decoding key (byte).
-
-asciiCharacterFrequencyList = []
-asciiCharacterSquaredDistanceList = []
-asciiCharacterAbsDistanceList = []
-
-asciiStringsCharacterFrequencies = {}
-
-# Compute character frequency of decrypted strings
-num = 0
-for asciiString in asciiStrings:
-
-    asciiCharacterFrequency = {}
-    asciiCharacterSquaredDistance = {}
-    asciiCharacterAbsDistance = {}
-
-    for key in asciiString.keys():
-        asciiCharacterFrequency[key] = computeCharacterFrequency(asciiString[key])
-        asciiCharacterSquaredDistance[key], asciiCharacterAbsDistance[key] = compareCharacterFrequencyToEnglish(asciiCharacterFrequency[key])
-
-    asciiCharacterFrequencyList.append(asciiCharacterFrequency)
-    asciiCharacterSquaredDistanceList.append(asciiCharacterSquaredDistance)
-    asciiCharacterAbsDistanceList.append(asciiCharacterAbsDistance)
+from Detector import calibrateThreshold, detectSingleByteXOR
+from LanguageModel import sampleEnglishText
+from ResultCache import cacheFromEnvironment
 
-    num += 1
+if __name__ == "__main__":
 
-# asciiCharacterSquaredDistanceList is a list of 327 elements (one for each string in 4.txt).
-# Each element in this list is a dictionary, with 256 key-value pairs (one for each possible decoding byte)
+    # Ensure correct directory
+    filename = "4.txt"
+    filepath = os.path.dirname(__file__) + "/" + filename
 
-# For each of the 60 strings, sort character frequency of the tables in ascending order
-# (from: https://stackoverflow.com/questions/613183/how-do-i-sort-a-dictionary-by-value)
+    savefilepath = os.path.dirname(__file__) + "/" + "4sorted.jsonl"
 
-asciiCharacterSquaredDistanceSortedList = []
-asciiCharacterAbsDistanceSortedList = []
+    # Save results (top-5 for each string) in a JSONL file as they are computed,
+    # and keep the five best candidates across all strings
+    with open(filepath, "r") as f, open(savefilepath, mode="w") as output:
+        result = detectSingleByteXOR(f, k=5, perLine=5, output=output, cache=cacheFromEnvironment())
 
-for asciiCharacterSquaredDistance in asciiCharacterSquaredDistanceList:
-    asciiCharacterSquaredDistanceSortedList.append({k: v for k, v in sorted(asciiCharacterSquaredDistance.items(), key=lambda item: item[1])})
-    
-for asciiCharacterAbsDistance in asciiCharacterAbsDistanceList:
-    asciiCharacterAbsDistanceSortedList.append({k: v for k, v in sorted(asciiCharacterAbsDistance.items(), key=lambda item: item[1])})
+    for candidate in result.candidates:
+        print("String", candidate["line"], "byte", candidate["key"], "with score:", candidate["score"], repr(candidate["plaintext"]))
 
-# Now, asciiCharacterSquaredDistanceSortedList is a list of 327 elements (one for each string in 4.txt), and 
-# each element is a dictionary with 256 key-value pairs. These key-value pairs are sorted: the values are sorted 
-# in ascending order.
+    # String 171, byte 53.
 
-# Save results (top-5 for each string) in a text file
-strnum = 1
-with open(savefilepath, mode="w") as f:
-    for asciiCharacterAbsDistanceSorted in asciiCharacterAbsDistanceSortedList:
-        num = 0
-        f.write("\nString: " + str(strnum))
-        for key, value in asciiCharacterAbsDistanceSorted.items():
-            f.write( str(asciiStrings[strnum-1][key]) + "with distance: " + str(value) + "\n" )
-            num += 1
-            if num == 5:
-                break
-        strnum += 1
+    # Stop at 80% of the score per byte of English text: the file is
+    # read in small chunks, and the lines after 171 are never scored
+    stopThreshold = calibrateThreshold(sampleEnglishText())
+    with open(filepath, "r") as f:
+        result = detectSingleByteXOR(f, k=1, processes=1, stopThreshold=stopThreshold)
 
-# String 171, byte 53.
+    assert result.stoppedEarly
+    assert (result.candidates[0]["line"], result.candidates[0]["key"]) == (171, 53)
+    assert result.numLines < 327
 
-pass
\ No newline at end of file
+    print("Early stop: line %i found after reading %i of 327 lines" % (result.candidates[0]["line"], result.numLines))
@@ -20,6 +20,8 @@ Challenge website: https://cryptopals.com/sets/1/challenges/5
 
 import binascii
 
+from XORKernel import xorInto
+
 plaintext = "Burning 'em, if you ain't quick and nimble\nI go crazy when I hear a cymbal"
 
 expectedCiphertext = "0b3637272a2b2e63622c2e69692a23693a2a3c6324202d623d63343c2a26226324272765272a282b2f20430a652e2c652a3124333a653e2b2027630c692b20283165286326302e27282f"
@@ -27,28 +29,37 @@ expectedCiphertext = "0b3637272a2b2e63622c2e69692a23693a2a3c6324202d623d63343c2a
 key = "ICE"
 
 def repeatedKeyXOR(plaintext, key):
+    """
+    Computes the repeated-key XOR of plaintext and key.
+    Strings are encoded as latin-1, so that each 
+    character is one byte.
+
+    Inputs:
+    plaintext [str or bytes]
+    key [str or bytes]
+
+    Returns:
+    ciphertext [bytearray]
+    """
+    if isinstance(plaintext, str):
+        plaintext = plaintext.encode('latin1')
 
-    k = 0
+    if isinstance(key, str):
+        key = key.encode('latin1')
 
-    ciphertext = bytearray()
-    
-    # Compute the XOR character-wise
-    for char in plaintext:
-        hexPlainCharacter = ord(char)
-        hexKeyCharacter = ord(key[k])
-        hexCipherCharacter = hexPlainCharacter ^ hexKeyCharacter
-        ciphertext.append(hexCipherCharacter)
-        k = k + 1
-        if k % len(key) == 0:
-            k = 0
+    ciphertext = bytearray(len(plaintext))
+
+    xorInto(ciphertext, plaintext, key)
 
     return ciphertext
 
-ciphertext = repeatedKeyXOR(plaintext, key)
+if __name__ == "__main__":
+
+    ciphertext = repeatedKeyXOR(plaintext, key)
 
-ciphertextHex = ciphertext.hex()
+    ciphertextHex = ciphertext.hex()
 
-if ciphertextHex == expectedCiphertext:
-    print("Expected hex-string and XOR-ed hex-string match.")
-else:
-    print("Expected hex-string and XOR-ed hex-string DO NOT match.")
\ No newline at end of file
+    if ciphertextHex == expectedCiphertext:
+        print("Expected hex-string and XOR-ed hex-string match.")
+    else:
+        print("Expected hex-string and XOR-ed hex-string DO NOT match.")
\ No newline at end of file
@@ -11,6 +11,13 @@ Challenge website: https://cryptopals.com/sets/1/challenges/6
 # Standard library imports
 import base64
 import os
+from functools import lru_cache
+
+# Custom imports
+from Hamming import hammingDistance
+from KeyPruning import PruningStats
+from LanguageModel import englishModel
+from XORKernel import xorInto
 
 # Function for computing edit distance (Hamming distance):
 # how many bits are different in the two input strings.
@@ -20,6 +27,7 @@ def editDistance(bitstring1, bitstring2):
     It is defined as the number of bit positions where the two 
     bitstrings differ. This is equal to the number of bit positions 
     where the XOR of the two bitstrings is 1.
+    The bits are counted by the fastest backend in Hamming.
 
     Inputs:
     bitstring1 [bytes]
@@ -28,11 +36,7 @@ def editDistance(bitstring1, bitstring2):
     Returns:
     distance [int]
     """
-    distance = 0
-    for b in range(len(bitstring1)):
-        distance = distance + bin(bitstring1[b] ^ bitstring2[b])[2:].count('1')
-
-    return distance
+    return hammingDistance(bitstring1, bitstring2)
 
 def repeatedKeyXOR(ciphertext, key):
     """
@@ -49,196 +53,93 @@ def repeatedKeyXOR(ciphertext, key):
     plaintext [bytes]
     """
 
-    k = 0
-
-    plaintext = bytearray()
+    plaintext = bytearray(len(ciphertext))
 
-    # Compute the XOR byte-wise
-    
-    k = 0
-    for i in range(len(ciphertext)):
-        plainCharacter = ciphertext[i] ^ key[k]
-        plaintext.append(plainCharacter)
-        k += 1
-        if k % len(key) == 0:
-            k = 0
+    xorInto(plaintext, ciphertext, key)
     
     return plaintext
 
-def compareToEnglish(decodedStrings):
+def compareToEnglish(decodedStrings, model=None):
     """
     This function computes the score of the input string.
-    For each character in the input string, we do a lookup 
-    in a dictionary to see if the character is in the English alphabet.
-    If it is, the score of the character is added to the total score.
-    Each character has a score, based on the relative frequency 
-    of that character in English text.
+    Each byte of the input string has a score given by the 
+    language model, and the score of the string is the total.
+    With the default English model, the score of a character 
+    is its relative frequency in English text (0 for 
+    characters which are not letters or space).
 
     Input:
     decodedStrings [byte]
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
 
     Returns:
-    score [int]
+    score [float]
     """
-    englishCharacterFrequency = {"a": 8.497,
-                             "b": 1.492,
-                             "c": 2.202,
-                             "d": 4.253,
-                             "e": 11.162,
-                             "f": 2.228,
-                             "g": 2.015,
-                             "h": 6.094,
-                             "i": 7.546,
-                             "j": 0.153,
-                             "k": 1.292,
-                             "l": 4.025,
-                             "m": 2.406,
-                             "n": 6.749,
-                             "o": 7.507,
-                             "p": 1.929,
-                             "q": 0.095,
-                             "r": 7.587,
-                             "s": 6.327,
-                             "t": 9.356,
-                             "u": 2.758,
-                             "v": 0.978,
-                             "w": 2.560,
-                             "x": 0.150,
-                             "y": 1.994,
-                             "z": 0.077,
-                             " ": 17.100} # From: http://www.fitaly.com/board/domper3/posts/136.html and Wikipedia
-
-    # Compute score of the input text
-    score = 0
-    for decodedString in decodedStrings.lower():
-        score += englishCharacterFrequency.get(chr(decodedString), 0)
-
-    return score
+    if model is None:
+        model = englishModel()
+
+    return model.scoreBytes(decodedStrings)
 
 # Keysize possibilities
 keysizes = list(range(2,41))
 
-# Ensure correct directory and open file
-filename = "6.txt"
-filepath = os.path.dirname(__file__) + "/" + filename
-
-with open(filepath) as f:
-    base64string = f.read()
-
-# Convery Base64 file input to binary string
-byteString = base64.b64decode(base64string)
-
-"""
-Iterate over the possible keysizes given, where in each 
-iteration, the ciphertext is split into blocks of length
-equal to the current keysize. 
-
-For each pair of blocks, compute the edit distance between them.
-Do this for all consecutive blocks and average it.
-This is done to find the most likely keysize, because that 
-keysize will (statistically) give the smallest distance
-between blocks.
-"""
-
-avgDistances = {}
-
-for keysize in keysizes:
-
-    distances = []
-
-    # Break the ciphertext into blocks of size keysize
-    blocks = []
-    for i in range(0,len(byteString), keysize):
-        blocks.append(byteString[i:i+keysize])
-
-    for i in range(len(blocks)-1):
-        try:
-            distances.append(editDistance(blocks[i], blocks[i+1])/keysize)
-        except:
-            pass
-
-    avgDistances[keysize] = sum(distances)/len(distances)
-
-# Find minimum distance
-avgDistancesSorted = sorted(avgDistances.items(), key=lambda item: item[1])
-minIndex = avgDistancesSorted[0][0]
-
-"""
-Make a list with the 256 possible single byte XOR keys
-These are used as building blocks for the repeating-key XOR
-"""
-possibleKeys = []
-for currentByte in range(256):
-    currentByteHex = hex(currentByte)[2:]
-
-    if len(currentByteHex) == 1:
-        currentByteHex = '0' + currentByteHex
-
-    possibleKeys.append(int(currentByteHex,16))
-
-"""
-For each possible key of length keysize, compute the repeated-key 
-XOR with the ciphertext, and compute the score of the decoded plaintext.
-The plaintext with highest score most resembles English.
-The corresponding key will be the decoding key.
-"""
-
-substrings = {} # Dict, where key is the block-index (1st, 2nd, 3rd etc.) 
-                # of original ciphertext, and value is the actual substring
-
-for i in range(0,minIndex):
-
-    substrings[i] = bytearray()
-
-for i in range(0,len(byteString)):
-
-    substrings[i % minIndex].append(byteString[i])
-
-decodedStrings = dict()
-characterScore = dict()
+@lru_cache(maxsize=1)
+def loadCiphertext(filename="6.txt"):
+    """
+    Reads and Base64 decodes the ciphertext file,
+    on first use.
+    """
+    # Ensure correct directory and open file
+    filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
 
-for i in range(0, minIndex):
+    with open(filepath) as f:
+        base64string = f.read()
 
-    decodedStrings[i] = dict()
-    characterScore[i] = dict()
+    # Convery Base64 file input to binary string
+    return base64.b64decode(base64string)
 
-    for key in possibleKeys:
-        decodedStrings[i][key] = bytearray()
-        characterScore[i][key] = bytearray()
-        
-        # XOR the transposed blocks with each of the possible 256 byte keys
-        for j in range(len(substrings[i])):
-            decodedStrings[i][key].append(substrings[i][j] ^ key)
+if __name__ == "__main__":
 
-        characterScore[i][key] = compareToEnglish(decodedStrings[i][key])
+    from RepeatingKeyCracker import crackRepeatingKeyXOR
+    from ResultCache import cacheFromEnvironment
 
-characterScoreSorted = list()
+    byteString = loadCiphertext()
 
-# Sort character frequency of the tables in ascending order
-# (from: https://stackoverflow.com/questions/613183/how-do-i-sort-a-dictionary-by-value)
-for i in range(minIndex):
-    characterScoreSorted.append({k: v for k, v in sorted(characterScore[i].items(), key=lambda item: item[1], reverse=True)})
+    """
+    Find the most likely keysizes: the ciphertext is split into blocks
+    of each keysize, and the normalized edit distance between all pairs
+    of blocks at the start of the ciphertext is computed (see
+    KeysizeEstimator). The right keysize will (statistically) give
+    the smallest distance between blocks.
+
+    For each of the 3 most likely keysizes, transpose the ciphertext
+    into keysize columns, each of which is XORed with a single byte of
+    the key. For each column, score the possible single byte keys; the
+    key giving the plaintext which most resembles English will be that
+    byte of the decoding key. Only printable ASCII characters are
+    considered as key bytes (since we are asked to compare character
+    score to English), and keys giving non-printable plaintext are
+    discarded before scoring. The columns are solved in parallel
+    (see RepeatingKeyCracker).
+
+    The decoding key is the one, among the 3 keysizes, whose
+    whole plaintext most resembles English.
+
+    If the environment variable CRYPTOPALS_RESULT_CACHE names a
+    directory, the result is cached there (see ResultCache), so
+    running this again only decrypts with the stored key.
+    """
 
-"""
-Construct the possible decoding keys, based on the smallest distances.
-If there are two or more bytes which have the same distance, make two (or more) decoding keys 
-based on those bytes.
-"""
+    stats = PruningStats()
 
-decodingKey = bytearray()
+    result = crackRepeatingKeyXOR(byteString, keysizes, topN=3, stats=stats, cache=cacheFromEnvironment())
+    decodingKey = result.key
 
-for charScore in characterScoreSorted:
-    # Assume only printable ASCII characters
-    # (Since we are asked to compare character 
-    # score to English.)
-    for character in list(charScore.items()):
-        if character[0] >= 32 and character[0] <= 126:
-            decodingKey.append(character[0])
-            break
+    print(stats.report())
 
-# Decode the ciphertext
-plaintext = repeatedKeyXOR(byteString, decodingKey)
+    # Decode the ciphertext
+    plaintext = repeatedKeyXOR(byteString, decodingKey)
 
-# And print key and decoded plaintext
-print("Key:", decodingKey.decode('latin-1'))
-print("Decoded text:", plaintext.decode('latin-1'))
\ No newline at end of file
+    # And print key and decoded plaintext
+    print("Key:", decodingKey.decode('latin-1'))
+    print("Decoded text:", plaintext.decode('latin-1'))
@@ -11,36 +11,45 @@ Challenge website: https://cryptopals.com/sets/1/challenges/7
 # Standard library imports
 import base64
 import os
+from functools import lru_cache
 
-# Third party imports
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+# Custom imports
+from CipherContext import checkBlocks, ecbDecryptor
 
 # Functions
 def aesDecrypt(ciphertext, key):
+    """
+    Decrypts a ciphertext (a whole number of blocks)
+    in AES-ECB mode with the key key. The decryptor of
+    each key is built once and reused (see CipherContext).
+    """
+    checkBlocks(ciphertext)
 
-    cipher = Cipher(algorithm=algorithms.AES(key), mode=modes.ECB(), backend=default_backend())
-
-    decryptor = cipher.decryptor()
-
-    decryptedPlaintext = decryptor.update(ciphertext) + decryptor.finalize()
+    decryptedPlaintext = ecbDecryptor(key).update(ciphertext)
 
     return decryptedPlaintext
 
-# Ensure correct directory and open file
-filename = "7.txt"
-filepath = os.path.dirname(__file__) + "/" + filename
+@lru_cache(maxsize=1)
+def loadCiphertext(filename="7.txt"):
+    """
+    Reads and Base64 decodes the ciphertext file,
+    on first use.
+    """
+    # Ensure correct directory and open file
+    filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
 
-with open(filepath) as f:
-    ciphertextBase64 = f.read()
+    with open(filepath) as f:
+        ciphertextBase64 = f.read()
 
-# Convery Base64 file input to binary string
-ciphertext = base64.b64decode(ciphertextBase64)
+    # Convery Base64 file input to binary string
+    return base64.b64decode(ciphertextBase64)
 
 key = b'YELLOW SUBMARINE'
 
-# Decrypt the ciphertext with the given key
-decryptedPlaintext = aesDecrypt(ciphertext, key)
+if __name__ == "__main__":
+
+    # Decrypt the ciphertext with the given key
+    decryptedPlaintext = aesDecrypt(loadCiphertext(), key)
 
-# Prints results
-print(decryptedPlaintext.decode())
\ No newline at end of file
+    # Prints results
+    print(decryptedPlaintext.decode())
\ No newline at end of file
@@ -0,0 +1,241 @@
+"""
+Cache of AES-ECB encryptor and decryptor contexts, per key.
+
+Building a Cipher and its encryptor or decryptor expands the key
+and allocates a backend context, which costs far more than
+encrypting one 16 byte block with it. In ECB mode a context keeps
+no state between whole blocks, so one context per key can be reused
+for any number of update() calls, as long as every call is given
+a multiple of the block size (finalize() is never called).
+
+The contexts are kept in a least recently used cache of maxsize
+keys. They are not thread safe, so every thread has its own cache,
+which is dropped when the thread ends (e.g. when a thread pool is
+shut down), so short-lived threads do not pile up contexts.
+Note that the cached contexts hold the expanded keys in memory
+until they are evicted or clear() is called.
+
+Usage:
+ciphertextBlock = ecbEncryptor(key).update(plaintextBlock)
+print(defaultCache.cacheInfo())
+"""
+
+# Standard library imports
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+
+# Third party imports
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+# AES block size in bytes
+blockSize = 16
+
+# Default number of keys kept per thread
+defaultMaxSize = 64
+
+# Statistics of a cache, summed over the live threads (as functools.lru_cache)
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class CipherContextCache:
+    """
+    Per-thread LRU cache of ECB contexts, keyed by
+    (key, direction).
+
+    Attributes:
+    maxsize [int]: Number of contexts kept per thread
+    """
+
+    def __init__(self, maxsize=defaultMaxSize):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+
+        self.maxsize = maxsize
+        self.local = threading.local()
+
+        # The state of every live thread, for cacheInfo() and clear().
+        # Keyed by the thread object, so the state of a thread is
+        # dropped with it
+        self.lock = threading.Lock()
+        self.states = weakref.WeakKeyDictionary()
+
+    def state(self):
+        """
+        Returns the cache and counters of the current thread.
+        """
+        try:
+            return self.local.state
+        except AttributeError:
+            state = self.local.state = {"contexts": OrderedDict(), "hits": 0, "misses": 0}
+            with self.lock:
+                self.states[threading.current_thread()] = state
+            return state
+
+    def context(self, key, direction):
+        """
+        Returns the cached context for key, creating it on a miss.
+
+        Inputs:
+        key [bytes-like]: AES key (16, 24 or 32 bytes)
+        direction [str]: "encrypt" or "decrypt"
+
+        Output:
+        context [CipherContext]
+        """
+        state = self.state()
+        contexts = state["contexts"]
+        cacheKey = (bytes(key), direction)
+
+        context = contexts.get(cacheKey)
+        if context is not None:
+            contexts.move_to_end(cacheKey)
+            state["hits"] += 1
+            return context
+
+        cipher = Cipher(algorithm=algorithms.AES(cacheKey[0]), mode=modes.ECB(), backend=default_backend())
+
+        if direction == "encrypt":
+            context = cipher.encryptor()
+        elif direction == "decrypt":
+            context = cipher.decryptor()
+        else:
+            raise ValueError("Unknown direction: %s" % direction)
+
+        state["misses"] += 1
+        contexts[cacheKey] = context
+        if len(contexts) > self.maxsize:
+            contexts.popitem(last=False)
+
+        return context
+
+    def encryptor(self, key):
+        return self.context(key, "encrypt")
+
+    def decryptor(self, key):
+        return self.context(key, "decrypt")
+
+    def cacheInfo(self):
+        """
+        Returns the hits, misses and size, summed over the live
+        threads (the counts of threads which ended are dropped).
+        """
+        with self.lock:
+            states = list(self.states.values())
+
+        return CacheInfo(sum(state["hits"] for state in states),
+                         sum(state["misses"] for state in states),
+                         self.maxsize,
+                         sum(len(state["contexts"]) for state in states))
+
+    def clear(self):
+        """
+        Drops the contexts of all threads and resets the counters.
+        """
+        with self.lock:
+            for state in self.states.values():
+                state["contexts"].clear()
+                state["hits"] = 0
+                state["misses"] = 0
+
+# Cache used by the AES helpers in both sets
+defaultCache = CipherContextCache()
+
+def checkBlocks(data):
+    """
+    Raises ValueError if data is not a whole number of blocks,
+    which a reused context would otherwise buffer.
+    """
+    if len(data) % blockSize:
+        raise ValueError("The length of the provided data is not a multiple of the block length.")
+
+def ecbEncryptor(key):
+    """
+    Returns the cached AES-ECB encryptor for key.
+    Only give its update() whole blocks.
+    """
+    return defaultCache.context(key, "encrypt")
+
+def ecbDecryptor(key):
+    """
+    Returns the cached AES-ECB decryptor for key.
+    Only give its update() whole blocks.
+    """
+    return defaultCache.context(key, "decrypt")
+
+if __name__ == "__main__":
+
+    """
+    Compare to a new context per call, check the LRU and
+    the threads, and time one block with and without the cache.
+    """
+
+    import gc
+    import os
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    def freshEncrypt(data, key):
+        encryptor = Cipher(algorithm=algorithms.AES(key), mode=modes.ECB(), backend=default_backend()).encryptor()
+        return encryptor.update(data) + encryptor.finalize()
+
+    for keyLength in [16, 24, 32]:
+        key = os.urandom(keyLength)
+        for numBlocks in [0, 1, 3]:
+            data = os.urandom(numBlocks * blockSize)
+            ciphertext = ecbEncryptor(key).update(data)
+            assert ciphertext == freshEncrypt(data, key)
+            assert ecbDecryptor(key).update(ciphertext) == data
+
+    try:
+        checkBlocks(b"YELLOW")
+        raise AssertionError("Partial block accepted")
+    except ValueError:
+        pass
+
+    cache = CipherContextCache(maxsize=2)
+    keys = [os.urandom(16) for _ in range(3)]
+    for key in keys + [keys[2], keys[0]]:
+        cache.encryptor(key)
+    assert cache.cacheInfo() == CacheInfo(hits=1, misses=4, maxsize=2, currsize=2)
+
+    # Each thread gets its own contexts
+    def encryptMany(key):
+        blocks = [os.urandom(blockSize) for _ in range(1000)]
+        return all(cache.encryptor(key).update(block) == freshEncrypt(block, key) for block in blocks)
+
+    cache.clear()
+    with ThreadPoolExecutor(4) as executor:
+        assert all(executor.map(encryptMany, [keys[0]] * 8))
+    assert cache.cacheInfo().hits == 8000 - cache.cacheInfo().misses
+    assert cache.cacheInfo().misses <= 4
+
+    # The contexts of the threads of finished pools are dropped
+    def encryptFew(key):
+        return cache.encryptor(key).update(bytes(blockSize))
+
+    for _ in range(50):
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(encryptFew, keys * 4))
+    gc.collect()
+    assert cache.cacheInfo().currsize <= 5 * cache.maxsize # The last pool's 4 threads, and this one
+
+    print("All tests passed.")
+
+    key = os.urandom(16)
+    block = os.urandom(blockSize)
+    numBlocks = 100000
+
+    startTime = time.perf_counter()
+    for _ in range(numBlocks):
+        freshEncrypt(block, key)
+    freshTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    for _ in range(numBlocks):
+        ecbEncryptor(key).update(block)
+    cachedTime = time.perf_counter() - startTime
+
+    print("New context per block:    %6.3f us per block" % (1e6 * freshTime / numBlocks))
+    print("Cached context per block: %6.3f us per block (%.1fx)" % (1e6 * cachedTime / numBlocks, freshTime / cachedTime))
+    print(defaultCache.cacheInfo())
@@ -0,0 +1,473 @@
+"""
+Streaming detector for single-byte XOR encrypted lines.
+
+Reads hex-encoded lines from a file (or stdin) one chunk at a time,
+scores each line against all 256 single-byte keys (see HistogramScorer),
+and keeps only a bounded top-k of the most English-like (line, key)
+candidates across the whole input. Chunks of lines are spread over
+a process pool, with a bounded number of chunks in flight, so the
+memory use does not grow with the size of the input.
+
+The best key(s) of every line can also be written incrementally
+to a JSONL file, one JSON record per candidate.
+
+Scores are divided by the line length (score per byte), so that
+lines of different lengths can be compared.
+
+For files where all lines have the same length, a columnar mode
+scores the whole file with a few NumPy array operations.
+
+With a result cache (see ResultCache), the candidates of each chunk
+of lines are stored on disk, keyed by the lines, the model and the
+parameters, so chunks which were scored before are not scored again.
+
+Usage:
+python Detector.py 4.txt -k 5 -o results.jsonl
+cat *.log | python Detector.py - -j 8
+python Detector.py 4.txt --columnar
+python Detector.py big.txt --stop-threshold 5 --stop-margin 2
+python Detector.py 4.txt --benchmark
+python Detector.py 4.txt --cache-dir ~/.cache/cryptopals/results
+"""
+
+# Standard library imports
+import json
+import os
+import sys
+from collections import namedtuple
+from functools import partial
+
+# Custom imports
+from HistogramScorer import rankSingleByteKeys, weightTable, xorIndexTable
+from LanguageModel import UnigramModel, englishModel
+from LazyNumPy import loadNumpy
+from Ranking import TopK, topK
+from WorkerPool import mapChunks
+from XORKernel import xorBytes
+
+# Result of a detection run:
+# candidates [list of dicts]: The global top-k, best first
+# numLines [int]: Number of lines read
+# numInvalid [int]: Number of lines which were not valid hex
+# numScored [int]: Number of lines which were scored, not counting blank and invalid lines or those skipped by an early stop
+# stoppedEarly [bool]: True if detection stopped because a candidate was confidently found
+DetectionResult = namedtuple("DetectionResult", ["candidates", "numLines", "numInvalid", "numScored", "stoppedEarly"])
+
+# Default number of lines per chunk. The stop condition is checked after
+# each chunk, so smaller chunks are used when one is set
+defaultChunkSize = 1000
+stopChunkSize = 16
+
+def iterateChunks(lines, chunkSize):
+    """
+    Generator which groups lines into lists of
+    (line number, line) pairs, chunkSize lines at a time.
+    Line numbers start at 1.
+    """
+    chunk = []
+    for lineNumber, line in enumerate(lines, 1):
+        chunk.append((lineNumber, line))
+        if len(chunk) == chunkSize:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+def scoreChunk(chunk, model=None, perLine=1, allowedMask=None):
+    """
+    Scores each line in chunk against the 256 single-byte keys.
+    Runs in the worker processes.
+
+    Inputs:
+    chunk [list of (int, str) pairs]: Line numbers and hex-encoded lines
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    perLine [int]: Number of candidate keys kept for each line
+    allowedMask [int]: Optional mask of allowed plaintext bytes (see KeyPruning)
+
+    Output:
+    candidates [list of dicts]: The best candidates of each line, with the
+        line number, key, score per byte and decrypted plaintext (latin-1)
+    numInvalid [int]: Number of lines which were not valid hex
+    numScored [int]: Number of lines which were scored (not blank or invalid)
+    """
+    candidates = []
+    numInvalid = 0
+    numScored = 0
+
+    for lineNumber, line in chunk:
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode('latin1')
+
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            ciphertext = bytes.fromhex(line)
+        except ValueError:
+            numInvalid += 1
+            continue
+
+        numScored += 1
+        for key, score in rankSingleByteKeys(ciphertext, model, k=perLine, allowedMask=allowedMask):
+            candidates.append({"line": lineNumber,
+                               "key": key,
+                               "score": score / len(ciphertext),
+                               "plaintext": xorBytes(ciphertext, bytes([key])).decode('latin1')})
+
+    return candidates, numInvalid, numScored
+
+def keyedCall(function, item):
+    """
+    Applies function to the chunk of a (cache key, chunk) pair,
+    and returns the key with the result.
+    """
+    cacheKey, chunk = item
+
+    return cacheKey, function(chunk)
+
+def mapChunksCached(function, chunks, cache, algorithm, fingerprint, params=None, processes=None):
+    """
+    mapChunks() which looks up the result of each chunk in the
+    cache first, and only sends the chunks which are not cached
+    to the pool. Cached results are yielded as soon as they are
+    found, and new results are stored as they arrive. The results
+    must be JSON serializable, and come back from the cache as lists
+    where they were tuples.
+
+    Inputs:
+    function [callable]
+    chunks [iterable of lists of (int, str/bytes) pairs]
+    cache [ResultCache.ResultCache]
+    algorithm [str]: Name of the algorithm, part of the cache key
+    fingerprint [str]: Fingerprint of the language model
+    params [dict]: Parameters of the run, part of the cache key
+    processes [int]: As in mapChunks()
+    """
+    def keyedChunks():
+        for chunk in chunks:
+            lines = [(lineNumber, line.decode('latin1') if isinstance(line, (bytes, bytearray)) else line) for lineNumber, line in chunk]
+            yield cache.key(json.dumps(lines).encode(), algorithm, params), chunk
+
+    def lookup(item):
+        # No key is returned with a cached result, so it is not stored again
+        result = cache.get(fingerprint, item[0])
+        return (None, result) if result is not None else None
+
+    results = mapChunks(partial(keyedCall, function), keyedChunks(), processes, lookup=lookup)
+    try:
+        for cacheKey, result in results:
+            if cacheKey is not None:
+                cache.put(fingerprint, cacheKey, result)
+            yield result
+    finally:
+        results.close()
+
+def calibrateThreshold(sampleText, model=None, fraction=0.8):
+    """
+    Returns a stop threshold (score per byte) for detectSingleByteXOR(),
+    as a fraction of the score per byte of a sample of known plaintext.
+
+    Inputs:
+    sampleText [bytes]: Plaintext typical of what is searched for
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    fraction [float]
+
+    Output:
+    threshold [float]
+    """
+    if model is None:
+        model = englishModel()
+
+    return fraction * model.scoreBytes(sampleText) / len(sampleText)
+
+def detectSingleByteXOR(lines, k=5, perLine=1, processes=None, chunkSize=None, model=None, allowedMask=None, output=None, stopThreshold=None, stopMargin=None, cache=None):
+    """
+    Finds the k (line, key) candidates which decrypt
+    to the most English-like plaintext.
+
+    If stopThreshold and/or stopMargin are given, detection stops
+    as soon as the best candidate is confident: its score per byte
+    is at least stopThreshold, and it beats the best candidate of
+    any other line by at least stopMargin. The rest of the input
+    is then not read, and chunks which have not been scored yet
+    are cancelled.
+
+    Inputs:
+    lines [iterable of str/bytes]: Hex-encoded lines, e.g. an open file
+    k [int]: Number of candidates kept across all lines
+    perLine [int]: Number of candidates considered (and written) for each line
+    processes [int]: Size of the process pool (default: number of CPUs, 1 runs in-process)
+    chunkSize [int]: Number of lines sent to a worker at a time
+                     (default: defaultChunkSize, or stopChunkSize if a stop condition is set)
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    allowedMask [int]: Optional mask of allowed plaintext bytes (see KeyPruning)
+    output [text file object]: If given, every line's candidates are written as JSONL
+    stopThreshold [float]: Minimum score per byte of a confident candidate (see calibrateThreshold())
+    stopMargin [float]: Minimum lead in score per byte over the best other line
+    cache [ResultCache.ResultCache]: If given, the results of each chunk are looked up and stored
+
+    Output:
+    result [DetectionResult]
+    """
+    best = TopK(k)
+    numLines = 0
+    numInvalid = 0
+    numScored = 0
+
+    stopEnabled = stopThreshold is not None or stopMargin is not None
+    if chunkSize is None:
+        chunkSize = stopChunkSize if stopEnabled else defaultChunkSize
+    bestScore = None # Best score, its line and the best score of any other line
+    bestLine = None
+    runnerUpScore = None
+
+    def countLines(lines):
+        nonlocal numLines
+        for line in lines:
+            numLines += 1
+            yield line
+
+    scoreFunction = partial(scoreChunk, model=model, perLine=perLine, allowedMask=allowedMask)
+
+    chunks = iterateChunks(countLines(lines), chunkSize)
+
+    if cache is not None:
+        fingerprint = (model if model is not None else englishModel()).fingerprint()
+        params = {"perLine": perLine, "allowedMask": allowedMask}
+        results = mapChunksCached(scoreFunction, chunks, cache, "singleByteXOR", fingerprint, params, processes)
+    else:
+        results = mapChunks(scoreFunction, chunks, processes)
+
+    stoppedEarly = False
+    for candidates, chunkInvalid, chunkScored in results:
+        numInvalid += chunkInvalid
+        numScored += chunkScored
+
+        for candidate in candidates:
+            best.push(candidate["score"], candidate)
+            if output is not None:
+                output.write(json.dumps(candidate) + "\n")
+
+            if bestScore is None or candidate["score"] > bestScore:
+                if bestLine is not None and bestLine != candidate["line"]:
+                    runnerUpScore = bestScore
+                bestScore, bestLine = candidate["score"], candidate["line"]
+            elif candidate["line"] != bestLine and (runnerUpScore is None or candidate["score"] > runnerUpScore):
+                runnerUpScore = candidate["score"]
+
+        if stopEnabled and bestScore is not None \
+                and (stopThreshold is None or bestScore >= stopThreshold) \
+                and (stopMargin is None or (runnerUpScore is not None and bestScore - runnerUpScore >= stopMargin)):
+            stoppedEarly = True
+            break
+
+    # Cancels the chunks which have not been scored
+    results.close()
+
+    return DetectionResult([candidate for _, candidate in best.items()], numLines, numInvalid, numScored, stoppedEarly)
+
+def detectSingleByteXORColumnar(lines, k=5, model=None, allowedMask=None):
+    """
+    Columnar version of detectSingleByteXOR(), using NumPy. The lines
+    are grouped by length, and each group is loaded into one 2-D uint8
+    matrix: the byte histograms of all its rows are computed with a
+    single bincount, and all rows are scored against all 256 keys with
+    one matrix multiplication by the weight table of the model. This
+    is fastest for files where every line has the same length.
+
+    Blank lines are skipped and lines which are not valid hex are
+    counted as invalid, as in detectSingleByteXOR(). Falls back to
+    detectSingleByteXOR() without NumPy, or when the model is not
+    a sum of per-byte weights.
+
+    Inputs:
+    lines [iterable of str/bytes]: Hex-encoded lines
+    k [int]: Number of candidates kept across all lines
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    allowedMask [int]: Optional mask of allowed plaintext bytes (see KeyPruning)
+
+    Output:
+    result [DetectionResult]
+    """
+    if model is None:
+        model = englishModel()
+
+    lines = list(lines)
+    numpy = loadNumpy()
+
+    if numpy is None or not isinstance(model, UnigramModel):
+        return detectSingleByteXOR(lines, k, perLine=k, processes=1, model=model, allowedMask=allowedMask)
+
+    # Line numbers and decoded rows, by row length
+    groups = {}
+    numInvalid = 0
+
+    for lineNumber, line in enumerate(lines, 1):
+        if isinstance(line, (bytes, bytearray)):
+            line = line.decode('latin1')
+
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            ciphertext = bytes.fromhex(line)
+        except ValueError:
+            numInvalid += 1
+            continue
+
+        lineNumbers, rows = groups.setdefault(len(ciphertext), ([], []))
+        lineNumbers.append(lineNumber)
+        rows.append(ciphertext)
+
+    weights = weightTable(model.tableTuple).T
+
+    if allowedMask is not None:
+        forbidden = numpy.array([not allowedMask >> b & 1 for b in range(256)], dtype=numpy.int64)
+        forbiddenTable = forbidden[xorIndexTable()].T
+
+    best = TopK(k)
+    for rowLength, (lineNumbers, rows) in groups.items():
+        numRows = len(rows)
+        matrix = numpy.frombuffer(b"".join(rows), dtype=numpy.uint8).reshape(numRows, rowLength)
+
+        # Byte histogram of every row: offset each row's bytes by 256 * row index
+        rowOffsets = numpy.arange(numRows, dtype=numpy.int64)[:, numpy.newaxis] * 256
+        histograms = numpy.bincount((rowOffsets + matrix).ravel(), minlength=numRows * 256).reshape(numRows, 256)
+
+        # scores[row, key] = sum over c of histograms[row, c] * weights[c ^ key]
+        scores = (histograms @ weights) / rowLength
+
+        if allowedMask is not None:
+            # A key is pruned if any byte in the row decrypts to a forbidden byte
+            forbiddenCounts = (histograms > 0).astype(numpy.int64) @ forbiddenTable
+            scores[forbiddenCounts > 0] = -numpy.inf
+
+        for index, score in topK(scores.ravel(), k):
+            if score == -numpy.inf:
+                break
+            row, key = divmod(index, 256)
+            best.push(score, {"line": lineNumbers[row],
+                              "key": key,
+                              "score": score,
+                              "plaintext": xorBytes(rows[row], bytes([key])).decode('latin1')})
+
+    numScored = sum(len(lineNumbers) for lineNumbers, _ in groups.values())
+
+    return DetectionResult([candidate for _, candidate in best.items()], len(lines), numInvalid, numScored, False)
+
+def benchmark(filepath, processes=1):
+    """
+    Times detection on the file with the pipeline Challenge4 used
+    before (decrypt with every key, then count character frequencies
+    with the functions from Challenge3), the streaming detector,
+    and the columnar detector.
+    """
+    import time
+
+    from Challenge3 import compareCharacterFrequencyToEnglish, computeCharacterFrequency, decodeHexStringToASCII
+
+    with open(filepath) as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    startTime = time.perf_counter()
+    bestDistance = None
+    for lineNumber, line in enumerate(lines, 1):
+        for key, asciiString in decodeHexStringToASCII(line).items():
+            squaredDistance, absDistance = compareCharacterFrequencyToEnglish(computeCharacterFrequency(asciiString))
+            if bestDistance is None or absDistance < bestDistance[0]:
+                bestDistance = (absDistance, lineNumber, key)
+    print("Challenge3 functions: %8.3f s, best line %i, key %i" % (time.perf_counter() - startTime, bestDistance[1], bestDistance[2]))
+
+    startTime = time.perf_counter()
+    best = detectSingleByteXOR(lines, k=1, processes=processes).candidates[0]
+    print("Streaming detector:   %8.3f s, best line %i, key %i" % (time.perf_counter() - startTime, best["line"], best["key"]))
+
+    startTime = time.perf_counter()
+    best = detectSingleByteXORColumnar(lines, k=1).candidates[0]
+    print("Columnar detector:    %8.3f s, best line %i, key %i" % (time.perf_counter() - startTime, best["line"], best["key"]))
+
+def main(arguments=None):
+    """
+    Command-line entry point.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Detect single-byte XOR encrypted lines in a file of hex-encoded lines.")
+    parser.add_argument("input", help="File of hex-encoded lines, or - for stdin")
+    parser.add_argument("-o", "--output", help="Write the best candidates of every line to this JSONL file")
+    parser.add_argument("-k", type=int, default=5, help="Number of candidates to report (default: 5)")
+    parser.add_argument("--per-line", type=int, default=1, help="Number of candidates kept for each line (default: 1)")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Number of lines per work unit (default: %i, or %i with a stop condition)" % (defaultChunkSize, stopChunkSize))
+    parser.add_argument("--printable", action="store_true", help="Discard keys giving non-printable plaintext before scoring")
+    parser.add_argument("--columnar", action="store_true", help="Load all lines (of equal length) into one NumPy matrix and score them at once")
+    parser.add_argument("--benchmark", action="store_true", help="Time the detectors on the input file, compared to the Challenge3 functions")
+    parser.add_argument("--stop-threshold", type=float, default=None, help="Stop when the best score per byte reaches this value")
+    parser.add_argument("--stop-margin", type=float, default=None, help="Stop when the best line leads all other lines by this score per byte")
+    parser.add_argument("--cache-dir", default=None, help="Store and reuse the results of each chunk of lines in this directory")
+    parser.add_argument("--calibrate", metavar="SAMPLE", default=None, help="Set the stop threshold to 80%% of the score per byte of this plaintext sample file")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.columnar:
+        # The columnar detector scores the whole input at once
+        ignored = [option for option, value in [("-o", arguments.output),
+                                                ("--cache-dir", arguments.cache_dir),
+                                                ("--stop-threshold", arguments.stop_threshold),
+                                                ("--stop-margin", arguments.stop_margin),
+                                                ("--calibrate", arguments.calibrate)] if value is not None]
+        if ignored:
+            parser.error("--columnar cannot be combined with %s" % ", ".join(ignored))
+
+    if arguments.benchmark:
+        benchmark(arguments.input, arguments.processes)
+        return
+
+    allowedMask = None
+    if arguments.printable:
+        from KeyPruning import printableMask
+        allowedMask = printableMask
+
+    stopThreshold = arguments.stop_threshold
+    if arguments.calibrate:
+        with open(arguments.calibrate, "rb") as f:
+            stopThreshold = calibrateThreshold(f.read())
+
+    cache = None
+    if arguments.cache_dir:
+        from ResultCache import ResultCache
+        cache = ResultCache(arguments.cache_dir)
+
+    # The input is read in binary mode, so the number of bytes read can be reported
+    inputFile = sys.stdin.buffer if arguments.input == "-" else open(arguments.input, "rb")
+    outputFile = open(arguments.output, "w") if arguments.output else None
+
+    try:
+        if arguments.columnar:
+            result = detectSingleByteXORColumnar(inputFile, arguments.k, allowedMask=allowedMask)
+        else:
+            result = detectSingleByteXOR(inputFile, arguments.k, arguments.per_line, arguments.processes, arguments.chunk_size, allowedMask=allowedMask, output=outputFile, stopThreshold=stopThreshold, stopMargin=arguments.stop_margin, cache=cache)
+
+        bytesRead = inputFile.tell() if inputFile.seekable() else None
+        totalBytes = os.fstat(inputFile.fileno()).st_size if inputFile.seekable() else None
+    finally:
+        if inputFile is not sys.stdin.buffer:
+            inputFile.close()
+        if outputFile is not None:
+            outputFile.close()
+
+    for candidate in result.candidates:
+        print(json.dumps(candidate))
+
+    print("Scored %i of %i lines read (%i invalid)" % (result.numScored, result.numLines, result.numInvalid), file=sys.stderr)
+
+    if result.stoppedEarly:
+        if totalBytes:
+            print("Stopped early: skipped %.1f%% of the input (%i of %i bytes never read)" % (100 * (totalBytes - bytesRead) / totalBytes, totalBytes - bytesRead, totalBytes), file=sys.stderr)
+        else:
+            print("Stopped early: the rest of the input was not read", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Hamming distance (number of differing bits) between byte strings.
+
+Three backends, all computing the same distances:
+- "table": XOR the buffers, map each byte to its popcount with
+  bytes.translate() and a 256-entry table, and sum() the result
+- "bitcount": XOR the buffers as big integers and count the set
+  bits with int.bit_count() (or bin().count('1') before Python 3.10)
+- "numpy": XOR as uint8 arrays and sum a popcount lookup
+  (only if NumPy is installed)
+
+hammingDistances() computes the distances between many pairs of
+equal-length blocks in one call. The fastest backend on the current
+machine is picked by a short microbenchmark, the first time
+it is needed (see fastestBackend()).
+"""
+
+# Standard library imports
+import os
+import time
+from functools import lru_cache
+
+# Custom imports
+from LazyNumPy import isNumpyArray, loadNumpy, numpyAvailable
+from XORKernel import xorBytes
+
+# Number of set bits in each byte
+popcountTable = bytes(bin(b).count('1') for b in range(256))
+
+@lru_cache(maxsize=None)
+def popcountArray():
+    """
+    Returns popcountTable as a NumPy array. Built on first use.
+    """
+    numpy = loadNumpy()
+
+    return numpy.frombuffer(popcountTable, dtype=numpy.uint8)
+
+if hasattr(int, "bit_count"):
+    def popcount(x):
+        return x.bit_count()
+else:
+    def popcount(x):
+        return bin(x).count('1')
+
+def checkLengths(bitstring1, bitstring2):
+    """
+    Raises ValueError unless the two buffers have the same length.
+    """
+    if len(bitstring1) != len(bitstring2):
+        raise ValueError("Buffers have different lengths: %i and %i" % (len(bitstring1), len(bitstring2)))
+
+def hammingTable(bitstring1, bitstring2):
+    """
+    Hamming distance with a popcount translation table.
+    """
+    checkLengths(bitstring1, bitstring2)
+
+    if len(bitstring1) == 0:
+        return 0
+
+    return sum(xorBytes(bitstring1, bitstring2).translate(popcountTable))
+
+def hammingBitCount(bitstring1, bitstring2):
+    """
+    Hamming distance with a big integer XOR and a bit count.
+    """
+    checkLengths(bitstring1, bitstring2)
+
+    return popcount(int.from_bytes(bitstring1, 'little') ^ int.from_bytes(bitstring2, 'little'))
+
+def hammingNumPy(bitstring1, bitstring2):
+    """
+    Hamming distance with NumPy.
+    """
+    checkLengths(bitstring1, bitstring2)
+
+    numpy = loadNumpy()
+    array1 = numpy.frombuffer(bitstring1, dtype=numpy.uint8)
+    array2 = numpy.frombuffer(bitstring2, dtype=numpy.uint8)
+
+    return int(popcountArray()[array1 ^ array2].sum(dtype=numpy.int64))
+
+def batchTable(blocks1, blocks2):
+    """
+    hammingDistances() with the popcount table: all pairs are
+    XORed and translated as one buffer, then summed per block.
+    """
+    blockLength = len(blocks1[0])
+    counts = xorBytes(b"".join(blocks1), b"".join(blocks2)).translate(popcountTable)
+
+    return [sum(counts[start:start+blockLength]) for start in range(0, len(counts), blockLength)]
+
+def batchBitCount(blocks1, blocks2):
+    """
+    hammingDistances() with a big integer XOR per pair.
+    """
+    return [popcount(int.from_bytes(block1, 'little') ^ int.from_bytes(block2, 'little')) for block1, block2 in zip(blocks1, blocks2)]
+
+def batchNumPy(blocks1, blocks2):
+    """
+    hammingDistances() with NumPy: the pairs are rows
+    of two 2-D arrays, and each row is summed.
+    """
+    array1 = blocksToArray(blocks1)
+    array2 = blocksToArray(blocks2)
+
+    return popcountArray()[array1 ^ array2].sum(axis=1, dtype=loadNumpy().int64)
+
+def blocksToArray(blocks):
+    """
+    Returns the blocks as a 2-D uint8 array, one block per row.
+    """
+    if isNumpyArray(blocks):
+        return blocks
+
+    numpy = loadNumpy()
+    blockLength = len(blocks[0])
+
+    return numpy.frombuffer(b"".join(blocks), dtype=numpy.uint8).reshape(-1, blockLength)
+
+# name: (single pair function, batch function)
+backends = {
+    "table": (hammingTable, batchTable),
+    "bitcount": (hammingBitCount, batchBitCount),
+}
+
+if numpyAvailable():
+    backends["numpy"] = (hammingNumPy, batchNumPy)
+
+def hammingDistance(bitstring1, bitstring2, backend=None):
+    """
+    Computes the Hamming distance between two bitstrings:
+    the number of bit positions where they differ.
+
+    Inputs:
+    bitstring1 [bytes-like]
+    bitstring2 [bytes-like]: Same length as bitstring1
+    backend [str]: Name of the backend (default: fastest on this machine)
+
+    Output:
+    distance [int]
+    """
+    if backend is None:
+        backend = fastestBackend()
+
+    return backends[backend][0](bitstring1, bitstring2)
+
+def hammingDistances(blocks1, blocks2, backend=None):
+    """
+    Computes the Hamming distances between many pairs of
+    blocks in one call: blocks1[i] against blocks2[i].
+
+    Inputs:
+    blocks1 [list of bytes, or 2-D numpy.ndarray]: Blocks of equal length
+    blocks2 [list of bytes, or 2-D numpy.ndarray]: Same shape as blocks1
+    backend [str]: Name of the backend (default: fastest on this machine)
+
+    Output:
+    distances [list of ints, or numpy.ndarray]
+    """
+    if len(blocks1) != len(blocks2):
+        raise ValueError("Different numbers of blocks: %i and %i" % (len(blocks1), len(blocks2)))
+
+    if len(blocks1) == 0:
+        return []
+
+    blockLength = len(blocks1[0])
+    if isNumpyArray(blocks1) and isNumpyArray(blocks2):
+        if blocks1.shape != blocks2.shape:
+            raise ValueError("Blocks have different lengths")
+    else:
+        for block in list(blocks1) + list(blocks2):
+            if len(block) != blockLength:
+                raise ValueError("Blocks have different lengths")
+
+    if blockLength == 0:
+        return [0] * len(blocks1)
+
+    if backend is None:
+        backend = fastestBackend()
+
+    if backend != "numpy" and isNumpyArray(blocks1):
+        blocks1 = [row.tobytes() for row in blocks1]
+        blocks2 = [row.tobytes() for row in blocks2]
+
+    return backends[backend][1](blocks1, blocks2)
+
+def benchmarkBackends(blockLength=40, numBlocks=2000, repeats=3):
+    """
+    Times each backend on a batch of random block pairs.
+
+    Inputs:
+    blockLength [int]
+    numBlocks [int]
+    repeats [int]: The best of this many runs is kept
+
+    Output:
+    times [dict]: Backend name to seconds per batch
+    """
+    blocks1 = [os.urandom(blockLength) for _ in range(numBlocks)]
+    blocks2 = [os.urandom(blockLength) for _ in range(numBlocks)]
+
+    times = {}
+    for name, (_, batchFunction) in backends.items():
+        bestTime = float("inf")
+        for _ in range(repeats):
+            startTime = time.perf_counter()
+            batchFunction(blocks1, blocks2)
+            bestTime = min(bestTime, time.perf_counter() - startTime)
+        times[name] = bestTime
+
+    return times
+
+@lru_cache(maxsize=1)
+def fastestBackend():
+    """
+    Returns the name of the fastest backend on this machine.
+    The microbenchmark runs once (a few milliseconds), on the first call.
+    """
+    times = benchmarkBackends()
+
+    return min(times, key=times.get)
+
+if __name__ == "__main__":
+
+    """
+    Compare the backends to the bit-by-bit definition,
+    and print the microbenchmark.
+    """
+
+    def referenceDistance(bitstring1, bitstring2):
+        return sum(bin(a ^ b).count('1') for a, b in zip(bitstring1, bitstring2))
+
+    # Example from the challenge
+    for name in backends:
+        assert hammingDistance(b"this is a test", b"wokka wokka!!!", backend=name) == 37
+
+    for length in [0, 1, 7, 40, 1000]:
+        blocks1 = [os.urandom(length) for _ in range(20)]
+        blocks2 = [os.urandom(length) for _ in range(20)]
+        expected = [referenceDistance(a, b) for a, b in zip(blocks1, blocks2)]
+
+        for name in backends:
+            assert [hammingDistance(a, b, backend=name) for a, b in zip(blocks1, blocks2)] == expected
+            if length > 0:
+                assert list(hammingDistances(blocks1, blocks2, backend=name)) == expected
+
+    for name in backends:
+        try:
+            hammingDistance(b"abc", b"ab", backend=name)
+            assert False
+        except ValueError:
+            pass
+
+    print("All tests passed.")
+
+    for blockLength in [4, 40, 4000]:
+        times = benchmarkBackends(blockLength, numBlocks=max(10, 80000 // blockLength))
+        print("Block length %4i: " % blockLength + ", ".join("%s %.2f ms" % (name, 1000 * t) for name, t in sorted(times.items(), key=lambda item: item[1])))
+
+    print("Fastest backend:", fastestBackend())
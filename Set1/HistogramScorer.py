@@ -0,0 +1,234 @@
+"""
+Scoring of all 256 single-byte XOR keys from one byte histogram.
+
+XORing a ciphertext with the key k maps each byte c to c ^ k,
+so the byte histogram of the decrypted text is a permutation of
+the byte histogram of the ciphertext. A score which is a sum of
+per-byte weights can therefore be computed for every key without
+decrypting anything:
+
+score[k] = sum over c of histogram[c] * weights[c ^ k]
+
+The weights are arranged in a 256 x 256 table, where row k
+holds weights[c ^ k] for c = 0, ..., 255. The total cost is
+O(n) for the histogram plus O(256 * 256) for the scores.
+
+The data can be any buffer, including non-contiguous views such
+as the columns of a transposed ciphertext (memoryview or NumPy
+slices with a step), which are read in place without a copy.
+"""
+
+# Standard library imports
+from collections import Counter
+from functools import lru_cache
+
+# Custom imports
+from KeyPruning import pruneSingleByteKeys
+from LazyNumPy import isNumpyArray, loadNumpy
+from Ranking import topK
+
+# Number of bytes counted at a time by byteHistogram()
+histogramChunkSize = 2**16
+
+@lru_cache(maxsize=None)
+def xorIndexTable():
+    """
+    Returns the 256 x 256 NumPy array with c ^ k
+    in row k, column c. Built on first use.
+    """
+    numpy = loadNumpy()
+    indices = numpy.arange(256)
+
+    return indices[:, numpy.newaxis] ^ indices[numpy.newaxis, :]
+
+@lru_cache(maxsize=16)
+def weightTable(weights):
+    """
+    Builds the 256 x 256 table with weights[c ^ k] in
+    row k, column c. Cached, so it is only built once
+    for each set of weights.
+
+    Input:
+    weights [tuple of 256 floats]
+
+    Output:
+    table [numpy.ndarray, or list of 256 lists]
+    """
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        return numpy.asarray(weights, dtype=numpy.float64)[xorIndexTable()]
+
+    return [[weights[c ^ k] for c in range(256)] for k in range(256)]
+
+def byteArray(data):
+    """
+    Returns data as a 1-D uint8 NumPy array, without copying.
+    Non-contiguous buffers (e.g. memoryview(data)[i::step])
+    give a strided array over the same memory.
+
+    Input:
+    data [bytes-like, memoryview or numpy.ndarray]
+
+    Output:
+    array [numpy.ndarray]
+    """
+    if isNumpyArray(data):
+        return data
+
+    numpy = loadNumpy()
+    view = memoryview(data)
+    if view.contiguous:
+        return numpy.frombuffer(view, dtype=numpy.uint8)
+
+    return numpy.asarray(view)
+
+def byteHistogram(data):
+    """
+    Counts how many times each byte value occurs in data.
+
+    Input:
+    data [bytes-like, memoryview or numpy.ndarray]: May be non-contiguous
+
+    Output:
+    histogram [list of 256 ints, or numpy.ndarray]
+    """
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        array = byteArray(data)
+
+        # numpy.bincount converts its input to 64-bit integers,
+        # so large inputs are counted a slice at a time
+        histogram = numpy.zeros(256, dtype=numpy.int64)
+        for start in range(0, len(array), histogramChunkSize):
+            histogram += numpy.bincount(array[start:start+histogramChunkSize], minlength=256)
+
+        return histogram
+
+    histogram = [0] * 256
+    for byte, count in Counter(data).items():
+        histogram[byte] = count
+
+    return histogram
+
+def scoreSingleByteKeys(histogram, weights, keys=None):
+    """
+    Computes the score of each of the 256 single-byte keys,
+    from the byte histogram of the ciphertext.
+
+    Inputs:
+    histogram [list of 256 ints, or numpy.ndarray]
+    weights [tuple of 256 floats]
+    keys [iterable of ints]: Only these keys need a score (default: all 256)
+
+    Output:
+    scores [list of 256 floats]: Score of key k at index k,
+        keys which were not scored get -inf
+    """
+    table = weightTable(weights)
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        histogram = numpy.asarray(histogram, dtype=numpy.float64)
+
+        if keys is None:
+            return (table @ histogram).tolist()
+
+        # Only the rows of the remaining keys are multiplied
+        keys = numpy.fromiter(keys, dtype=numpy.intp)
+        scores = numpy.full(256, float('-inf'))
+        scores[keys] = table[keys] @ histogram
+
+        return scores.tolist()
+
+    # Only bytes occurring in the ciphertext contribute to the score
+    occurringBytes = [(c, count) for c, count in enumerate(histogram) if count]
+
+    if keys is None:
+        return [sum(count * row[c] for c, count in occurringBytes) for row in table]
+
+    scores = [float('-inf')] * 256
+    for k in keys:
+        row = table[k]
+        scores[k] = sum(count * row[c] for c, count in occurringBytes)
+
+    return scores
+
+def rankSingleByteKeys(data, model=None, k=None, keys=None, allowedMask=None, stats=None):
+    """
+    Ranks the 256 single-byte keys for decrypting
+    data, from highest score (most English-like)
+    to lowest. Ties keep the lowest key first.
+
+    Inputs:
+    data [bytes-like, memoryview or numpy.ndarray]: Ciphertext, may be non-contiguous
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    k [int]: Only return the k best keys, without sorting the rest (default: all)
+    keys [iterable of ints]: Only rank these keys (default: all 256)
+    allowedMask [int]: If given, first discard the keys giving plaintext
+        bytes outside this 256-bit mask (see KeyPruning)
+    stats [KeyPruning.PruningStats]: If given, counts the pruned keys
+
+    Output:
+    ranking [list of (key, score) tuples]
+    """
+    if model is None:
+        from LanguageModel import englishModel
+        model = englishModel()
+
+    if allowedMask is not None:
+        keys, numPruned = pruneSingleByteKeys(data, allowedMask, keys)
+        if stats is not None:
+            stats.add(len(keys) + numPruned, numPruned)
+        if not keys:
+            return []
+
+    scores = model.scoreSingleByteKeys(data, keys)
+
+    if k is None and keys is None:
+        return sorted(enumerate(scores), key=lambda item: item[1], reverse=True)
+
+    return topK(scores, 256 if k is None else k, keys=keys)
+
+if __name__ == "__main__":
+
+    """
+    Compare the histogram scores to decrypting with each key and scoring
+    the plaintext directly, and time both.
+    """
+
+    import time
+
+    def scorePlaintext(plaintext, weights):
+        return sum(weights[b] for b in plaintext)
+
+    from LanguageModel import englishModel
+
+    weights = englishModel().table
+    ciphertext = bytes(b ^ 0x58 for b in b"Cooking MC's like a pound of bacon" * 100)
+
+    startTime = time.perf_counter()
+    directScores = [scorePlaintext(bytes(b ^ key for b in ciphertext), weights) for key in range(256)]
+    directTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    ranking = rankSingleByteKeys(ciphertext)
+    histogramTime = time.perf_counter() - startTime
+
+    assert all(abs(score - directScores[key]) < 1e-6 * max(1.0, directScores[key]) for key, score in ranking)
+    assert ranking[0][0] == 0x58
+
+    # A subset of the keys gets the same scores, the others -inf
+    someKeys = [0x58, 1, 200]
+    someScores = scoreSingleByteKeys(byteHistogram(ciphertext), englishModel().tableTuple, someKeys)
+    assert all(abs(someScores[key] - directScores[key]) < 1e-6 * max(1.0, directScores[key]) for key in someKeys)
+    assert all(score == float('-inf') for key, score in enumerate(someScores) if key not in someKeys)
+
+    # Strided views give the same ranking as a copy of the column
+    column = memoryview(ciphertext)[1::3]
+    assert rankSingleByteKeys(column) == rankSingleByteKeys(bytes(column))
+    assert rankSingleByteKeys(column, k=3, allowedMask=0xff << 32) == rankSingleByteKeys(bytes(column), k=3, allowedMask=0xff << 32)
+
+    print("All tests passed.")
+    print("Decrypt and score each key: %.4f s, histogram scorer: %.4f s" % (directTime, histogramTime))
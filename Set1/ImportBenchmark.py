@@ -0,0 +1,93 @@
+"""
+Checks that the modules can be imported without side effects,
+and measures how long each import takes.
+
+Each module is imported in a fresh interpreter, which must not
+print anything (no challenge runs at import time). The import
+time is the best of a few runs, and includes the modules it
+imports in turn. It must stay within a budget, which NumPy
+(about 100 ms) does not fit in, so NumPy has to be imported
+lazily (see LazyNumPy).
+
+Usage:
+python ImportBenchmark.py
+python ImportBenchmark.py --budget 5 Set1 Challenge5
+"""
+
+# Standard library imports
+import os
+import subprocess
+import sys
+
+directory = os.path.dirname(os.path.abspath(__file__))
+
+# Default import time budget per module, in milliseconds
+defaultBudget = 50.0
+
+# The package itself, and all its modules
+defaultModules = ["Set1"] + sorted(filename[:-3] for filename in os.listdir(directory) if filename.endswith(".py") and not filename.startswith("__") and filename != "ImportBenchmark.py")
+
+timingCode = """
+import sys, time
+sys.path[:0] = [%r, %r]
+startTime = time.perf_counter()
+import %s
+sys.stderr.write("%%.6f" %% (time.perf_counter() - startTime))
+"""
+
+def importTime(moduleName, repeats=3):
+    """
+    Imports moduleName in a fresh interpreter, repeats times.
+
+    Inputs:
+    moduleName [str]
+    repeats [int]
+
+    Output:
+    seconds [float]: Best import time
+    output [str]: Anything the import printed to stdout
+    """
+    code = timingCode % (directory, os.path.dirname(directory), moduleName)
+
+    bestTime = float("inf")
+    output = ""
+    for _ in range(repeats):
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=directory)
+        if process.returncode != 0:
+            raise RuntimeError("Importing %s failed:\n%s" % (moduleName, process.stderr))
+        bestTime = min(bestTime, float(process.stderr.strip().splitlines()[-1]))
+        output += process.stdout
+
+    return bestTime, output
+
+def main(arguments=None):
+    """
+    Command-line entry point. Returns 1 if a module printed
+    on import or took longer than the budget, else 0.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the import time of the modules.")
+    parser.add_argument("modules", nargs="*", help="Modules to import (default: the package and all modules)")
+    parser.add_argument("--budget", type=float, default=defaultBudget, help="Fail if an import takes longer (milliseconds, default: %g)" % defaultBudget)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per module, the best is kept (default: 3)")
+    arguments = parser.parse_args(arguments)
+
+    failed = False
+
+    for moduleName in arguments.modules or defaultModules:
+        seconds, output = importTime(moduleName, arguments.repeats)
+
+        notes = []
+        if output:
+            notes.append("printed on import")
+        if 1000 * seconds > arguments.budget:
+            notes.append("over budget")
+        failed = failed or bool(notes)
+
+        print("%-22s %8.2f ms %s" % (moduleName, 1000 * seconds, ", ".join(notes)))
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
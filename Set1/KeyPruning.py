@@ -0,0 +1,167 @@
+"""
+Pruning of single-byte XOR keys before any scoring.
+
+If the plaintext is known to only contain certain bytes
+(e.g. printable ASCII), a key k can be discarded as soon as
+one distinct ciphertext byte c gives a forbidden plaintext
+byte c ^ k. The allowed plaintext bytes are a 256-bit mask
+(an int with bit b set if byte b is allowed), and for each
+ciphertext byte c the mask of keys giving an allowed byte
+is precomputed. The surviving keys are the AND of these masks
+over the distinct ciphertext bytes, which costs one pass over
+the data plus one AND per distinct byte.
+"""
+
+# Standard library imports
+from functools import lru_cache
+
+# Custom imports
+from LazyNumPy import isNumpyArray, loadNumpy
+
+def makeByteMask(allowedBytes):
+    """
+    Returns the 256-bit mask with a bit set for
+    each byte in allowedBytes.
+
+    Input:
+    allowedBytes [iterable of ints]
+
+    Output:
+    mask [int]
+    """
+    mask = 0
+    for b in allowedBytes:
+        mask |= 1 << b
+
+    return mask
+
+# Printable ASCII, and tab, newline and carriage return
+printableMask = makeByteMask(list(range(32, 127)) + [9, 10, 13])
+
+# Printable ASCII key bytes
+printableKeys = range(32, 127)
+
+allKeysMask = (1 << 256) - 1
+
+@lru_cache(maxsize=16)
+def keyMasks(allowedMask):
+    """
+    For each ciphertext byte c, returns the mask of the keys k
+    for which c ^ k is allowed by allowedMask. Cached, so it is
+    built once for each allowed mask.
+
+    Input:
+    allowedMask [int]
+
+    Output:
+    masks [tuple of 256 ints]
+    """
+    allowedBytes = [b for b in range(256) if allowedMask >> b & 1]
+
+    return tuple(makeByteMask(a ^ c for a in allowedBytes) for c in range(256))
+
+def maskToKeys(mask):
+    """
+    Returns the keys with a bit set in mask, in increasing order.
+    """
+    return [k for k in range(256) if mask >> k & 1]
+
+def distinctBytes(data):
+    """
+    Returns the distinct byte values in data, reading
+    NumPy arrays and non-contiguous memoryviews in place.
+    """
+    isStrided = isinstance(data, memoryview) and not data.contiguous
+
+    numpy = loadNumpy() if isStrided or isNumpyArray(data) else None
+
+    if numpy is not None:
+        array = numpy.asarray(data)
+
+        # A slice at a time, to keep the temporary index arrays small
+        present = numpy.zeros(256, dtype=bool)
+        for start in range(0, len(array), 2**16):
+            present[array[start:start+2**16]] = True
+
+        return numpy.flatnonzero(present).tolist()
+
+    if isStrided:
+        return set(data)
+
+    return set(bytes(data))
+
+def pruneSingleByteKeys(data, allowedMask=printableMask, keys=None):
+    """
+    Finds the single-byte keys which decrypt data to
+    allowed plaintext bytes only.
+
+    Inputs:
+    data [bytes-like, memoryview or numpy.ndarray]: Ciphertext
+    allowedMask [int]: 256-bit mask of the allowed plaintext bytes
+    keys [iterable of ints]: Only consider these keys (default: all 256)
+
+    Output:
+    survivingKeys [list of ints]
+    numPruned [int]: Number of considered keys which were discarded
+    """
+    masks = keyMasks(allowedMask)
+
+    surviving = allKeysMask if keys is None else makeByteMask(keys)
+    numConsidered = bin(surviving).count('1')
+
+    for c in distinctBytes(data):
+        surviving &= masks[c]
+        if not surviving:
+            break
+
+    survivingKeys = maskToKeys(surviving)
+
+    return survivingKeys, numConsidered - len(survivingKeys)
+
+class PruningStats:
+    """
+    Counts the keys considered and pruned over many calls,
+    to report how much scoring work the pruning saved.
+    """
+
+    def __init__(self):
+        self.numConsidered = 0
+        self.numPruned = 0
+
+    def add(self, numConsidered, numPruned):
+        self.numConsidered += numConsidered
+        self.numPruned += numPruned
+
+    def report(self):
+        """
+        Returns a one-line summary of the pruning.
+        """
+        fraction = self.numPruned / self.numConsidered if self.numConsidered else 0.0
+
+        return "Pruned %i of %i keys (%.1f%%) before scoring" % (self.numPruned, self.numConsidered, 100 * fraction)
+
+if __name__ == "__main__":
+
+    """
+    Compare to decrypting with every key, and
+    report the pruning on random and English ciphertexts.
+    """
+
+    import os
+
+    def referencePrune(data, allowedMask):
+        return [k for k in range(256) if all(allowedMask >> (c ^ k) & 1 for c in data)]
+
+    stats = PruningStats()
+
+    for plaintext in [b"Cooking MC's like a pound of bacon", b"Now that the party is jumping\n", os.urandom(30), os.urandom(3), b""]:
+        ciphertext = bytes(b ^ 88 for b in plaintext)
+        survivingKeys, numPruned = pruneSingleByteKeys(ciphertext)
+        assert survivingKeys == referencePrune(ciphertext, printableMask)
+        assert numPruned == 256 - len(survivingKeys)
+        stats.add(256, numPruned)
+
+    assert pruneSingleByteKeys(b"abc", keys=range(32, 127))[1] == 95 - len(pruneSingleByteKeys(b"abc", keys=range(32, 127))[0])
+
+    print("All tests passed.")
+    print(stats.report())
@@ -0,0 +1,371 @@
+"""
+Estimation of the key length of repeating-key XOR.
+
+Two methods, both returning the candidate keysizes ranked
+best first, with a confidence value for each:
+
+- estimateKeysizesHamming(): splits the ciphertext into blocks
+  of each keysize and computes the normalized Hamming distance
+  (differing bits per bit) between pairs of blocks. Blocks
+  encrypted with the same key bytes differ like the plaintexts do,
+  which is less than random bytes, so the right keysize has the
+  lowest distance. All pairs of blocks in the first sampleSize bytes
+  are compared (or numPairs randomly sampled pairs), in one batch per
+  keysize. The blocks are views into the ciphertext (a reshaped
+  NumPy array, or memoryview slices), which is never copied.
+
+- estimateKeysizesCoincidence(): the fraction of positions i where
+  ciphertext[i] == ciphertext[i + shift] (autocorrelation). At shifts
+  which are a multiple of the key length, both bytes are encrypted
+  with the same key byte, so they are equal as often as the plaintext
+  bytes are (about 6% for English), against 1/256 otherwise. This
+  costs one pass over the data per shift, so it works for keysizes
+  in the thousands. Each keysize is scored by the mean coincidence
+  over its multiples.
+
+- estimateKeysizesKasiski(): Kasiski examination. A plaintext n-gram
+  which repeats at the same key position gives a repeated ciphertext
+  n-gram, at a distance which is a multiple of the key length.
+  An index of the n-grams (a stable sort of the n-grams packed into
+  integers with NumPy, or a dict of the last position of each n-gram)
+  gives the distances between consecutive repeats in near-linear time.
+  Each keysize is scored by how many distances it divides, relative
+  to chance. This only needs a few repeats, so it also works on
+  short ciphertexts.
+
+A multiple of the key length scores about as well as the key length
+itself, so a keysize is ranked right after any of its divisors which
+scores nearly as well (see rankKeysizes()).
+"""
+
+# Standard library imports
+import random
+import statistics
+from collections import Counter, namedtuple
+from functools import reduce
+from itertools import combinations
+from math import gcd
+
+# Custom imports
+from Hamming import hammingDistances
+from LazyNumPy import loadNumpy
+from XORKernel import xorBytes
+
+# A ranked keysize:
+# keysize [int]
+# score [float]: Normalized Hamming distance (lower is better), coincidence rate or Kasiski factor ratio (higher is better)
+# confidence [float]: How many standard deviations the score is better than the median over all keysizes
+KeysizeCandidate = namedtuple("KeysizeCandidate", ["keysize", "score", "confidence"])
+
+def rankKeysizes(scores, largest, tolerance=0.2):
+    """
+    Ranks keysizes by score, best first. A keysize is moved
+    right after its smallest divisor whose score is at least
+    (1 - tolerance) as far from the worst score as its own.
+
+    Inputs:
+    scores [dict]: Keysize to score
+    largest [bool]: True if higher scores are better
+    tolerance [float]
+
+    Output:
+    ranking [list of KeysizeCandidate]
+    """
+    if not scores:
+        return []
+
+    sign = 1 if largest else -1
+    median = statistics.median(scores.values())
+    spread = statistics.pstdev(scores.values())
+    worst = min(sign * score for score in scores.values())
+
+    # How much better than the worst keysize each keysize is
+    signals = {keysize: sign * score - worst for keysize, score in scores.items()}
+
+    def candidate(keysize):
+        confidence = sign * (scores[keysize] - median) / spread if spread > 0 else 0.0
+        return KeysizeCandidate(keysize, scores[keysize], confidence)
+
+    ranking = []
+    ranked = set()
+
+    for keysize in sorted(scores, key=lambda keysize: (-signals[keysize], keysize)):
+        if keysize in ranked:
+            continue
+
+        threshold = (1 - tolerance) * signals[keysize]
+        if threshold > 0:
+            for divisor in range(1, keysize // 2 + 1):
+                if keysize % divisor == 0 and divisor in scores and divisor not in ranked and signals[divisor] >= threshold:
+                    ranking.append(candidate(divisor))
+                    ranked.add(divisor)
+                    break
+
+        ranking.append(candidate(keysize))
+        ranked.add(keysize)
+
+    return ranking
+
+def blockPairs(numBlocks, numSampled, numPairs, rng):
+    """
+    Returns the pairs of block indices to compare, as two
+    lists (first and second block of each pair): all pairs
+    among the first numSampled blocks, or numPairs random
+    pairs of different blocks.
+    """
+    if numPairs is None:
+        pairs = list(combinations(range(numSampled), 2))
+        return [i for i, _ in pairs], [j for _, j in pairs]
+
+    first = [rng.randrange(numBlocks) for _ in range(numPairs)]
+    second = [(i + rng.randrange(1, numBlocks)) % numBlocks for i in first]
+
+    return first, second
+
+def estimateKeysizesHamming(ciphertext, keysizes=range(2, 41), sampleSize=1024, numPairs=None, seed=0):
+    """
+    Ranks keysizes by the normalized Hamming distance
+    between blocks of the ciphertext.
+
+    Inputs:
+    ciphertext [bytes-like]
+    keysizes [iterable of ints]
+    sampleSize [int]: Compare all pairs of blocks in the first sampleSize bytes (at least two blocks)
+    numPairs [int]: If given, compare this many randomly sampled pairs instead
+    seed [int]: Seed for the sampling
+
+    Output:
+    ranking [list of KeysizeCandidate]: Best first, lowest distance.
+    Keysizes with fewer than two whole blocks are left out.
+    """
+    rng = random.Random(seed)
+    view = memoryview(ciphertext).cast('B')
+    numpy = loadNumpy()
+    array = numpy.frombuffer(view, dtype=numpy.uint8) if numpy is not None else None
+
+    scores = {}
+
+    for keysize in keysizes:
+        numBlocks = len(view) // keysize
+        if numBlocks < 2:
+            continue
+
+        numSampled = min(numBlocks, max(2, sampleSize // keysize))
+
+        if array is not None and numPairs is None:
+            first, second = numpy.triu_indices(numSampled, 1)
+        else:
+            first, second = blockPairs(numBlocks, numSampled, numPairs, rng)
+
+        if array is not None:
+            blocks = array[:numBlocks*keysize].reshape(numBlocks, keysize)
+            distances = hammingDistances(blocks[first], blocks[second], backend="numpy")
+            totalDistance = int(distances.sum())
+        else:
+            blocks = [view[i*keysize:(i+1)*keysize] for i in range(numBlocks)]
+            distances = hammingDistances([blocks[i] for i in first], [blocks[j] for j in second])
+            totalDistance = sum(distances)
+
+        scores[keysize] = totalDistance / (8 * keysize * len(first))
+
+    return rankKeysizes(scores, largest=False)
+
+def coincidenceRates(ciphertext, maxShift):
+    """
+    Returns the autocorrelation of the ciphertext:
+    rates[shift] is the fraction of positions i where
+    ciphertext[i] == ciphertext[i + shift], for shift
+    from 1 to maxShift (rates[0] is unused).
+
+    Inputs:
+    ciphertext [bytes-like]
+    maxShift [int]: Less than len(ciphertext)
+
+    Output:
+    rates [list of floats]
+    """
+    view = memoryview(ciphertext).cast('B')
+    length = len(view)
+    rates = [0.0] * (maxShift + 1)
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        array = numpy.frombuffer(view, dtype=numpy.uint8)
+        for shift in range(1, maxShift + 1):
+            rates[shift] = int(numpy.count_nonzero(array[:-shift] == array[shift:])) / (length - shift)
+        return rates
+
+    # Equal bytes XOR to zero
+    for shift in range(1, maxShift + 1):
+        rates[shift] = xorBytes(view[:-shift], view[shift:]).count(0) / (length - shift)
+
+    return rates
+
+def estimateKeysizesCoincidence(ciphertext, keysizes=range(2, 41)):
+    """
+    Ranks keysizes by the rate of coincidences between
+    ciphertext bytes which are keysize positions apart,
+    averaged over the multiples of keysize.
+
+    Inputs:
+    ciphertext [bytes-like]
+    keysizes [iterable of ints]
+
+    Output:
+    ranking [list of KeysizeCandidate]: Best first, highest rate.
+    Keysizes not shorter than the ciphertext are left out.
+    """
+    length = len(memoryview(ciphertext).cast('B'))
+    keysizes = [keysize for keysize in keysizes if 0 < keysize < length]
+    if not keysizes:
+        return []
+
+    maxShift = max(keysizes)
+    rates = coincidenceRates(ciphertext, maxShift)
+
+    scores = {}
+    for keysize in keysizes:
+        multiples = rates[keysize:maxShift+1:keysize]
+        scores[keysize] = sum(multiples) / len(multiples)
+
+    return rankKeysizes(scores, largest=True)
+
+def repeatDistances(ciphertext, n=3):
+    """
+    Returns the distances between consecutive occurrences
+    of each repeated n-gram of the ciphertext.
+
+    Inputs:
+    ciphertext [bytes-like]
+    n [int]: Length of the n-grams
+
+    Output:
+    distances [list of ints]
+    """
+    view = memoryview(ciphertext).cast('B')
+    numNgrams = len(view) - n + 1
+    if numNgrams < 2:
+        return []
+
+    numpy = loadNumpy() if n <= 8 else None
+
+    if numpy is not None:
+        array = numpy.frombuffer(view, dtype=numpy.uint8).astype(numpy.uint64)
+
+        # Each n-gram packed into an integer
+        ngrams = numpy.zeros(numNgrams, dtype=numpy.uint64)
+        for i in range(n):
+            ngrams |= array[i:i+numNgrams] << numpy.uint64(8 * i)
+
+        # Equal n-grams end up next to each other, in position order
+        positions = numpy.argsort(ngrams, kind="stable")
+        sortedNgrams = ngrams[positions]
+        repeated = sortedNgrams[1:] == sortedNgrams[:-1]
+
+        return (positions[1:][repeated] - positions[:-1][repeated]).tolist()
+
+    data = view.tobytes()
+    lastPositions = {}
+    distances = []
+
+    for position in range(numNgrams):
+        ngram = data[position:position+n]
+        lastPosition = lastPositions.get(ngram)
+        if lastPosition is not None:
+            distances.append(position - lastPosition)
+        lastPositions[ngram] = position
+
+    return distances
+
+def distanceGCD(distances):
+    """
+    Returns the greatest common divisor of the distances
+    (0 if there are none). Any accidental repeat makes it
+    drop to a divisor of the key length, often 1, so
+    factorHistogram() is more robust.
+    """
+    return reduce(gcd, distances, 0)
+
+def factorHistogram(distances, keysizes):
+    """
+    Counts the distances which each keysize divides.
+
+    Inputs:
+    distances [list of ints]
+    keysizes [iterable of ints]
+
+    Output:
+    histogram [dict]: Keysize to number of distances it divides
+    """
+    distanceCounts = Counter(distances)
+
+    return {keysize: sum(count for distance, count in distanceCounts.items() if distance % keysize == 0) for keysize in keysizes}
+
+def estimateKeysizesKasiski(ciphertext, keysizes=range(2, 41), n=3):
+    """
+    Ranks keysizes by Kasiski examination: the distances between
+    repeated n-grams are multiples of the key length.
+
+    Inputs:
+    ciphertext [bytes-like]
+    keysizes [iterable of ints]
+    n [int]: Length of the n-grams
+
+    Output:
+    ranking [list of KeysizeCandidate]: Best first. The score is the
+    fraction of distances divisible by the keysize, divided by the
+    fraction expected by chance (1 / keysize). Empty if no n-gram repeats.
+    """
+    distances = repeatDistances(ciphertext, n)
+    if not distances:
+        return []
+
+    histogram = factorHistogram(distances, [keysize for keysize in keysizes if keysize > 0])
+    scores = {keysize: count * keysize / len(distances) for keysize, count in histogram.items()}
+
+    return rankKeysizes(scores, largest=True)
+
+if __name__ == "__main__":
+
+    """
+    Recover known key lengths from English encrypted with random keys,
+    and time the methods.
+    """
+
+    import os
+    import time
+
+    from LanguageModel import sampleEnglishText
+
+    text = sampleEnglishText()
+
+    for keysize in [3, 5, 13, 29, 40]:
+        key = os.urandom(keysize)
+        ciphertext = xorBytes(text, key)
+
+        assert estimateKeysizesHamming(ciphertext)[0].keysize == keysize
+        assert estimateKeysizesHamming(ciphertext, numPairs=2000)[0].keysize == keysize
+        assert estimateKeysizesCoincidence(ciphertext)[0].keysize == keysize
+        assert estimateKeysizesKasiski(ciphertext)[0].keysize == keysize
+
+    # "the " repeats 12 bytes later, at the same key position
+    assert repeatDistances(xorBytes(b"the cat and the hat", b"ICE")) == [12, 12]
+    assert distanceGCD([12, 36, 60]) == 12
+
+    # Long keys need a long ciphertext
+    key = os.urandom(1500)
+    ciphertext = xorBytes(text * 20, key)
+    startTime = time.perf_counter()
+    ranking = estimateKeysizesCoincidence(ciphertext, range(2, 3001))
+    coincidenceTime = time.perf_counter() - startTime
+    assert ranking[0].keysize == 1500
+
+    print("All tests passed.")
+    print("Coincidence, %i bytes, keysizes 2-3000: %.2f s, confidence %.1f" % (len(ciphertext), coincidenceTime, ranking[0].confidence))
+
+    ciphertext = xorBytes(text, b"Terminator X: Bring the noise")
+    for name, function in [("Hamming", estimateKeysizesHamming), ("Coincidence", estimateKeysizesCoincidence), ("Kasiski", estimateKeysizesKasiski)]:
+        startTime = time.perf_counter()
+        ranking = function(ciphertext)
+        elapsedTime = time.perf_counter() - startTime
+        print("%-12s %.1f ms, best: %s" % (name, 1000 * elapsedTime, ", ".join("%i (%.1f)" % (c.keysize, c.confidence) for c in ranking[:3])))
@@ -0,0 +1,431 @@
+"""
+Language models for scoring candidate plaintexts.
+
+A model is compiled to a flat lookup table of doubles (array('d')),
+indexed by byte value (unigram models, 256 entries) or by
+256 * first byte + second byte (bigram models, 65536 entries).
+Higher scores mean the text looks more like the training language.
+
+Three kinds of models are available:
+- "frequency": unigram, the score is the sum of the character frequencies
+- "loglikelihood": unigram or bigram, the score is the log-likelihood of the text
+- "chisquared": unigram, the score is minus the chi-squared statistic
+  between the byte counts of the text and the expected counts
+
+Models can be trained from a local corpus file with trainModel().
+The compiled table is cached on disk, keyed by a hash of the corpus,
+so later runs only need to read the table back.
+
+The built-in englishModel() uses the English character frequencies
+from Wikipedia, and is the default model everywhere.
+"""
+
+# Standard library imports
+import hashlib
+import math
+import os
+from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
+from functools import cached_property, lru_cache
+
+# Custom imports
+from HistogramScorer import byteArray, byteHistogram, scoreSingleByteKeys, xorIndexTable
+from LazyNumPy import loadNumpy
+
+# Relative frequency (in percent) of letters and space in English text
+# From: http://www.fitaly.com/board/domper3/posts/136.html and Wikipedia
+englishCharacterFrequency = {"a": 8.497, "b": 1.492, "c": 2.202, "d": 4.253,
+                             "e": 11.162, "f": 2.228, "g": 2.015, "h": 6.094,
+                             "i": 7.546, "j": 0.153, "k": 1.292, "l": 4.025,
+                             "m": 2.406, "n": 6.749, "o": 7.507, "p": 1.929,
+                             "q": 0.095, "r": 7.587, "s": 6.327, "t": 9.356,
+                             "u": 2.758, "v": 0.978, "w": 2.560, "x": 0.150,
+                             "y": 1.994, "z": 0.077, " ": 17.100}
+
+# Default location of the compiled model cache
+defaultCacheDir = os.path.join(os.path.expanduser("~"), ".cache", "cryptopals", "models")
+
+# Increase when the compiled table format changes, to invalidate old cache files
+cacheVersion = 1
+
+class LanguageModel(ABC):
+    """
+    Base class of the language models.
+
+    Attributes:
+    name [str]
+    kind [str]: "frequency", "loglikelihood" or "chisquared"
+    order [int]: 1 for unigram and 2 for bigram models
+    table [array('d')]: The compiled lookup table, 256**order entries
+    """
+
+    def __init__(self, table, kind, order=1, name=""):
+        if len(table) != 256 ** order:
+            raise ValueError("Table of an order %i model must have %i entries" % (order, 256 ** order))
+
+        self.table = table
+        self.kind = kind
+        self.order = order
+        self.name = name
+        self.tableTuple = tuple(table) if order == 1 else None
+
+    @cached_property
+    def tableArray(self):
+        """
+        The table as a NumPy array over the same memory, or
+        None without NumPy. Built on first use.
+        """
+        numpy = loadNumpy()
+
+        return numpy.frombuffer(self.table, dtype=numpy.float64) if numpy is not None else None
+
+    def fingerprint(self):
+        """
+        Returns a hash identifying the model, which
+        changes whenever the table changes.
+        """
+        return hashlib.sha256(("%s:%i:" % (self.kind, self.order)).encode() + self.table.tobytes()).hexdigest()
+
+    @abstractmethod
+    def scoreBytes(self, data):
+        """
+        Returns the score of the plaintext data.
+        """
+
+    @abstractmethod
+    def scoreSingleByteKeys(self, data, keys=None):
+        """
+        Returns the scores of the plaintexts obtained by
+        XORing data with each of the 256 single-byte keys,
+        as a list where the score of key k is at index k.
+        If keys is given, only those keys are scored, and
+        the others get -inf.
+        """
+
+class UnigramModel(LanguageModel):
+    """
+    Model where the score is the sum of a weight for each byte
+    (character frequencies, or log-probabilities).
+    """
+
+    def scoreBytes(self, data):
+        histogram = byteHistogram(data)
+
+        if self.tableArray is not None:
+            return float(self.tableArray @ histogram)
+
+        return sum(count * self.table[c] for c, count in enumerate(histogram) if count)
+
+    def scoreSingleByteKeys(self, data, keys=None):
+        return scoreSingleByteKeys(byteHistogram(data), self.tableTuple, keys)
+
+class ChiSquaredModel(LanguageModel):
+    """
+    Model where the score is minus the chi-squared statistic of the
+    byte counts, compared to the expected byte probabilities in
+    the table (which must all be positive).
+    """
+
+    def scoreHistogram(self, histogram, numBytes):
+        if numBytes == 0:
+            return 0.0
+
+        return -sum((histogram[c] - numBytes * p) ** 2 / (numBytes * p) for c, p in enumerate(self.table))
+
+    def scoreBytes(self, data):
+        histogram = byteHistogram(data)
+
+        return self.scoreHistogram(histogram, sum(histogram))
+
+    def scoreSingleByteKeys(self, data, keys=None):
+        histogram = byteHistogram(data)
+        numBytes = int(sum(histogram))
+
+        if numBytes == 0:
+            return [0.0] * 256
+
+        numpy = loadNumpy()
+
+        if numpy is not None:
+            keyArray = numpy.arange(256) if keys is None else numpy.fromiter(keys, dtype=numpy.intp)
+
+            # Row i holds the histogram of the plaintext for key keyArray[i]
+            permutedHistograms = numpy.asarray(histogram)[xorIndexTable()[keyArray]]
+            expected = numBytes * self.tableArray
+
+            scores = numpy.full(256, float('-inf'))
+            scores[keyArray] = -(((permutedHistograms - expected) ** 2) / expected).sum(axis=1)
+            return scores.tolist()
+
+        scores = [float('-inf')] * 256
+        for k in (range(256) if keys is None else keys):
+            scores[k] = self.scoreHistogram([histogram[c ^ k] for c in range(256)], numBytes)
+
+        return scores
+
+class BigramModel(LanguageModel):
+    """
+    Model where the score is the sum of a weight (log-probability)
+    for each pair of consecutive bytes.
+    """
+
+    def __init__(self, table, kind="loglikelihood", order=2, name=""):
+        LanguageModel.__init__(self, table, kind, order, name)
+
+    def scoreBytes(self, data):
+        pairs, counts = pairCounts(data)
+
+        if self.tableArray is not None:
+            return float(self.tableArray[pairs] @ counts)
+
+        return sum(count * self.table[pair] for pair, count in zip(pairs, counts))
+
+    def scoreSingleByteKeys(self, data, keys=None):
+        # XORing both bytes of a pair with k XORs its index with 256 * k + k
+        pairs, counts = pairCounts(data)
+
+        if self.tableArray is not None:
+            numpy = loadNumpy()
+            keyArray = numpy.arange(256) if keys is None else numpy.fromiter(keys, dtype=numpy.intp)
+            keyMasks = keyArray.astype(numpy.int64) * 257
+
+            scores = numpy.full(256, float('-inf'))
+            scores[keyArray] = self.tableArray[keyMasks[:, numpy.newaxis] ^ pairs[numpy.newaxis, :]] @ counts
+            return scores.tolist()
+
+        scores = [float('-inf')] * 256
+        for k in (range(256) if keys is None else keys):
+            scores[k] = sum(count * self.table[pair ^ (k * 257)] for pair, count in zip(pairs, counts))
+
+        return scores
+
+def pairCounts(data):
+    """
+    Returns the distinct pairs of consecutive bytes
+    in data, as indices 256 * first + second, with
+    the number of times each pair occurs.
+
+    Input:
+    data [bytes-like]
+
+    Output:
+    pairs [list of ints, or numpy.ndarray]
+    counts [list of ints, or numpy.ndarray]
+    """
+    numpy = loadNumpy()
+
+    if numpy is not None:
+        dataArray = byteArray(data).astype(numpy.int64)
+        return numpy.unique((dataArray[:-1] << 8) | dataArray[1:], return_counts=True)
+
+    pairCounter = Counter(zip(data, data[1:]))
+
+    return [(a << 8) | b for a, b in pairCounter], list(pairCounter.values())
+
+@lru_cache(maxsize=None)
+def englishModel():
+    """
+    Returns the built-in English model: the frequency
+    of each letter (both cases) and space, 0 for all
+    other bytes. Built once, on first use.
+    """
+    table = array('d', bytes(8 * 256))
+    for character, frequency in englishCharacterFrequency.items():
+        table[ord(character)] = frequency
+        table[ord(character.upper())] = frequency
+
+    return UnigramModel(table, "frequency", name="english")
+
+def sampleEnglishText():
+    """
+    Returns about 10 KB of English text for the self-tests
+    and benchmarks: the docstrings of a few standard library
+    modules, so no corpus file is needed.
+    """
+    import argparse
+    import json
+    import random
+    import statistics
+
+    return "".join(module.__doc__ for module in [random, statistics, json, argparse]).encode()
+
+def hashCorpus(corpusPath, chunkSize=2**20):
+    """
+    Returns the SHA-256 hash of the corpus file.
+    """
+    corpusHash = hashlib.sha256()
+    with open(corpusPath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b''):
+            corpusHash.update(chunk)
+
+    return corpusHash.hexdigest()
+
+def countCorpus(corpusPath, order, chunkSize=2**20):
+    """
+    Counts the bytes (order 1) or pairs of consecutive
+    bytes (order 2) in the corpus file, reading one chunk
+    at a time.
+
+    Output:
+    counts [list of 256**order ints]
+    """
+    counts = [0] * (256 ** order)
+    previousByte = b''
+
+    with open(corpusPath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b''):
+            if order == 1:
+                for c, count in enumerate(byteHistogram(chunk)):
+                    counts[c] += int(count)
+            else:
+                # Include the pair spanning the chunk boundary
+                chunk = previousByte + chunk
+                pairs, chunkCounts = pairCounts(chunk)
+                for pair, count in zip(pairs, chunkCounts):
+                    counts[int(pair)] += int(count)
+                previousByte = chunk[-1:]
+
+    return counts
+
+def compileTable(counts, kind, smoothing=0.5):
+    """
+    Compiles byte or pair counts to the lookup table of a model.
+    The probabilities use add-smoothing, so that bytes not seen
+    in the corpus get a small positive probability.
+
+    Inputs:
+    counts [list of ints]
+    kind [str]: "frequency", "loglikelihood" or "chisquared"
+    smoothing [float]: Added to every count
+
+    Output:
+    table [array('d')]
+    """
+    total = sum(counts) + smoothing * len(counts)
+    probabilities = [(count + smoothing) / total for count in counts]
+
+    if kind == "loglikelihood":
+        return array('d', [math.log(p) for p in probabilities])
+    if kind in ("frequency", "chisquared"):
+        return array('d', probabilities)
+
+    raise ValueError("Unknown model kind: " + str(kind))
+
+def trainModel(corpusPath, kind="loglikelihood", order=1, cacheDir=defaultCacheDir):
+    """
+    Trains a model on a local corpus file, or loads
+    it from the cache if it was trained before on a
+    corpus with the same contents.
+
+    Inputs:
+    corpusPath [str]
+    kind [str]: "frequency", "loglikelihood" or "chisquared"
+    order [int]: 1 (unigram) or 2 (bigram, only for "loglikelihood")
+    cacheDir [str]: Directory for compiled models, None disables the cache
+
+    Output:
+    model [LanguageModel]
+    """
+    if order == 2 and kind != "loglikelihood":
+        raise ValueError("Bigram models only support kind \"loglikelihood\"")
+    if order not in (1, 2):
+        raise ValueError("Model order must be 1 or 2")
+
+    name = os.path.basename(corpusPath)
+    cachePath = None
+
+    if cacheDir is not None:
+        cacheName = "v%i-%s-%i-%s.bin" % (cacheVersion, kind, order, hashCorpus(corpusPath))
+        cachePath = os.path.join(cacheDir, cacheName)
+        table = loadTable(cachePath, 256 ** order)
+        if table is not None:
+            return makeModel(table, kind, order, name)
+
+    table = compileTable(countCorpus(corpusPath, order), kind)
+
+    if cachePath is not None:
+        saveTable(cachePath, table)
+
+    return makeModel(table, kind, order, name)
+
+def makeModel(table, kind, order, name=""):
+    """
+    Returns the model class matching kind and order, for table.
+    """
+    if order == 2:
+        return BigramModel(table, kind, order, name)
+    if kind == "chisquared":
+        return ChiSquaredModel(table, kind, order, name)
+
+    return UnigramModel(table, kind, order, name)
+
+def loadTable(cachePath, length):
+    """
+    Reads a compiled table from the cache,
+    returns None if it is missing or truncated.
+    """
+    table = array('d')
+    try:
+        with open(cachePath, "rb") as f:
+            table.fromfile(f, length)
+    except (OSError, EOFError):
+        return None
+
+    return table
+
+def saveTable(cachePath, table):
+    """
+    Writes a compiled table to the cache. The file is
+    written under a temporary name and then renamed,
+    so other processes never read a partial table.
+    """
+    os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+
+    temporaryPath = cachePath + ".%i.tmp" % os.getpid()
+    with open(temporaryPath, "wb") as f:
+        table.tofile(f)
+
+    os.replace(temporaryPath, cachePath)
+
+if __name__ == "__main__":
+
+    """
+    Train models on a corpus file given on the command line,
+    and time training versus loading from the cache.
+    """
+
+    import sys
+    import tempfile
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: python LanguageModel.py corpus.txt")
+        sys.exit(1)
+
+    corpusPath = sys.argv[1]
+    plaintext = b"Now that the party is jumping, with the bass kicked in"
+    ciphertext = bytes(b ^ 0x35 for b in plaintext)
+
+    with tempfile.TemporaryDirectory() as cacheDir:
+        for kind, order in [("frequency", 1), ("loglikelihood", 1), ("chisquared", 1), ("loglikelihood", 2)]:
+            startTime = time.perf_counter()
+            model = trainModel(corpusPath, kind, order, cacheDir)
+            trainTime = time.perf_counter() - startTime
+
+            startTime = time.perf_counter()
+            cachedModel = trainModel(corpusPath, kind, order, cacheDir)
+            loadTime = time.perf_counter() - startTime
+
+            assert cachedModel.table == model.table
+
+            scores = model.scoreSingleByteKeys(ciphertext)
+            bestKey = max(range(256), key=lambda k: scores[k])
+
+            # Only the given keys are scored, with the same scores
+            someKeys = [0x35, 1, 200]
+            someScores = model.scoreSingleByteKeys(ciphertext, someKeys)
+            assert all(abs(someScores[k] - scores[k]) <= 1e-9 * max(1.0, abs(scores[k])) for k in someKeys)
+            assert all(score == float('-inf') for k, score in enumerate(someScores) if k not in someKeys)
+
+            print("%-13s order %i: trained in %8.4f s, loaded in %8.6f s, best key %3i (correct: %i)" % (kind, order, trainTime, loadTime, bestKey, 0x35))
@@ -0,0 +1,49 @@
+"""
+Lazy import of the optional NumPy dependency.
+
+Importing NumPy takes about 100 ms, longer than most challenges
+take to run, so the modules do not import it at import time.
+Functions which have a NumPy path call loadNumpy() when they
+run, and it is imported on the first such call. Without NumPy,
+loadNumpy() returns None and the pure-Python paths are used.
+
+Usage:
+numpy = loadNumpy()
+if numpy is not None:
+    array = numpy.frombuffer(data, dtype=numpy.uint8)
+"""
+
+# Standard library imports
+import importlib.util
+import sys
+from functools import lru_cache
+
+@lru_cache(maxsize=None)
+def loadNumpy():
+    """
+    Imports NumPy on the first call.
+
+    Output:
+    numpy [module, or None if NumPy is not installed]
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+def numpyAvailable():
+    """
+    Returns True if NumPy is installed, without importing it.
+    """
+    return importlib.util.find_spec("numpy") is not None
+
+def isNumpyArray(value):
+    """
+    Returns True if value is a NumPy array, without importing
+    NumPy: if it was never imported, no value can be an array.
+    """
+    numpy = sys.modules.get("numpy")
+
+    return numpy is not None and isinstance(value, numpy.ndarray)
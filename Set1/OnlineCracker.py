@@ -0,0 +1,332 @@
+"""
+Incremental breaking of repeating-key XOR, for ciphertext
+which arrives in pieces.
+
+OnlineCracker keeps, for every candidate keysize, the byte
+histogram of each column (the bytes at the same key position),
+and a running index of coincidence of the columns:
+
+IoC(keysize) = sum over columns and bytes of n(n - 1)
+               / sum over columns of N(N - 1)
+
+where n is the count of a byte in a column and N is the
+length of the column. Columns encrypted with a single key byte
+keep the coincidences of the plaintext (about 0.065 for English),
+while mixing key bytes gives a lower rate. feed() updates the
+histograms and both sums in O(len(chunk)) per keysize, and never
+looks at earlier data again.
+
+The key for a keysize is solved from the column histograms alone
+(see HistogramScorer), which costs the same however long the
+stream is. Solved keys are cached until the next feed().
+
+Usage:
+cracker = OnlineCracker()
+for chunk in stream:
+    cracker.feed(chunk)
+    key = cracker.bestKey()
+"""
+
+# Standard library imports
+from collections import Counter
+
+# Custom imports
+from HistogramScorer import scoreSingleByteKeys
+from KeyPruning import printableKeys, printableMask, pruneSingleByteKeys
+from KeysizeEstimator import rankKeysizes
+from LanguageModel import UnigramModel, englishModel
+from LazyNumPy import loadNumpy
+from Ranking import topK
+
+def shortestPeriod(key):
+    """
+    Returns the shortest key which repeats to key,
+    e.g. b"ICE" for b"ICEICE". Encrypting with either
+    gives the same ciphertext.
+    """
+    for length in range(1, len(key)):
+        if len(key) % length == 0 and key == key[:length] * (len(key) // length):
+            return key[:length]
+
+    return key
+
+class OnlineCracker:
+    """
+    Repeating-key XOR cracker updated one chunk at a time.
+
+    Attributes:
+    keysizes [list of ints]: Candidate keysizes
+    numBytes [int]: Number of bytes fed so far
+    position [int]: Key phase of the next byte is position % keysize
+    """
+
+    def __init__(self, keysizes=range(2, 41), model=None, allowedMask=printableMask, keys=printableKeys):
+        if model is None:
+            model = englishModel()
+
+        if not isinstance(model, UnigramModel):
+            raise ValueError("OnlineCracker needs a unigram model, the keys are solved from byte histograms")
+
+        self.keysizes = [keysize for keysize in keysizes if keysize > 0]
+        if not self.keysizes:
+            raise ValueError("No keysizes to consider")
+
+        self.model = model
+        self.allowedMask = allowedMask
+        self.keys = list(keys)
+
+        self.numBytes = 0
+        self.position = 0
+
+        # Per keysize: column histograms, column lengths, and the sum of n(n - 1)
+        numpy = loadNumpy()
+        if numpy is not None:
+            self.histograms = {keysize: numpy.zeros((keysize, 256), dtype=numpy.int64) for keysize in self.keysizes}
+            self.columnLengths = {keysize: numpy.zeros(keysize, dtype=numpy.int64) for keysize in self.keysizes}
+        else:
+            self.histograms = {keysize: [[0] * 256 for _ in range(keysize)] for keysize in self.keysizes}
+            self.columnLengths = {keysize: [0] * keysize for keysize in self.keysizes}
+        self.coincidences = dict.fromkeys(self.keysizes, 0)
+
+        self.cachedKeys = {}
+        self.cachedRanking = None
+
+    def feed(self, chunk):
+        """
+        Adds the next piece of ciphertext.
+
+        Input:
+        chunk [bytes-like]
+        """
+        view = memoryview(chunk).cast('B')
+        length = len(view)
+        if length == 0:
+            return
+
+        numpy = loadNumpy()
+        if numpy is not None:
+            self.feedArray(numpy.frombuffer(view, dtype=numpy.uint8))
+        else:
+            self.feedView(view)
+
+        self.numBytes += length
+        self.position += length
+        self.cachedKeys = {}
+        self.cachedRanking = None
+
+    def feedArray(self, array, positions=None):
+        """
+        feed() with NumPy: one bincount per keysize, over
+        (column index, byte value) pairs. positions holds the
+        key phase of each byte (default: consecutive from position).
+        """
+        numpy = loadNumpy()
+
+        if positions is None:
+            positions = numpy.arange(self.position, self.position + len(array), dtype=numpy.int64)
+
+        for keysize in self.keysizes:
+            histogram = self.histograms[keysize]
+            counts = numpy.bincount((positions % keysize) * 256 + array, minlength=keysize * 256).reshape(keysize, 256)
+
+            # (n + d)(n + d - 1) - n(n - 1) = d(2n + d - 1)
+            self.coincidences[keysize] += int((counts * (2 * histogram + counts - 1)).sum())
+
+            histogram += counts
+            self.columnLengths[keysize] += counts.sum(axis=1)
+
+    def feedView(self, view):
+        """
+        feed() without NumPy: one Counter per column, over
+        a strided view of the chunk.
+        """
+        for keysize in self.keysizes:
+            histograms = self.histograms[keysize]
+            columnLengths = self.columnLengths[keysize]
+
+            for column in range(keysize):
+                start = (column - self.position) % keysize
+                counts = Counter(view[start::keysize])
+                histogram = histograms[column]
+
+                for byte, count in counts.items():
+                    self.coincidences[keysize] += count * (2 * histogram[byte] + count - 1)
+                    histogram[byte] += count
+                    columnLengths[column] += count
+
+    def feedMessages(self, messages):
+        """
+        Adds a batch of separate messages encrypted with the same
+        key, each starting at the first byte of the key. With NumPy,
+        the whole batch is counted in one bincount per keysize.
+
+        Input:
+        messages [list of bytes-like]
+        """
+        messages = [memoryview(message).cast('B') for message in messages]
+        messages = [message for message in messages if len(message)]
+        if not messages:
+            return
+
+        numpy = loadNumpy()
+        if numpy is None:
+            for message in messages:
+                self.resetPhase()
+                self.feed(message)
+            return
+
+        lengths = numpy.array([len(message) for message in messages], dtype=numpy.int64)
+        starts = numpy.cumsum(lengths) - lengths
+        array = numpy.frombuffer(b"".join(messages), dtype=numpy.uint8)
+
+        # Key phase of each byte: its position within its message
+        self.position = 0
+        self.feedArray(array, numpy.arange(len(array), dtype=numpy.int64) - numpy.repeat(starts, lengths))
+
+        self.numBytes += len(array)
+        self.position = int(lengths[-1])
+        self.cachedKeys = {}
+        self.cachedRanking = None
+
+    def resetPhase(self):
+        """
+        Makes the next byte fed the first byte of the key,
+        e.g. at the start of another message encrypted with
+        the same key.
+        """
+        self.position = 0
+
+    def indexOfCoincidence(self, keysize):
+        """
+        Returns the index of coincidence of the columns of
+        keysize, or None if no column has two bytes yet.
+        """
+        columnLengths = self.columnLengths[keysize]
+        pairs = sum(int(length) * (int(length) - 1) for length in columnLengths)
+
+        if pairs == 0:
+            return None
+
+        return self.coincidences[keysize] / pairs
+
+    def rankKeysizes(self):
+        """
+        Ranks the keysizes by index of coincidence, best first.
+
+        Output:
+        ranking [list of KeysizeEstimator.KeysizeCandidate]
+        """
+        if self.cachedRanking is None:
+            scores = {}
+            for keysize in self.keysizes:
+                rate = self.indexOfCoincidence(keysize)
+                if rate is not None:
+                    scores[keysize] = rate
+
+            self.cachedRanking = rankKeysizes(scores, largest=True)
+
+        return self.cachedRanking
+
+    def solveColumn(self, histogram):
+        """
+        Returns the best key byte for a column, from its histogram.
+        Keys giving bytes outside allowedMask are discarded first,
+        unless that discards all keys.
+        """
+        keys = self.keys
+
+        if self.allowedMask is not None:
+            distinctBytes = bytes(byte for byte in range(256) if histogram[byte])
+            survivingKeys, _ = pruneSingleByteKeys(distinctBytes, self.allowedMask, keys)
+            if survivingKeys:
+                keys = survivingKeys
+
+        scores = scoreSingleByteKeys(histogram, self.model.tableTuple, keys)
+        (keyByte, score), = topK(scores, 1, keys=keys)
+
+        return keyByte
+
+    def keyFor(self, keysize):
+        """
+        Returns the most likely key of length keysize.
+        """
+        if keysize not in self.cachedKeys:
+            self.cachedKeys[keysize] = bytes(self.solveColumn(histogram) for histogram in self.histograms[keysize])
+
+        return self.cachedKeys[keysize]
+
+    def bestKey(self):
+        """
+        Returns the most likely key, for the best ranked
+        keysize, or None before enough data has been fed.
+        A key which repeats a shorter key is shortened to it.
+        """
+        ranking = self.rankKeysizes()
+        if not ranking:
+            return None
+
+        return shortestPeriod(self.keyFor(ranking[0].keysize))
+
+if __name__ == "__main__":
+
+    """
+    Feed English encrypted with a known key in random pieces,
+    and show that the time per feed stays flat as the stream grows.
+    """
+
+    import random
+    import time
+
+    from LanguageModel import sampleEnglishText
+    from XORKernel import xorBytes
+
+    text = sampleEnglishText()
+
+    rng = random.Random(2)
+    for key in [b"ICE", b"Terminator X: Bring the noise", bytes(rng.choice(printableKeys) for _ in range(40))]:
+        ciphertext = xorBytes(text, key)
+        cracker = OnlineCracker()
+
+        start = 0
+        while start < len(ciphertext):
+            end = start + rng.randint(0, 500)
+            cracker.feed(ciphertext[start:end])
+            start = end
+
+        assert cracker.numBytes == len(ciphertext)
+        assert cracker.bestKey() == key
+
+    assert shortestPeriod(b"ICEICE") == b"ICE" and shortestPeriod(b"ICEIC") == b"ICEIC" and shortestPeriod(b"ZZZ") == b"Z"
+
+    # Separate messages with the same key, each starting at key phase 0
+    key = b"Secret key!"
+    messages = []
+    for _ in range(3000):
+        start = rng.randrange(len(text) - 40)
+        messages.append(xorBytes(text[start:start+rng.randint(10, 40)], key))
+    cracker = OnlineCracker()
+    for batchStart in range(0, len(messages), 1000):
+        cracker.feedMessages(messages[batchStart:batchStart+1000])
+    assert cracker.numBytes == sum(len(message) for message in messages)
+    assert cracker.bestKey() == key
+
+    # Histograms and coincidences match counting the whole ciphertext at once
+    cracker = OnlineCracker(keysizes=[7])
+    cracker.feed(ciphertext[:1000])
+    cracker.feed(ciphertext[1000:3001])
+    columns = [Counter(ciphertext[i:3001:7]) for i in range(7)]
+    assert [[int(count) for count in histogram] for histogram in cracker.histograms[7]] == [[column[b] for b in range(256)] for column in columns]
+    assert cracker.coincidences[7] == sum(n * (n - 1) for column in columns for n in column.values())
+
+    print("All tests passed.")
+
+    cracker = OnlineCracker()
+    key = b"Terminator X: Bring the noise"
+    chunk = xorBytes(text[:4096 - 4096 % len(key)], key)
+    for numChunks in range(1, 301):
+        startTime = time.perf_counter()
+        cracker.feed(chunk)
+        bestKey = cracker.bestKey()
+        elapsedTime = time.perf_counter() - startTime
+        if numChunks in [1, 10, 100, 300]:
+            print("After %8i bytes: feed + bestKey %.2f ms, key %r" % (cracker.numBytes, 1000 * elapsedTime, bestKey))
@@ -0,0 +1,167 @@
+"""
+Top-k selection of candidates by score.
+
+Only the k best candidates are ever kept and sorted,
+instead of sorting all of them:
+- topK() selects the k best entries of a list of scores,
+  with heapq (or numpy.argpartition for NumPy arrays)
+- TopK is a bounded heap, collecting the k best candidates
+  from a stream of any length (e.g. across all lines of a file)
+  in O(k) memory
+
+Ties are resolved like a stable sort: among equal scores,
+the candidate with the lowest index (or pushed first) wins.
+"""
+
+# Standard library imports
+import heapq
+from itertools import count
+from operator import itemgetter
+
+# Custom imports
+from LazyNumPy import isNumpyArray, loadNumpy
+
+def topK(scores, k, largest=True, keys=None):
+    """
+    Returns the k best (index, score) pairs from scores,
+    best first.
+
+    Inputs:
+    scores [list of floats, or numpy.ndarray]: Score of candidate i at index i
+    k [int]
+    largest [bool]: True if higher scores are better, False if lower are better
+    keys [iterable of ints]: Only consider these indices (default: all)
+
+    Output:
+    best [list of (index, score) tuples]
+    """
+    if isNumpyArray(scores) and keys is None:
+        return topKArray(scores, k, largest)
+
+    if keys is None:
+        candidates = enumerate(scores)
+    else:
+        candidates = ((key, scores[key]) for key in keys)
+
+    if largest:
+        return heapq.nlargest(k, candidates, key=itemgetter(1))
+
+    return heapq.nsmallest(k, candidates, key=itemgetter(1))
+
+def topKArray(scores, k, largest=True):
+    """
+    topK() for a 1-D NumPy array, using numpy.argpartition.
+    Candidates tied with the k-th best score are taken in
+    index order, so the result matches a stable sort.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+
+    numpy = loadNumpy()
+    orderedScores = -scores if largest else scores
+
+    kthScore = numpy.partition(orderedScores, k - 1)[k - 1]
+    better = numpy.flatnonzero(orderedScores < kthScore)
+    tied = numpy.flatnonzero(orderedScores == kthScore)[:k - len(better)]
+    selected = numpy.concatenate((better, tied))
+
+    # Sort the selected candidates by score, then by index
+    selected = selected[numpy.lexsort((selected, orderedScores[selected]))]
+
+    return [(int(index), scores[index].item()) for index in selected]
+
+class TopK:
+    """
+    Bounded heap keeping the k best candidates pushed into it.
+
+    Usage:
+    best = TopK(5)
+    for item, score in candidates:
+        best.push(score, item)
+    best.items() # [(score, item), ...], best first
+    """
+
+    def __init__(self, k, largest=True):
+        self.k = k
+        self.largest = largest
+        self.heap = [] # Min-heap of (ordering score, -sequence number, score, item), worst candidate first
+        self.sequence = count()
+        self.numPushed = 0
+
+    def push(self, score, item):
+        """
+        Offers a candidate. Returns True if it is
+        among the k best seen so far.
+        """
+        self.numPushed += 1
+
+        if self.k <= 0:
+            return False
+
+        entry = (score if self.largest else -score, -next(self.sequence), score, item)
+
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+            return True
+
+        if entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+            return True
+
+        return False
+
+    def pushMany(self, candidates):
+        """
+        Offers each (score, item) pair in candidates.
+        """
+        for score, item in candidates:
+            self.push(score, item)
+
+    def worstScore(self):
+        """
+        Returns the score a new candidate has to beat
+        to get into the top k, or None while fewer than
+        k candidates have been pushed.
+        """
+        if len(self.heap) < self.k:
+            return None
+
+        return self.heap[0][2]
+
+    def items(self):
+        """
+        Returns the kept candidates as (score, item) pairs, best first.
+        """
+        return [(score, item) for _, _, score, item in sorted(self.heap, reverse=True)]
+
+    def __len__(self):
+        return len(self.heap)
+
+if __name__ == "__main__":
+
+    """
+    Compare to full sorts, including ties.
+    """
+
+    import random
+
+    numpy = loadNumpy()
+
+    for _ in range(200):
+        numScores = random.randint(0, 300)
+        scores = [random.choice([0.0, 1.0, 2.5, random.random()]) for _ in range(numScores)]
+        k = random.randint(0, 20)
+
+        for largest in [True, False]:
+            expected = sorted(enumerate(scores), key=itemgetter(1), reverse=largest)[:k]
+            assert topK(scores, k, largest) == expected
+
+            if numpy is not None:
+                assert topK(numpy.array(scores), k, largest) == expected
+
+            best = TopK(k, largest)
+            best.pushMany((score, index) for index, score in enumerate(scores))
+            assert best.items() == [(score, index) for index, score in expected]
+
+    print("All tests passed.")
@@ -0,0 +1,322 @@
+"""
+Breaking repeating-key XOR over several candidate keysizes in parallel.
+
+Instead of committing to the single most likely keysize, the best
+topN keysizes (see KeysizeEstimator) are all solved: the ciphertext
+is transposed into one column per key byte, and each column is solved
+as a single-byte XOR (see HistogramScorer). The columns of all
+candidate keysizes are independent tasks, grouped into chunks of
+consecutive columns (across keysizes) with about the same number of
+bytes each, and spread over a process pool. The workers read the ciphertext from a block of shared memory
+(multiprocessing.shared_memory), so it is copied once, not once
+per task.
+
+Each candidate key is then scored on the whole plaintext it gives
+(score per byte, with the language model), and the best key overall
+is returned. A wrong keysize gives a key which decrypts to noise,
+so this corrects a wrong guess of the keysize at the cost of
+solving a few more columns.
+
+With a cache (see ResultCache), the candidates and pruning counts
+of a run are stored, and a repeated run on the same ciphertext with
+the same model and parameters only decrypts with the stored key.
+"""
+
+# Standard library imports
+from collections import namedtuple
+from functools import partial
+
+# Custom imports
+from HistogramScorer import rankSingleByteKeys
+from KeyPruning import PruningStats, printableKeys, printableMask
+from KeysizeEstimator import estimateKeysizesHamming
+from LanguageModel import englishModel
+from WorkerPool import mapChunks, numProcesses
+from XORKernel import xorBytes
+
+# Result of cracking:
+# key [bytes]: The best key
+# plaintext [bytes]
+# score [float]: Score per byte of the plaintext
+# candidates [list of (score, keysize, key) tuples]: One per keysize tried, best first
+CrackResult = namedtuple("CrackResult", ["key", "plaintext", "score", "candidates"])
+
+# Number of chunks of columns per worker process, so that
+# workers which finish early can take another chunk
+chunksPerProcess = 4
+
+def columnViews(ciphertext, keysize):
+    """
+    Transposes the ciphertext into keysize columns, where
+    column i holds the bytes at positions i, i + keysize,
+    i + 2*keysize, ... (the bytes XORed with key byte i).
+    The columns are strided views into the ciphertext,
+    so nothing is copied.
+
+    Inputs:
+    ciphertext [bytes-like]
+    keysize [int]
+
+    Output:
+    columns [list of memoryviews]
+    """
+    view = memoryview(ciphertext).cast('B')
+
+    return [view[i::keysize] for i in range(keysize)]
+
+def columnChunks(keysizes, length, numChunks):
+    """
+    Splits the columns of all keysizes into at most numChunks
+    chunks of consecutive (keysize, column index) tasks, with
+    about the same number of ciphertext bytes in each chunk.
+    A chunk may hold columns of several keysizes, and the columns
+    of one keysize may be spread over several chunks.
+
+    Inputs:
+    keysizes [list of ints]
+    length [int]: Length of the ciphertext
+    numChunks [int]
+
+    Output:
+    chunks [list of lists of (int, int) pairs]
+    """
+    tasks = [(keysize, index) for keysize in keysizes for index in range(keysize)]
+    columnLengths = [(length - index + keysize - 1) // keysize for keysize, index in tasks]
+    chunkBytes = sum(columnLengths) / max(1, min(numChunks, len(tasks)))
+
+    chunks = []
+    chunk = []
+    numBytes = 0
+    for task, columnLength in zip(tasks, columnLengths):
+        chunk.append(task)
+        numBytes += columnLength
+        if numBytes >= chunkBytes * (len(chunks) + 1):
+            chunks.append(chunk)
+            chunk = []
+
+    if chunk:
+        chunks.append(chunk)
+
+    return chunks
+
+def solveColumn(column, model=None, allowedMask=printableMask, keys=printableKeys):
+    """
+    Finds the key byte of one column: the single-byte key
+    giving the best scoring plaintext. Keys giving bytes outside
+    allowedMask are discarded first, unless that discards all keys.
+
+    Inputs:
+    column [bytes-like]: May be a strided view
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    allowedMask [int]: 256-bit mask of the allowed plaintext bytes, or None
+    keys [iterable of ints]: Candidate key bytes
+
+    Output:
+    keyByte [int]
+    numConsidered [int]: Number of keys considered for pruning
+    numPruned [int]: Number of them which were discarded
+    """
+    stats = PruningStats()
+    ranking = []
+
+    if allowedMask is not None:
+        ranking = rankSingleByteKeys(column, model, k=1, keys=keys, allowedMask=allowedMask, stats=stats)
+
+    # If no key gives allowed plaintext, fall back to scoring all of them
+    if not ranking:
+        ranking = rankSingleByteKeys(column, model, k=1, keys=keys)
+
+    (keyByte, score), = ranking
+
+    return keyByte, stats.numConsidered, stats.numPruned
+
+def solveTasks(tasks, ciphertext, model=None, allowedMask=printableMask, keys=printableKeys):
+    """
+    Solves a list of (keysize, column index) tasks on ciphertext.
+
+    Output:
+    results [list of (keysize, column index, key byte, numConsidered, numPruned) tuples]
+    """
+    results = []
+
+    with memoryview(ciphertext) as view:
+        for keysize, index in tasks:
+            with view[index::keysize] as column:
+                results.append((keysize, index) + solveColumn(column, model, allowedMask, keys))
+
+    return results
+
+def solveColumnTasks(tasks, sharedName, length, model=None, allowedMask=printableMask, keys=printableKeys):
+    """
+    Solves a list of (keysize, column index) tasks, reading
+    the ciphertext from the shared memory block sharedName.
+    Runs in the worker processes.
+
+    Output:
+    results [list of (keysize, column index, key byte, numConsidered, numPruned) tuples]
+    """
+    from multiprocessing import shared_memory
+
+    memory = shared_memory.SharedMemory(name=sharedName)
+    try:
+        with memory.buf[:length] as ciphertext:
+            results = solveTasks(tasks, ciphertext, model, allowedMask, keys)
+    finally:
+        memory.close()
+
+    return results
+
+def crackRepeatingKeyXOR(ciphertext, keysizes=range(2, 41), topN=3, processes=None, model=None, allowedMask=printableMask, keys=printableKeys, stats=None, cache=None):
+    """
+    Breaks repeating-key XOR, trying the topN most likely keysizes
+    and solving all their columns on a process pool.
+
+    Inputs:
+    ciphertext [bytes-like]
+    keysizes [iterable of ints]: Keysizes to consider
+    topN [int]: Number of keysizes to solve
+    processes [int]: Number of worker processes (default: number of CPUs, 1 for no pool)
+    model [LanguageModel]: Defaults to LanguageModel.englishModel()
+    allowedMask [int]: 256-bit mask of the allowed plaintext bytes, or None (see KeyPruning)
+    keys [iterable of ints]: Candidate key bytes (default: printable ASCII)
+    stats [KeyPruning.PruningStats]: If given, counts the pruned keys
+    cache [ResultCache.ResultCache]: If given, results are looked up and stored
+
+    Output:
+    result [CrackResult]
+    """
+    if model is None:
+        model = englishModel()
+
+    ciphertext = bytes(ciphertext)
+    if not ciphertext:
+        raise ValueError("Ciphertext is empty")
+
+    # Both are used more than once, so they may not be generators
+    keysizes = list(keysizes)
+    keys = list(keys)
+
+    if cache is not None:
+        fingerprint = model.fingerprint()
+        params = {"keysizes": keysizes, "topN": topN, "allowedMask": allowedMask, "keys": keys}
+        cacheKey = cache.key(ciphertext, "repeatingKeyXOR", params)
+
+        value = cache.get(fingerprint, cacheKey)
+        if value is not None:
+            if stats is not None:
+                stats.add(value["numConsidered"], value["numPruned"])
+            candidates = [(score, keysize, bytes.fromhex(key)) for score, keysize, key in value["candidates"]]
+            score, keysize, key = candidates[0]
+            return CrackResult(key, xorBytes(ciphertext, key), score, candidates)
+
+        # Count the pruning of this run, to store it with the result
+        runStats = PruningStats()
+        result = crackRepeatingKeyXOR(ciphertext, keysizes, topN, processes, model, allowedMask, keys, runStats)
+        if stats is not None:
+            stats.add(runStats.numConsidered, runStats.numPruned)
+
+        cache.put(fingerprint, cacheKey, {"candidates": [(score, keysize, key.hex()) for score, keysize, key in result.candidates],
+                                          "numConsidered": runStats.numConsidered,
+                                          "numPruned": runStats.numPruned})
+
+        return result
+
+    candidateKeysizes = [candidate.keysize for candidate in estimateKeysizesHamming(ciphertext, keysizes)[:topN]]
+    if not candidateKeysizes:
+        raise ValueError("Ciphertext is too short for the given keysizes")
+
+    # Several chunks per process, each with about the same number of bytes
+    processes = numProcesses(processes)
+    keyBytes = {keysize: bytearray(keysize) for keysize in candidateKeysizes}
+
+    def addResults(results):
+        for keysize, index, keyByte, numConsidered, numPruned in results:
+            keyBytes[keysize][index] = keyByte
+            if stats is not None:
+                stats.add(numConsidered, numPruned)
+
+    if processes <= 1:
+        # No pool, so the ciphertext does not need to be shared
+        tasks = [(keysize, index) for keysize in candidateKeysizes for index in range(keysize)]
+        addResults(solveTasks(tasks, ciphertext, model, allowedMask, keys))
+    else:
+        chunks = columnChunks(candidateKeysizes, len(ciphertext), chunksPerProcess * processes)
+
+        # Imported here, as it takes longer than the rest of this module
+        from multiprocessing import shared_memory
+
+        memory = shared_memory.SharedMemory(create=True, size=len(ciphertext))
+        try:
+            memory.buf[:len(ciphertext)] = ciphertext
+
+            solveFunction = partial(solveColumnTasks, sharedName=memory.name, length=len(ciphertext), model=model, allowedMask=allowedMask, keys=keys)
+
+            for results in mapChunks(solveFunction, chunks, processes):
+                addResults(results)
+        finally:
+            memory.close()
+            memory.unlink()
+
+    # Score each full key on the whole plaintext
+    candidates = []
+    for keysize in candidateKeysizes:
+        key = bytes(keyBytes[keysize])
+        score = model.scoreBytes(xorBytes(ciphertext, key)) / len(ciphertext)
+        candidates.append((score, keysize, key))
+
+    # Best score first, and the shorter key among equal scores
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+
+    score, keysize, key = candidates[0]
+
+    return CrackResult(key, xorBytes(ciphertext, key), score, candidates)
+
+if __name__ == "__main__":
+
+    """
+    Recover random printable keys from English text, with
+    and without a process pool, and time both.
+    """
+
+    import os
+    import random
+    import time
+
+    from LanguageModel import sampleEnglishText
+
+    text = sampleEnglishText()
+
+    # Every column is in exactly one chunk, in order
+    for keysizes, numChunks in [([2], 1), ([29, 2, 5], 8), ([3, 40], 100)]:
+        chunks = columnChunks(keysizes, 1000, numChunks)
+        assert len(chunks) <= numChunks
+        assert [task for chunk in chunks for task in chunk] == [(keysize, index) for keysize in keysizes for index in range(keysize)]
+
+    rng = random.Random(1)
+    for keysize in [2, 7, 29, 40]:
+        key = bytes(rng.choice(printableKeys) for _ in range(keysize))
+        ciphertext = xorBytes(text, key)
+
+        for processes in [1, 2]:
+            result = crackRepeatingKeyXOR(ciphertext, processes=processes)
+            assert result.key == key
+            assert result.plaintext == text
+
+    # Keysizes from a generator, through the cache
+    import tempfile
+    from ResultCache import ResultCache
+
+    ciphertext = xorBytes(text, b"ICE")
+    with tempfile.TemporaryDirectory() as cacheDir:
+        for _ in range(2):
+            result = crackRepeatingKeyXOR(ciphertext, (keysize for keysize in range(2, 41)), processes=1, cache=ResultCache(cacheDir))
+            assert result.key == b"ICE"
+
+    print("All tests passed.")
+
+    ciphertext = xorBytes(text * 20, b"Terminator X: Bring the noise")
+    for processes in [1, max(2, os.cpu_count() or 1)]:
+        startTime = time.perf_counter()
+        result = crackRepeatingKeyXOR(ciphertext, topN=5, processes=processes)
+        elapsedTime = time.perf_counter() - startTime
+        print("%i process(es): %.3f s, key %r, candidate keysizes %s" % (processes, elapsedTime, result.key, [keysize for _, keysize, _ in result.candidates]))
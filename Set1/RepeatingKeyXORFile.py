@@ -0,0 +1,166 @@
+"""
+Streaming repeating-key XOR of files of any size.
+
+Regular files are memory-mapped and processed in chunks whose
+length is a whole number of keys, against a keystream which
+is tiled once up front. Other inputs (pipes, stdin) are read
+in chunks of any length, and the position in the key (the key
+phase) is carried over from one chunk to the next. Either way,
+only one chunk is held in memory at a time, and the XOR itself
+is done by the shared XORKernel.
+
+Usage:
+python RepeatingKeyXORFile.py plaintext.bin -o ciphertext.bin --key ICE
+cat ciphertext.bin | python RepeatingKeyXORFile.py - --key-hex 494345 > plaintext.bin
+"""
+
+# Standard library imports
+import mmap
+import os
+import sys
+import time
+
+# Custom imports
+from XORKernel import xorInto
+
+# Default number of bytes processed at a time
+defaultChunkSize = 2**22
+
+class RepeatingKeyXOR:
+    """
+    Incremental repeating-key XOR, for data arriving in
+    chunks of any length. The key phase is carried over
+    between calls to update().
+
+    Usage:
+    cipher = RepeatingKeyXOR(b'ICE')
+    output = cipher.update(chunk1) + cipher.update(chunk2)
+    """
+
+    def __init__(self, key, chunkSize=defaultChunkSize):
+        if not key:
+            raise ValueError("Key is empty")
+
+        self.key = bytes(key)
+        self.phase = 0 # Position in the key of the next byte
+
+        # Keystream long enough for a chunk starting at any phase
+        repeats = -(-chunkSize // len(self.key)) + 1
+        self.keystream = memoryview(self.key * repeats)
+        self.chunkSize = chunkSize
+
+    def updateInto(self, output, data):
+        """
+        XORs data into the writable buffer output
+        (which may be data itself), returns the
+        number of bytes written.
+        """
+        data = memoryview(data).cast('B')
+        output = memoryview(output).cast('B')
+        keyLength = len(self.key)
+
+        for start in range(0, len(data), self.chunkSize):
+            chunk = data[start:start+self.chunkSize]
+            xorInto(output[start:start+len(chunk)], chunk, self.keystream[self.phase:self.phase+len(chunk)])
+            self.phase = (self.phase + len(chunk)) % keyLength
+
+        return len(data)
+
+    def update(self, data):
+        """
+        Returns data XORed with the key, continuing
+        from the key phase of the previous call.
+        """
+        output = bytearray(len(data))
+        self.updateInto(output, data)
+
+        return bytes(output)
+
+def xorFile(inputFile, outputFile, key, chunkSize=defaultChunkSize):
+    """
+    XORs the binary file object inputFile with the repeating key,
+    writing the result to the binary file object outputFile.
+    Regular files are memory-mapped, other inputs are read
+    one chunk at a time.
+
+    Inputs:
+    inputFile [binary file object]
+    outputFile [binary file object]
+    key [bytes]
+    chunkSize [int]: Approximate number of bytes processed at a time
+
+    Output:
+    numBytes [int]: Number of bytes processed
+    """
+    cipher = RepeatingKeyXOR(key, chunkSize)
+
+    try:
+        size = os.fstat(inputFile.fileno()).st_size
+        mapped = mmap.mmap(inputFile.fileno(), 0, access=mmap.ACCESS_READ) if size > 0 else None
+    except (OSError, ValueError, AttributeError):
+        mapped = None
+
+    # The output buffer is reused for every chunk
+    outputBuffer = bytearray(cipher.chunkSize)
+
+    if mapped is None:
+        numBytes = 0
+        while True:
+            numRead = inputFile.readinto(outputBuffer)
+            if not numRead:
+                break
+            cipher.updateInto(outputBuffer, memoryview(outputBuffer)[:numRead])
+            outputFile.write(memoryview(outputBuffer)[:numRead])
+            numBytes += numRead
+
+        return numBytes
+
+    # Chunks of a whole number of keys all start at key phase 0
+    alignedChunkSize = max(1, cipher.chunkSize // len(key)) * len(key)
+    if alignedChunkSize > len(outputBuffer):
+        outputBuffer = bytearray(alignedChunkSize)
+
+    with mapped, memoryview(mapped) as mappedView, memoryview(outputBuffer) as outputView:
+        for start in range(0, len(mappedView), alignedChunkSize):
+            chunk = mappedView[start:start+alignedChunkSize]
+            cipher.updateInto(outputView, chunk)
+            outputFile.write(outputView[:len(chunk)])
+            chunk.release()
+
+        return len(mappedView)
+
+def main(arguments=None):
+    """
+    Command-line entry point.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt a file with repeating-key XOR.")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    keyGroup = parser.add_mutually_exclusive_group(required=True)
+    keyGroup.add_argument("--key", help="Key as text (UTF-8)")
+    keyGroup.add_argument("--key-hex", help="Key as hexadecimal")
+    parser.add_argument("--chunk-size", type=int, default=defaultChunkSize, help="Bytes per chunk (default: %i)" % defaultChunkSize)
+    arguments = parser.parse_args(arguments)
+
+    key = arguments.key.encode() if arguments.key is not None else bytes.fromhex(arguments.key_hex)
+
+    inputFile = sys.stdin.buffer if arguments.input == "-" else open(arguments.input, "rb")
+    outputFile = sys.stdout.buffer if arguments.output is None else open(arguments.output, "wb")
+
+    try:
+        startTime = time.perf_counter()
+        numBytes = xorFile(inputFile, outputFile, key, arguments.chunk_size)
+        outputFile.flush()
+        elapsedTime = time.perf_counter() - startTime
+    finally:
+        if inputFile is not sys.stdin.buffer:
+            inputFile.close()
+        if outputFile is not sys.stdout.buffer:
+            outputFile.close()
+
+    print("%i bytes in %.3f s (%.1f MB/s)" % (numBytes, elapsedTime, numBytes / max(elapsedTime, 1e-9) / 1e6), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Content-addressed on-disk cache of cracking results.
+
+A result is stored under a hash of the ciphertext, the name of
+the algorithm and its parameters, in a subdirectory named after
+the fingerprint of the language model which scored it:
+
+cacheDir/v1/<model fingerprint>/<key>.json
+
+Results scored with another model are never looked up, and all
+results of a model can be dropped at once with invalidate() (e.g.
+after retraining it). The values are stored as JSON, so they must
+only contain dicts, lists, strings and numbers (bytes as hex).
+
+The cache is bounded to maxBytes. A hit touches the file, so
+the modification times order the entries by last use, and the
+least recently used entries are deleted first. Files are written
+under a temporary name and renamed, so several processes can share
+the cache directory. The cache only saves time, so errors while
+writing it (e.g. a read-only or full disk) are ignored.
+
+The challenges only use a cache if the environment variable
+CRYPTOPALS_RESULT_CACHE names its directory (see cacheFromEnvironment()),
+so by default they write nothing to disk.
+
+Usage:
+cache = ResultCache()
+result = crackRepeatingKeyXOR(ciphertext, cache=cache)
+cache.invalidate(model.fingerprint())
+CRYPTOPALS_RESULT_CACHE=~/.cache/cryptopals/results python Challenge6.py
+"""
+
+# Standard library imports
+import hashlib
+import json
+import os
+import shutil
+
+# Default location of the cached results
+defaultCacheDir = os.path.join(os.path.expanduser("~"), ".cache", "cryptopals", "results")
+
+# Default size bound of the cache
+defaultMaxBytes = 2**26
+
+# Increase when the stored results change format, to invalidate old entries
+cacheVersion = 2
+
+# Environment variable with the cache directory of the challenges
+cacheDirVariable = "CRYPTOPALS_RESULT_CACHE"
+
+class ResultCache:
+    """
+    Cache of results, keyed by content hash and model fingerprint.
+
+    Attributes:
+    cacheDir [str]
+    maxBytes [int]: Size bound of all entries together
+    hits [int]: Number of get() calls which found a result
+    misses [int]: Number of get() calls which did not
+    """
+
+    def __init__(self, cacheDir=defaultCacheDir, maxBytes=defaultMaxBytes):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+        # Total size of the entries, counted on the first put()
+        self.totalBytes = None
+
+    def versionDir(self):
+        return os.path.join(self.cacheDir, "v%i" % cacheVersion)
+
+    def key(self, data, algorithm, params=None):
+        """
+        Returns the hash identifying a run of algorithm on data.
+
+        Inputs:
+        data [bytes-like]: The ciphertext
+        algorithm [str]: Name of the algorithm, e.g. "repeatingKeyXOR"
+        params [dict]: Parameters of the run, must be JSON serializable
+
+        Output:
+        key [str]: Hex digest
+        """
+        description = json.dumps([algorithm, params], sort_keys=True)
+
+        keyHash = hashlib.sha256(description.encode())
+        keyHash.update(b"\0")
+        keyHash.update(data)
+
+        return keyHash.hexdigest()
+
+    def path(self, fingerprint, key):
+        return os.path.join(self.versionDir(), fingerprint, key + ".json")
+
+    def get(self, fingerprint, key):
+        """
+        Returns the result stored for key with the model
+        fingerprint, or None if there is none.
+        """
+        path = self.path(fingerprint, key)
+
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+
+        return value
+
+    def put(self, fingerprint, key, value):
+        """
+        Stores a result, then evicts the least recently used
+        entries if the cache is larger than maxBytes.
+
+        Output:
+        stored [bool]: False if the result could not be written
+        """
+        path = self.path(fingerprint, key)
+        temporaryPath = path + ".%i.tmp" % os.getpid()
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporaryPath, "w") as f:
+                json.dump(value, f)
+            size = os.path.getsize(temporaryPath)
+            os.replace(temporaryPath, path)
+        except OSError:
+            try:
+                os.remove(temporaryPath)
+            except OSError:
+                pass
+            return False
+
+        # Other processes may write too, so the running total is
+        # only an estimate, recounted whenever entries are evicted
+        if self.totalBytes is None:
+            self.totalBytes = sum(entrySize for _, entrySize, _ in self.entries())
+        else:
+            self.totalBytes += size
+
+        if self.totalBytes > self.maxBytes:
+            self.evict()
+
+        return True
+
+    def entries(self):
+        """
+        Returns (modification time, size, path) of every entry.
+        """
+        entries = []
+        for directory, _, filenames in os.walk(self.versionDir()):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((status.st_mtime, status.st_size, path))
+
+        return entries
+
+    def evict(self, targetBytes=None):
+        """
+        Deletes the least recently used entries until the cache
+        is at most targetBytes (default: 90% of maxBytes), so that
+        not every put() has to evict.
+        """
+        if targetBytes is None:
+            targetBytes = int(0.9 * self.maxBytes)
+
+        entries = sorted(self.entries())
+        totalBytes = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if totalBytes <= targetBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            totalBytes -= size
+
+        self.totalBytes = totalBytes
+
+    def invalidate(self, fingerprint=None):
+        """
+        Deletes all results of the model fingerprint,
+        or the whole cache if no fingerprint is given.
+        """
+        if fingerprint is None:
+            shutil.rmtree(self.versionDir(), ignore_errors=True)
+        else:
+            shutil.rmtree(os.path.join(self.versionDir(), fingerprint), ignore_errors=True)
+
+        self.totalBytes = None
+
+def cacheFromEnvironment():
+    """
+    Returns a ResultCache in the directory named by the
+    environment variable CRYPTOPALS_RESULT_CACHE, or None
+    if it is not set (no caching).
+    """
+    cacheDir = os.environ.get(cacheDirVariable)
+
+    return ResultCache(os.path.expanduser(cacheDir)) if cacheDir else None
+
+if __name__ == "__main__":
+
+    """
+    Check lookups, model separation and eviction in a
+    temporary directory, and time a repeated cracking run.
+    """
+
+    import tempfile
+    import time
+
+    from LanguageModel import englishModel, sampleEnglishText
+    from RepeatingKeyCracker import crackRepeatingKeyXOR
+    from XORKernel import xorBytes
+
+    with tempfile.TemporaryDirectory() as cacheDir:
+        cache = ResultCache(cacheDir, maxBytes=10000)
+
+        key = cache.key(b"ciphertext", "test", {"k": 5})
+        assert key == cache.key(bytearray(b"ciphertext"), "test", {"k": 5})
+        assert key != cache.key(b"ciphertext", "test", {"k": 4})
+        assert key != cache.key(b"ciphertext", "other", {"k": 5})
+
+        assert cache.get("model1", key) is None
+        cache.put("model1", key, {"key": "494345", "score": 1.5})
+        assert cache.get("model1", key) == {"key": "494345", "score": 1.5}
+        assert cache.get("model2", key) is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+        cache.invalidate("model1")
+        assert cache.get("model1", key) is None
+
+        # Writing is best effort: a directory which cannot be created is not an error
+        blockingFile = os.path.join(cacheDir, "file")
+        open(blockingFile, "w").close()
+        assert ResultCache(os.path.join(blockingFile, "cache")).put("model1", key, {}) is False
+        os.remove(blockingFile)
+
+        # The challenges only cache when asked to
+        os.environ.pop(cacheDirVariable, None)
+        assert cacheFromEnvironment() is None
+        os.environ[cacheDirVariable] = cacheDir
+        assert cacheFromEnvironment().cacheDir == cacheDir
+
+        # Entries of about 1 KB: the first ones are evicted, except the one used recently
+        for i in range(30):
+            cache.put("model1", "entry%02i" % i, "x" * 1000)
+            if i >= 1:
+                cache.get("model1", "entry00")
+            time.sleep(0.01)
+        assert sum(size for _, size, _ in cache.entries()) <= 10000
+        assert cache.get("model1", "entry00") is not None
+        assert cache.get("model1", "entry01") is None
+        assert cache.get("model1", "entry29") is not None
+
+        print("All tests passed.")
+
+        ciphertext = xorBytes(sampleEnglishText() * 20, b"Terminator X: Bring the noise")
+
+        cache = ResultCache(cacheDir)
+        for run in ["Cold", "Warm"]:
+            startTime = time.perf_counter()
+            result = crackRepeatingKeyXOR(ciphertext, processes=1, cache=cache)
+            print("%s run: %.4f s, key %r" % (run, time.perf_counter() - startTime, result.key))
+
+        # After invalidating the model, the run is a miss again
+        cache.invalidate(englishModel().fingerprint())
+        misses = cache.misses
+        crackRepeatingKeyXOR(ciphertext, processes=1, cache=cache)
+        assert cache.misses == misses + 1
@@ -0,0 +1,155 @@
+"""
+Breaking many short ciphertexts encrypted with the same
+repeating (or single-byte) XOR key.
+
+Each message on its own is too short to crack, but every message
+starts at the first byte of the key, so byte i of every message
+is XORed with the same key byte (i % keysize). The messages are
+aligned by key phase and their column histograms are merged into
+one histogram per key position (see OnlineCracker.feedMessages()),
+which is then solved once per column.
+
+The messages are streamed in batches of about batchSize bytes,
+so the corpus is never held in memory, and the cost grows with
+the total number of bytes rather than the number of messages.
+
+Usage:
+python SharedKeyBatch.py messages.txt
+python SharedKeyBatch.py messages.b64 --encoding base64 --max-keysize 16
+"""
+
+# Standard library imports
+import base64
+import sys
+from collections import namedtuple
+
+# Custom imports
+from KeyPruning import printableKeys, printableMask
+from OnlineCracker import OnlineCracker
+
+# Result of a batch run:
+# key [bytes]: The most likely key
+# ranking [list of KeysizeEstimator.KeysizeCandidate]: Keysizes, best first
+# numMessages [int]: Number of messages used
+# numBytes [int]: Total length of the messages
+# numInvalid [int]: Number of lines which could not be decoded
+SharedKeyResult = namedtuple("SharedKeyResult", ["key", "ranking", "numMessages", "numBytes", "numInvalid"])
+
+# Default number of bytes counted at a time
+defaultBatchSize = 2**20
+
+def decodeLines(lines, encoding="hex", invalid=None):
+    """
+    Generator which decodes one message per line, skipping
+    empty lines and lines which are not valid.
+
+    Inputs:
+    lines [iterable of str or bytes]
+    encoding [str]: "hex" or "base64"
+    invalid [list]: If given, the numbers of the invalid lines are appended to it
+    """
+    if encoding == "hex":
+        decode = lambda line: bytes.fromhex(line.decode('ascii') if isinstance(line, bytes) else line)
+    elif encoding == "base64":
+        decode = lambda line: base64.b64decode(line, validate=True)
+    else:
+        raise ValueError("Unknown encoding: %s" % encoding)
+
+    for lineNumber, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        # binascii.Error and UnicodeDecodeError are ValueErrors too
+        try:
+            message = decode(line)
+        except ValueError:
+            if invalid is not None:
+                invalid.append(lineNumber)
+            continue
+
+        yield message
+
+def crackSharedKey(messages, keysizes=range(1, 41), batchSize=defaultBatchSize, model=None, allowedMask=printableMask, keys=printableKeys, encoding=None):
+    """
+    Finds the key shared by many messages, each encrypted
+    with repeating-key XOR from the first byte of the key.
+
+    Inputs:
+    messages [iterable of bytes-like]: May be a generator, or lines of text if encoding is given
+    keysizes [iterable of ints]: Candidate keysizes (1 for a single-byte key)
+    batchSize [int]: Approximate number of bytes counted at a time
+    model [LanguageModel]: Unigram model, defaults to LanguageModel.englishModel()
+    allowedMask [int]: 256-bit mask of the allowed plaintext bytes, or None (see KeyPruning)
+    keys [iterable of ints]: Candidate key bytes (default: printable ASCII)
+    encoding [str]: If given, "hex" or "base64": messages are decoded with decodeLines(),
+                    and the lines which are not valid are counted in the result
+
+    Output:
+    result [SharedKeyResult]
+    """
+    invalid = []
+    if encoding is not None:
+        messages = decodeLines(messages, encoding, invalid)
+
+    cracker = OnlineCracker(keysizes, model, allowedMask, keys)
+
+    numMessages = 0
+    batch = []
+    batchBytes = 0
+
+    for message in messages:
+        batch.append(message)
+        batchBytes += len(message)
+        numMessages += 1
+
+        if batchBytes >= batchSize:
+            cracker.feedMessages(batch)
+            batch = []
+            batchBytes = 0
+
+    cracker.feedMessages(batch)
+
+    return SharedKeyResult(cracker.bestKey(), cracker.rankKeysizes(), numMessages, cracker.numBytes, len(invalid))
+
+def main(arguments=None):
+    """
+    Command-line entry point.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find the repeating XOR key shared by many short messages, one per line.")
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("--encoding", choices=["hex", "base64"], default="hex", help="Encoding of the lines (default: hex)")
+    parser.add_argument("--max-keysize", type=int, default=40, help="Largest keysize to consider (default: 40)")
+    parser.add_argument("--batch-size", type=int, default=defaultBatchSize, help="Bytes counted at a time (default: %i)" % defaultBatchSize)
+    parser.add_argument("--all-bytes", action="store_true", help="Allow any plaintext and key bytes, not only printable ones")
+    arguments = parser.parse_args(arguments)
+
+    inputFile = sys.stdin.buffer if arguments.input == "-" else open(arguments.input, "rb")
+
+    try:
+        result = crackSharedKey(inputFile,
+                                range(1, arguments.max_keysize + 1),
+                                arguments.batch_size,
+                                allowedMask=None if arguments.all_bytes else printableMask,
+                                keys=range(256) if arguments.all_bytes else printableKeys,
+                                encoding=arguments.encoding)
+    finally:
+        if inputFile is not sys.stdin.buffer:
+            inputFile.close()
+
+    print("%i messages, %i bytes (%i invalid lines skipped)" % (result.numMessages, result.numBytes, result.numInvalid), file=sys.stderr)
+
+    if result.key is None:
+        print("Not enough data to find a key", file=sys.stderr)
+        return 1
+
+    print("Keysizes: " + ", ".join("%i (%.1f)" % (candidate.keysize, candidate.confidence) for candidate in result.ranking[:5]), file=sys.stderr)
+    print("Key (hex): %s" % result.key.hex())
+    print("Key: %r" % result.key)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Process pool shared by the detectors and crackers.
+
+mapChunks() applies a function to chunks of work, either in the
+current process or on a process pool, and yields the results as
+they become available. Only a bounded number of chunks is read
+ahead of the results, so the chunks can come from a generator
+over an input of any size.
+
+The pool (and multiprocessing) is only imported when more than
+one process is used, so importing this module stays cheap.
+
+Usage:
+for result in mapChunks(scoreChunk, iterateChunks(lines, 1000), processes=4):
+    ...
+"""
+
+# Standard library imports
+import os
+
+def numProcesses(processes=None):
+    """
+    Returns the number of processes to use: processes,
+    or the number of CPUs if it is None.
+    """
+    if processes is None:
+        return os.cpu_count() or 1
+
+    return processes
+
+def mapChunks(function, chunks, processes=None, maxPending=None, lookup=None):
+    """
+    Generator which applies function to each chunk, yielding
+    the results as they become available (not in order).
+    With more than one process, the chunks are spread over a
+    process pool, and at most maxPending chunks (default: twice
+    the number of processes) are read ahead of the results.
+    When the generator is closed early, the chunks which have
+    not started yet are cancelled.
+
+    If lookup is given, it is called on each chunk first, in this
+    process. When it returns a result other than None (e.g. from
+    a cache), that result is yielded at once, and function is not
+    applied to the chunk.
+    """
+    processes = numProcesses(processes)
+
+    if processes <= 1:
+        for chunk in chunks:
+            result = lookup(chunk) if lookup is not None else None
+            yield result if result is not None else function(chunk)
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    maxPending = maxPending or 2 * processes
+
+    executor = ProcessPoolExecutor(processes)
+    try:
+        pending = set()
+        for chunk in chunks:
+            if lookup is not None:
+                result = lookup(chunk)
+                if result is not None:
+                    yield result
+                    continue
+
+            pending.add(executor.submit(function, chunk))
+            if len(pending) >= maxPending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
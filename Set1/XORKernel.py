@@ -0,0 +1,197 @@
+"""
+XOR kernel shared by the XOR functions in the challenges.
+
+Works on any object supporting the buffer protocol
+(bytes, bytearray, memoryview, mmap, NumPy arrays, ...),
+and writes the result into a caller-supplied output buffer,
+which may be the input buffer itself.
+
+Three modes are chosen from the length of the key:
+- Equal length: len(key) == len(data), byte i of data is XORed with byte i of key
+- Single byte: len(key) == 1, every byte of data is XORed with the key byte
+- Repeating key: otherwise, the key is repeated over data (repeated-key XOR)
+
+The data is processed in chunks, so that no more than a few chunks
+of temporary memory are used. With NumPy, each chunk is a single
+vectorized operation. Without NumPy, and for inputs too short to
+be worth importing it, each chunk is XORed as one big integer (or
+with bytes.translate() for a single-byte key), so the interpreter
+never loops over individual bytes.
+"""
+
+# Standard library imports
+from functools import lru_cache
+
+# Custom imports
+from LazyNumPy import loadNumpy
+
+# Number of bytes processed at a time
+chunkSize = 2**20
+
+# Inputs shorter than this never use (or import) NumPy
+numpyMinLength = 2**14
+
+def xorInto(output, data, key, keyOffset=0):
+    """
+    Computes data XOR key, and writes the result into output.
+
+    Inputs:
+    output [writable buffer]: At least len(data) bytes, can be data itself
+    data [buffer]
+    key [buffer]: Same length as data, one byte or a repeating key
+    keyOffset [int]: Position in the repeating key of the first byte of data
+
+    Returns:
+    output
+    """
+    dataView = memoryview(data).cast('B')
+    keyView = memoryview(key).cast('B')
+    outputView = memoryview(output).cast('B')
+
+    dataLength = len(dataView)
+
+    if len(outputView) < dataLength:
+        raise ValueError("Output buffer is shorter than the input")
+
+    if len(keyView) == 0:
+        raise ValueError("Key is empty")
+
+    if len(keyView) == dataLength and keyOffset % dataLength == 0:
+        xorEqualLength(outputView, dataView, keyView)
+    elif len(keyView) == 1:
+        xorSingleByte(outputView, dataView, keyView[0])
+    else:
+        xorRepeatingKey(outputView, dataView, keyView, keyOffset)
+
+    return output
+
+def xorBytes(data, key, keyOffset=0):
+    """
+    Computes data XOR key, returning a new bytes object.
+    See xorInto() for the modes.
+    """
+    output = bytearray(len(memoryview(data).cast('B')))
+
+    return bytes(xorInto(output, data, key, keyOffset))
+
+def xorEqualLength(outputView, dataView, keyView):
+    """
+    XORs two equal-length buffers, one chunk at a time.
+    """
+    for start in range(0, len(dataView), chunkSize):
+        end = start + chunkSize
+        xorChunk(outputView[start:end], dataView[start:end], keyView[start:end])
+
+def xorSingleByte(outputView, dataView, keyByte):
+    """
+    XORs every byte of the buffer with keyByte, one chunk at a time.
+    """
+    numpy = loadNumpy() if len(dataView) >= numpyMinLength else None
+
+    if numpy is not None:
+        for start in range(0, len(dataView), chunkSize):
+            end = start + chunkSize
+            dataArray = numpy.frombuffer(dataView[start:end], dtype=numpy.uint8)
+            outputArray = numpy.frombuffer(outputView[start:end], dtype=numpy.uint8)
+            numpy.bitwise_xor(dataArray, keyByte, out=outputArray[:len(dataArray)])
+        return
+
+    table = xorTranslationTable(keyByte)
+    for start in range(0, len(dataView), chunkSize):
+        chunk = dataView[start:start+chunkSize].tobytes().translate(table)
+        outputView[start:start+len(chunk)] = chunk
+
+def xorRepeatingKey(outputView, dataView, keyView, keyOffset):
+    """
+    XORs the buffer with a repeating key, starting at position
+    keyOffset in the key. The key, rotated to start at keyOffset,
+    is tiled once into a keystream of about chunkSize bytes.
+    The keystream is a whole number of keys long, so the
+    same keystream lines up with every chunk.
+    """
+    keyLength = len(keyView)
+    keyOffset = keyOffset % keyLength
+    key = keyView.tobytes()
+    key = key[keyOffset:] + key[:keyOffset]
+
+    keystreamLength = max(1, min(chunkSize, len(dataView)) // keyLength) * keyLength
+    keystream = memoryview(key * (keystreamLength // keyLength))
+
+    for start in range(0, len(dataView), keystreamLength):
+        end = start + keystreamLength
+        dataChunk = dataView[start:end]
+        xorChunk(outputView[start:end], dataChunk, keystream[:len(dataChunk)])
+
+def xorChunk(outputView, dataView, keyView):
+    """
+    XORs two equal-length chunks into outputView.
+    """
+    chunkLength = len(dataView)
+
+    numpy = loadNumpy() if chunkLength >= numpyMinLength else None
+
+    if numpy is not None:
+        dataArray = numpy.frombuffer(dataView, dtype=numpy.uint8)
+        keyArray = numpy.frombuffer(keyView, dtype=numpy.uint8)
+        outputArray = numpy.frombuffer(outputView, dtype=numpy.uint8)
+        numpy.bitwise_xor(dataArray, keyArray, out=outputArray[:chunkLength])
+        return
+
+    result = int.from_bytes(dataView, 'little') ^ int.from_bytes(keyView, 'little')
+    outputView[:chunkLength] = result.to_bytes(chunkLength, 'little')
+
+@lru_cache(maxsize=256)
+def xorTranslationTable(keyByte):
+    """
+    Translation table for bytes.translate(),
+    mapping each byte b to b XOR keyByte.
+    """
+    return bytes(b ^ keyByte for b in range(256))
+
+if __name__ == "__main__":
+
+    """
+    Test the three modes against a byte-by-byte reference,
+    and compare the throughput on 100 MB to copying the buffer.
+    """
+
+    import os
+    import time
+
+    def referenceXOR(data, key, keyOffset=0):
+        return bytes(data[i] ^ key[(i + keyOffset) % len(key)] for i in range(len(data)))
+
+    for length in [0, 1, 2, 15, 16, 17, 1000, numpyMinLength - 1, numpyMinLength]:
+        data = os.urandom(length)
+        for key in [b'\x35', b'ICE', os.urandom(16), os.urandom(length) or b'\x00']:
+            for keyOffset in [0, 1, 5]:
+                assert xorBytes(data, key, keyOffset) == referenceXOR(data, key, keyOffset)
+
+        # In place
+        buffer = bytearray(data)
+        xorInto(buffer, buffer, b'ICE')
+        assert buffer == referenceXOR(data, b'ICE')
+
+    # Chunk boundaries, with a key length which does not divide chunkSize
+    data = os.urandom(3 * chunkSize + 7)
+    key = os.urandom(7)
+    keystream = (key * (len(data) // len(key) + 2))[3:3+len(data)]
+    assert xorBytes(data, key, 3) == xorBytes(data, keystream)
+
+    print("All tests passed.")
+
+    size = 100 * 2**20
+    data = os.urandom(size)
+    output = bytearray(size)
+
+    output[:] = data # Touch the output pages before timing
+    startTime = time.perf_counter()
+    output[:] = data
+    copyTime = time.perf_counter() - startTime
+    print("Copy:           %8.1f MB/s" % (size / copyTime / 1e6))
+
+    for name, key in [("Equal length:", os.urandom(size)), ("Single byte:", b'\x35'), ("Repeating key:", b'ICE')]:
+        startTime = time.perf_counter()
+        xorInto(output, data, key)
+        xorTime = time.perf_counter() - startTime
+        print("%-15s %8.1f MB/s" % (name, size / xorTime / 1e6))
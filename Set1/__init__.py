@@ -0,0 +1,87 @@
+"""
+Solutions to the Cryptopals challenges in set 1, as a package.
+
+The modules import each other by their plain names (e.g.
+"from XORKernel import xorBytes"), so this directory is added
+to sys.path. The functions below are re-exported lazily:
+importing the package imports none of the modules, and each
+module is imported on first access of one of its names.
+
+Usage:
+import Set1
+Set1.repeatedKeyXOR("Burning 'em", "ICE")
+from Set1 import editDistance, crackRepeatingKeyXOR
+"""
+
+# Standard library imports
+import importlib
+import os
+import sys
+
+directory = os.path.dirname(os.path.abspath(__file__))
+if directory not in sys.path:
+    sys.path.append(directory)
+
+# Exported name: module it is defined in
+exports = {
+    # Challenges
+    "hex2base64": "Challenge1",
+    "fixedXOR": "Challenge2",
+    "decodeHexStringToASCII": "Challenge3",
+    "repeatedKeyXOR": "Challenge5",
+    "editDistance": "Challenge6",
+    "compareToEnglish": "Challenge6",
+    "aesDecrypt": "Challenge7",
+    "ecbEncryptor": "CipherContext",
+    "ecbDecryptor": "CipherContext",
+    "blockSize": "CipherContext",
+    "checkBlocks": "CipherContext",
+    "CipherContextCache": "CipherContext",
+    "findIdenticalBlocks": "Challenge8",
+    # XOR and encodings
+    "xorBytes": "XORKernel",
+    "xorInto": "XORKernel",
+    "RepeatingKeyXOR": "RepeatingKeyXORFile",
+    "xorFile": "RepeatingKeyXORFile",
+    "Base64Encoder": "Base64Stream",
+    "Base64Decoder": "Base64Stream",
+    "decodeHexRecords": "BatchCodec",
+    "loadNumpy": "LazyNumPy",
+    # Scoring
+    "englishModel": "LanguageModel",
+    "trainModel": "LanguageModel",
+    "rankSingleByteKeys": "HistogramScorer",
+    "printableMask": "KeyPruning",
+    "printableKeys": "KeyPruning",
+    "pruneSingleByteKeys": "KeyPruning",
+    "topK": "Ranking",
+    "TopK": "Ranking",
+    # Breaking XOR
+    "hammingDistance": "Hamming",
+    "hammingDistances": "Hamming",
+    "estimateKeysizesHamming": "KeysizeEstimator",
+    "estimateKeysizesCoincidence": "KeysizeEstimator",
+    "estimateKeysizesKasiski": "KeysizeEstimator",
+    "detectSingleByteXOR": "Detector",
+    "crackRepeatingKeyXOR": "RepeatingKeyCracker",
+    "OnlineCracker": "OnlineCracker",
+    "crackSharedKey": "SharedKeyBatch",
+    "ResultCache": "ResultCache",
+}
+
+__all__ = sorted(exports)
+
+def __getattr__(name):
+    """
+    Imports the module defining name on first access.
+    """
+    if name not in exports:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    value = getattr(importlib.import_module(exports[name]), name)
+    globals()[name] = value # Later accesses skip __getattr__
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(exports))
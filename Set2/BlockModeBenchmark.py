@@ -0,0 +1,338 @@
+"""
+Throughput of the block cipher modes in Challenge10, for
+inputs from 1 KB up to --max-size (default 1 GB).
+
+The bulk functions are compared to encrypting one block at a
+time with ECBEncryptSingleBlock(), as ECBEncrypt() used to do.
+The per-block loop is only timed up to --per-block-max-size,
+as it is too slow for the largest inputs. Where both run, their
+outputs are checked to match byte for byte.
+
+CBC decryption is timed on one thread and on --threads threads
+(default: the number of CPUs). The ciphertexts are made with
+the CBC mode of the cryptography package, which also checks
+the results.
+
+CBC encryption is serial, so it is only timed up to
+--per-block-max-size. CBCEncrypt() is compared to the per-block
+loop it replaced, to XORing into a reused scratch block with
+NumPy, to XORing each block as one 128-bit int, and to a bare
+AES call per block (the lower bound).
+
+Usage:
+python BlockModeBenchmark.py
+python BlockModeBenchmark.py --max-size 33554432
+python BlockModeBenchmark.py --mode cbc-decrypt --threads 8
+python BlockModeBenchmark.py --mode cbc-encrypt
+"""
+
+# Standard library imports
+import os
+import time
+
+# Third party imports
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+# Custom imports
+import Set1Package
+from Challenge9 import PKCS7pad, PKCS7unpad
+from Challenge10 import (CBCDecrypt, CBCDecryptInto, CBCEncrypt, CBCEncryptInto, ECBDecrypt, ECBDecryptInto, ECBDecryptSingleBlock,
+                         ECBEncrypt, ECBEncryptInto, ECBEncryptSingleBlock, bitwiseXOR, blockSize, ecbEncryptor)
+from Set1 import loadNumpy
+
+def perBlockECBEncrypt(plaintext, key):
+    """
+    ECB encryption one block at a time,
+    as a reference for the bulk functions.
+    """
+    paddedPlaintext = PKCS7pad(plaintext, blockSize)
+
+    ciphertext = bytearray()
+    for i in range(0, len(paddedPlaintext), blockSize):
+        ciphertext += ECBEncryptSingleBlock(paddedPlaintext[i:i+blockSize], key)
+
+    return bytes(ciphertext)
+
+def perBlockCBCDecrypt(ciphertext, key, iv):
+    """
+    CBC decryption one block at a time,
+    as a reference for the bulk functions.
+    """
+    plaintext = bytearray()
+    previousBlock = iv
+    for i in range(0, len(ciphertext), blockSize):
+        ciphertextBlock = ciphertext[i:i+blockSize]
+        plaintext += bitwiseXOR(ECBDecryptSingleBlock(ciphertextBlock, key), previousBlock)
+        previousBlock = ciphertextBlock
+
+    return PKCS7unpad(plaintext, blockSize)
+
+def perBlockCBCEncrypt(plaintext, key, iv):
+    """
+    CBC encryption one block at a time, as CBCEncrypt()
+    used to do: slice, XOR through bitwiseXOR(), encrypt
+    and append.
+    """
+    paddedPlaintext = PKCS7pad(plaintext, blockSize)
+
+    ciphertext = bytearray()
+    previousBlock = iv
+    for i in range(0, len(paddedPlaintext), blockSize):
+        previousBlock = ECBEncryptSingleBlock(bitwiseXOR(previousBlock, paddedPlaintext[i:i+blockSize]), key)
+        ciphertext += previousBlock
+
+    return bytes(ciphertext)
+
+def scratchBlockCBCEncrypt(plaintext, key, iv):
+    """
+    CBC encryption XORing each block into a reused 16 byte
+    scratch array with NumPy, and encrypting from it straight
+    into a preallocated output.
+    """
+    numpy = loadNumpy()
+    paddedPlaintext = numpy.frombuffer(PKCS7pad(plaintext, blockSize), dtype=numpy.uint8)
+
+    # update_into() needs 15 bytes more than the input
+    ciphertext = bytearray(len(paddedPlaintext) + blockSize)
+    ciphertextView = memoryview(ciphertext)
+    ciphertextArray = numpy.frombuffer(ciphertext, dtype=numpy.uint8)
+
+    scratchBlock = numpy.empty(blockSize, dtype=numpy.uint8)
+    encryptInto = ecbEncryptor(key).update_into
+
+    previousBlock = numpy.frombuffer(iv, dtype=numpy.uint8)
+    for i in range(0, len(paddedPlaintext), blockSize):
+        numpy.bitwise_xor(paddedPlaintext[i:i+blockSize], previousBlock, out=scratchBlock)
+        encryptInto(scratchBlock, ciphertextView[i:])
+        previousBlock = ciphertextArray[i:i+blockSize]
+
+    return ciphertextView[:len(paddedPlaintext)].tobytes()
+
+def intBlockCBCEncrypt(plaintext, key, iv):
+    """
+    CBC encryption XORing each block as one 128-bit int,
+    and writing each ciphertext block into a preallocated
+    output, as CBCEncryptBlocks() used to do.
+    """
+    paddedPlaintext = PKCS7pad(plaintext, blockSize)
+    ciphertext = bytearray(len(paddedPlaintext))
+
+    encrypt = ecbEncryptor(key).update
+    fromBytes = int.from_bytes
+
+    previousBlockInt = fromBytes(iv, 'big')
+    for i in range(0, len(paddedPlaintext), blockSize):
+        previousBlock = encrypt((fromBytes(paddedPlaintext[i:i+blockSize], 'big') ^ previousBlockInt).to_bytes(blockSize, 'big'))
+        ciphertext[i:i+blockSize] = previousBlock
+        previousBlockInt = fromBytes(previousBlock, 'big')
+
+    return bytes(ciphertext)
+
+def aesOnly(plaintext, key):
+    """
+    One AES call per block and nothing else,
+    the lower bound for CBC encryption in Python.
+    """
+    encrypt = ecbEncryptor(key).update
+    block = bytes(blockSize)
+    for _ in range(len(plaintext) // blockSize + 1):
+        encrypt(block)
+
+def referenceCBCEncrypt(plaintext, key, iv):
+    """
+    CBC encryption with the cryptography package.
+    """
+    encryptor = Cipher(algorithm=algorithms.AES(key), mode=modes.CBC(iv), backend=default_backend()).encryptor()
+
+    return encryptor.update(PKCS7pad(plaintext, blockSize)) + encryptor.finalize()
+
+def bestTime(function, minTime=0.2, maxRepeats=5):
+    """
+    Runs function until it has run for minTime seconds (at
+    least once, at most maxRepeats times), returns the best
+    time and the last result.
+    """
+    times = []
+    while not times or (sum(times) < minTime and len(times) < maxRepeats):
+        startTime = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - startTime)
+
+    return min(times), result
+
+def formatSize(size):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024 or unit == "GB":
+            return "%i %s" % (size, unit)
+        size //= 1024
+
+def benchmarkECB(sizes, perBlockMaxSize):
+    """
+    Prints the throughput (MB/s) of ECB encryption and decryption
+    for each size: per block, bulk returning bytes, and bulk
+    into preallocated buffers. At most four buffers of the
+    largest size are alive at a time.
+    """
+    key = os.urandom(16)
+    data = os.urandom(max(sizes))
+    dataView = memoryview(data)
+
+    # Buffer for the largest size, reused for the smaller ones
+    ciphertextBuffer = bytearray(max(sizes) + blockSize)
+    ciphertextView = memoryview(ciphertextBuffer)
+
+    print("%8s %12s %12s %12s %12s %12s" % ("Size", "Per block", "Encrypt", "Enc. into", "Decrypt", "Dec. into"))
+
+    for size in sizes:
+        plaintext = dataView[:size]
+        megabytes = size / 2**20
+
+        encryptIntoTime, length = bestTime(lambda: ECBEncryptInto(plaintext, key, ciphertextBuffer))
+        ciphertext = ciphertextView[:length]
+
+        perBlock = "-"
+        if size <= perBlockMaxSize:
+            elapsedTime, reference = bestTime(lambda: perBlockECBEncrypt(plaintext, key))
+            assert reference == ciphertext
+            perBlock = "%.1f" % (megabytes / elapsedTime)
+            del reference
+
+        encryptTime, encrypted = bestTime(lambda: ECBEncrypt(plaintext, key))
+        assert encrypted == ciphertext
+        del encrypted
+
+        decryptTime, decrypted = bestTime(lambda: ECBDecrypt(ciphertext, key))
+        assert decrypted == plaintext
+        del decrypted
+
+        plaintextBuffer = bytearray(length)
+        decryptIntoTime, decryptedLength = bestTime(lambda: ECBDecryptInto(ciphertext, key, plaintextBuffer))
+        assert decryptedLength == size and plaintextBuffer[:size] == plaintext
+        del plaintextBuffer
+
+        ciphertext.release()
+
+        print("%8s %12s %12.1f %12.1f %12.1f %12.1f" % (formatSize(size), perBlock,
+                                                      megabytes / encryptTime, megabytes / encryptIntoTime,
+                                                      megabytes / decryptTime, megabytes / decryptIntoTime))
+
+def benchmarkCBCDecrypt(sizes, perBlockMaxSize, threads):
+    """
+    Prints the throughput (MB/s) of CBC decryption for each
+    size: per block, on one thread, and on threads threads,
+    into a preallocated buffer.
+    """
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    data = os.urandom(max(sizes))
+    dataView = memoryview(data)
+
+    plaintextBuffer = bytearray(max(sizes) + blockSize)
+
+    print("%8s %12s %12s %12s %12s" % ("Size", "Per block", "Decrypt", "1 thread", "%i threads" % threads))
+
+    for size in sizes:
+        plaintext = dataView[:size]
+        megabytes = size / 2**20
+        ciphertext = referenceCBCEncrypt(plaintext, key, iv)
+
+        perBlock = "-"
+        if size <= perBlockMaxSize:
+            elapsedTime, reference = bestTime(lambda: perBlockCBCDecrypt(ciphertext, key, iv))
+            assert reference == plaintext
+            perBlock = "%.1f" % (megabytes / elapsedTime)
+            del reference
+
+        decryptTime, decrypted = bestTime(lambda: CBCDecrypt(ciphertext, key, iv))
+        assert decrypted == plaintext
+        del decrypted
+
+        oneThreadTime, length = bestTime(lambda: CBCDecryptInto(ciphertext, key, iv, plaintextBuffer, threads=1))
+        assert length == size and plaintextBuffer[:size] == plaintext
+
+        threadsTime, length = bestTime(lambda: CBCDecryptInto(ciphertext, key, iv, plaintextBuffer, threads=threads))
+        assert length == size and plaintextBuffer[:size] == plaintext
+        del ciphertext
+
+        print("%8s %12s %12.1f %12.1f %12.1f" % (formatSize(size), perBlock,
+                                               megabytes / decryptTime, megabytes / oneThreadTime, megabytes / threadsTime))
+
+def benchmarkCBCEncrypt(sizes):
+    """
+    Prints the throughput (MB/s) of CBC encryption for each
+    size: per block as before, with a NumPy scratch block,
+    with 128-bit ints, CBCEncrypt(), CBCEncryptInto() and
+    AES alone.
+    """
+    key = os.urandom(16)
+    iv = os.urandom(16)
+    data = os.urandom(max(sizes))
+    dataView = memoryview(data)
+
+    ciphertextBuffer = bytearray(max(sizes) + blockSize)
+
+    print("%8s %12s %12s %12s %12s %12s %12s" % ("Size", "Per block", "Scratch", "128-bit int", "Encrypt", "Enc. into", "AES only"))
+
+    for size in sizes:
+        plaintext = dataView[:size]
+        megabytes = size / 2**20
+        reference = referenceCBCEncrypt(plaintext, key, iv)
+
+        perBlockTime, ciphertext = bestTime(lambda: perBlockCBCEncrypt(plaintext, key, iv))
+        assert ciphertext == reference
+
+        scratch = "-"
+        if loadNumpy() is not None:
+            scratchTime, ciphertext = bestTime(lambda: scratchBlockCBCEncrypt(plaintext, key, iv))
+            assert ciphertext == reference
+            scratch = "%.1f" % (megabytes / scratchTime)
+
+        intBlockTime, ciphertext = bestTime(lambda: intBlockCBCEncrypt(plaintext, key, iv))
+        assert ciphertext == reference
+
+        encryptTime, ciphertext = bestTime(lambda: CBCEncrypt(plaintext, key, iv))
+        assert ciphertext == reference
+        del ciphertext
+
+        encryptIntoTime, length = bestTime(lambda: CBCEncryptInto(plaintext, key, iv, ciphertextBuffer))
+        assert ciphertextBuffer[:length] == reference
+
+        aesTime, _ = bestTime(lambda: aesOnly(plaintext, key))
+
+        print("%8s %12.1f %12s %12.1f %12.1f %12.1f %12.1f" % (formatSize(size), megabytes / perBlockTime, scratch, megabytes / intBlockTime,
+                                                             megabytes / encryptTime, megabytes / encryptIntoTime, megabytes / aesTime))
+
+def main(arguments=None):
+    """
+    Command-line entry point.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure the throughput (MB/s) of the block cipher modes.")
+    parser.add_argument("--max-size", type=int, default=2**30, help="Largest input in bytes (default: 1 GB)")
+    parser.add_argument("--per-block-max-size", type=int, default=2**25, help="Largest input timed one block at a time (default: 32 MB)")
+    parser.add_argument("--mode", choices=["all", "ecb", "cbc-decrypt", "cbc-encrypt"], default="all", help="Mode to time (default: all)")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Threads for CBC decryption (default: number of CPUs)")
+    arguments = parser.parse_args(arguments)
+
+    sizes = []
+    size = 2**10
+    while size <= arguments.max_size:
+        sizes.append(size)
+        size *= 32
+
+    if arguments.mode in ("all", "ecb"):
+        print("ECB mode, MB/s:")
+        benchmarkECB(sizes, arguments.per_block_max_size)
+
+    if arguments.mode in ("all", "cbc-decrypt"):
+        print("CBC decryption, MB/s:")
+        benchmarkCBCDecrypt(sizes, arguments.per_block_max_size, arguments.threads)
+
+    if arguments.mode in ("all", "cbc-encrypt"):
+        print("CBC encryption, MB/s:")
+        benchmarkCBCEncrypt([size for size in sizes if size <= arguments.per_block_max_size])
+
+if __name__ == "__main__":
+    main()
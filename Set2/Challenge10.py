@@ -9,38 +9,53 @@ Challenge website: https://cryptopals.com/sets/2/challenges/10
 """
 
 # Standard library imports
+import atexit
 import base64
 import os
-from math import floor
-
-# Third party imports
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Custom imports
-from Challenge9 import PKCS7padder, PKCS7unpadder
+import Set1Package
+from Challenge9 import PKCS7pad, PKCS7paddingLength
+
+# The XOR kernel and the cipher contexts are shared with the solutions in set 1
+from Set1 import blockSize, checkBlocks, ecbDecryptor, ecbEncryptor, xorBytes, xorInto
+
+# Ciphertexts longer than this are decrypted in chunks of this size on a thread pool
+parallelChunkSize = 2**22
+
+# A block as two 64-bit halves, XORed as ints in CBC encryption
+blockHalves = struct.Struct("=QQ")
+
+# Number of bytes CBC encryption writes to the output at a time
+encryptBatchSize = 2**16
+
+# Thread pool shared by all calls to CBCDecryptInto(), created on first use
+# with one worker per CPU, and shut down when the interpreter exits
+threadPool = None
+threadPoolSize = os.cpu_count() or 1
+threadPoolLock = threading.Lock()
 
 # Functions
 def bitwiseXOR(bytearray1, bytearray2):
     """
     Computes the bitwise XOR between bytearray1 and bytearray2
     """
-    result = int.from_bytes(bytearray1, 'little') ^ int.from_bytes(bytearray2, 'little')
-    result = result.to_bytes(len(bytearray1), 'little')
-    return result
+    return xorBytes(bytearray1, bytearray2)
 
 def ECBEncryptSingleBlock(plaintext, key):
     """
     Encrypts a plaintext using the key 
     key in AES-ECB mode. Only intended 
     for 16 byte blocks.
+    The encryptor of each key is built once
+    and reused (see CipherContext).
     """
+    checkBlocks(plaintext)
 
-    cipher = Cipher(algorithm=algorithms.AES(key), mode=modes.ECB(), backend=default_backend())
-
-    encryptor = cipher.encryptor()
-
-    ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+    ciphertext = ecbEncryptor(key).update(plaintext)
 
     return ciphertext
 
@@ -49,149 +64,331 @@ def ECBDecryptSingleBlock(ciphertext, key):
     Decrypts a ciphertext using the key 
     key in AES-ECB mode. Only intended 
     for 16 byte blocks.
+    The decryptor of each key is built once
+    and reused (see CipherContext).
     """
+    checkBlocks(ciphertext)
 
-    cipher = Cipher(algorithm=algorithms.AES(key), mode=modes.ECB(), backend=default_backend())
-
-    decryptor = cipher.decryptor()
-
-    decryptedPlaintext = decryptor.update(ciphertext) + decryptor.finalize()
+    decryptedPlaintext = ecbDecryptor(key).update(ciphertext)
 
     return decryptedPlaintext
 
-def ECBEncrypt(plaintext, key):
+def ECBEncryptInto(plaintext, key, output):
     """
     Encrypts a plaintext in Electronic Code Book (ECB)
-    mode using the key key.
-    Calls the ECBEncryptSingleBlock() function for each 
-    16 byte block in the plaintext
+    mode using the key key, writing the ciphertext into
+    output. The plaintext is padded with PKCS#7 once,
+    a whole block of padding is added if its length is
+    a multiple of the block size. All whole blocks are
+    encrypted in a single call to the backend, and only
+    the last (padded) block is copied.
+
+    Inputs:
+    plaintext [bytes-like]
+    key [bytes]
+    output [writable bytes-like]: At least len(plaintext) + 16 bytes
+
+    Output:
+    length [int]: Length of the ciphertext
+    """
+    plaintextView = memoryview(plaintext).cast('B')
+    alignedLength = len(plaintextView) - len(plaintextView) % blockSize
+    length = alignedLength + blockSize
+
+    outputView = memoryview(output).cast('B')
+    if len(outputView) < length:
+        raise ValueError("Output buffer must hold at least %i bytes" % length)
+
+    encryptor = ecbEncryptor(key)
+
+    # update_into() needs 15 bytes more than the input, there are 16
+    encryptor.update_into(plaintextView[:alignedLength], outputView)
+    outputView[alignedLength:length] = encryptor.update(PKCS7pad(plaintextView[alignedLength:], blockSize))
+
+    return length
+
+def ECBDecryptInto(ciphertext, key, output):
     """
+    Decrypts a ciphertext in Electronic Code Book (ECB)
+    mode using the key key, writing the padded plaintext
+    into output. All blocks but the last are decrypted
+    in a single call to the backend. The padding is
+    checked once, on the last block, and raises ValueError
+    if it is not valid PKCS#7 padding.
+
+    Inputs:
+    ciphertext [bytes-like]: A whole, non-zero number of blocks
+    key [bytes]
+    output [writable bytes-like]: At least len(ciphertext) bytes
+
+    Output:
+    length [int]: Length of the plaintext, without padding
+    """
+    ciphertextView = memoryview(ciphertext).cast('B')
+    checkBlocks(ciphertextView)
+    if len(ciphertextView) == 0:
+        raise ValueError("Ciphertext is empty, it must hold at least the padding block")
 
-    blocksize = len(key)
+    outputView = memoryview(output).cast('B')
+    if len(outputView) < len(ciphertextView):
+        raise ValueError("Output buffer must hold at least %i bytes" % len(ciphertextView))
 
-    # This will hold all blocks in the ciphertext
-    ciphertext = bytearray()
+    decryptor = ecbDecryptor(key)
+    lastBlock = len(ciphertextView) - blockSize
 
-    # Loop over the 16 byte blocks in the plaintext
-    for i in range(0, len(plaintext), blocksize):
+    decryptor.update_into(ciphertextView[:lastBlock], outputView)
+    outputView[lastBlock:len(ciphertextView)] = decryptor.update(ciphertextView[lastBlock:])
 
-        plaintextBlock = plaintext[i:i+blocksize]
+    return len(ciphertextView) - PKCS7paddingLength(outputView[lastBlock:len(ciphertextView)], blockSize)
 
-        # For the last block, pad it using PKCS7
-        if len(plaintextBlock) < blocksize:
-            plaintextBlock = PKCS7padder(plaintextBlock, blocksize)
+def ECBEncrypt(plaintext, key):
+    """
+    Encrypts a plaintext in Electronic Code Book (ECB)
+    mode using the key key (see ECBEncryptInto()).
+    The output is always padded, so it is one to 16
+    bytes longer than the plaintext.
+    """
+    ciphertext = bytearray(len(plaintext) - len(plaintext) % blockSize + blockSize)
 
-        # Encrypt the block using AES and append to ciphertext
-        ciphertextBlock = ECBEncryptSingleBlock(plaintextBlock, key)
-        ciphertext += ciphertextBlock
+    ECBEncryptInto(plaintext, key, ciphertext)
 
     return bytes(ciphertext)
 
 def ECBDecrypt(ciphertext, key):
     """
     Decrypts a ciphertext in Electronic Code Book (ECB)
-    mode using the key key.
-    Calls the ECBDecryptSingleBlock() function for each 
-    16 byte block in the plaintext
+    mode using the key key (see ECBDecryptInto()), and
+    removes the padding. Raises ValueError if the
+    padding is not valid.
     """
+    plaintext = bytearray(len(ciphertext))
 
-    blocksize = len(key)
+    length = ECBDecryptInto(ciphertext, key, plaintext)
 
-    # This will hold all blocks in the plaintext
-    plaintext = bytearray()
+    # Removing the padding in place does not copy the plaintext
+    del plaintext[length:]
 
-    # Loop over the 16 byte blocks in the ciphertext
-    for i in range(0, len(ciphertext), blocksize):
+    return bytes(plaintext)
+
+def CBCEncryptInto(plaintext, key, iv, output):
+    """
+    Encrypts a plaintext in Cipher Block Chaining (CBC)
+    mode using the key key and initialization vector iv,
+    writing the ciphertext into output.
+
+    Each block depends on the previous ciphertext block,
+    so the blocks are encrypted one at a time. Everything
+    but the AES call is kept out of the loop: the output is
+    allocated once, the encryptor is built once per key (see
+    CipherContext), and only the last block is padded. The
+    blocks are XORed as two 64-bit ints unpacked with struct,
+    and the ciphertext blocks are joined and written to the
+    output a batch at a time. This is faster than converting
+    each block to a 128-bit int, or XORing into a scratch block
+    with NumPy or XORKernel (see BlockModeBenchmark.py).
+
+    Inputs:
+    plaintext [bytes-like]
+    key [bytes]
+    iv [bytes]: One block
+    output [writable bytes-like]: At least len(plaintext) + 16 bytes
+
+    Output:
+    length [int]: Length of the ciphertext
+    """
+    checkIV(iv)
 
-        ciphertextBlock = ciphertext[i:i+blocksize]
+    plaintextView = memoryview(plaintext).cast('B')
+    alignedLength = len(plaintextView) - len(plaintextView) % blockSize
+    length = alignedLength + blockSize
 
-        # Decrypt the block using AES and append to ciphertext
-        plaintextBlock = ECBDecryptSingleBlock(ciphertextBlock, key)
+    outputView = memoryview(output).cast('B')
+    if len(outputView) < length:
+        raise ValueError("Output buffer must hold at least %i bytes" % length)
 
-        # For the last block, unpad it using PKCS7
-        if len(plaintextBlock) < blocksize:
-            plaintextBlock = PKCS7unpadder(plaintextBlock, blocksize)
+    # For the first plaintext block, the previous block is just the iv
+    previousBlock = CBCEncryptBlocks(plaintextView[:alignedLength], outputView, key, iv)
 
-        plaintext += plaintextBlock
+    # The last block holds the padding, a whole block of it if the plaintext is aligned
+    lastBlock = PKCS7pad(plaintextView[alignedLength:], blockSize)
+    CBCEncryptBlocks(lastBlock, outputView[alignedLength:length], key, previousBlock)
 
-    return bytes(plaintext)
+    return length
 
-def CBCEncrypt(plaintext, key, iv):
+def CBCEncryptBlocks(plaintextView, outputView, key, previousBlock):
     """
-    Encrypts a plaintext in Cipher Block Chaining (CBC)
-    mode using the key key and 
-    initialization vector iv
-    Calls the ECBEncrypt() function for each 
-    16 byte block in the plaintext
+    Encrypts whole blocks in CBC mode into outputView, chained
+    to previousBlock: the iv, or the last ciphertext block of
+    the plaintext before (when encrypting in pieces).
+
+    Inputs:
+    plaintextView [bytes-like]: A whole number of blocks
+    outputView [memoryview]: At least len(plaintextView) bytes
+    key [bytes]
+    previousBlock [bytes]
+
+    Output:
+    previousBlock [bytes]: The last ciphertext block
     """
+    encrypt = ecbEncryptor(key).update
+    pack = blockHalves.pack
+    unpack = blockHalves.unpack
 
-    blocksize = len(key)
+    previousHigh, previousLow = unpack(previousBlock)
 
-    # This will hold all blocks in the ciphertext
-    ciphertext = bytearray()
+    for start in range(0, len(plaintextView), encryptBatchSize):
+        batch = plaintextView[start:start+encryptBatchSize]
 
-    # Loop over the 16 byte blocks in the plaintext
-    for i in range(0, len(plaintext), blocksize):
+        ciphertextBlocks = []
+        append = ciphertextBlocks.append
+        for high, low in blockHalves.iter_unpack(batch):
+            previousBlock = encrypt(pack(high ^ previousHigh, low ^ previousLow))
+            append(previousBlock)
+            previousHigh, previousLow = unpack(previousBlock)
 
-        plaintextBlock = plaintext[i:i+blocksize]
+        outputView[start:start+len(batch)] = b"".join(ciphertextBlocks)
 
-        # For the last block, pad it using PKCS7
-        if len(plaintextBlock) < blocksize:
-            plaintextBlock = PKCS7padder(plaintextBlock, blocksize)
+    return previousBlock
 
-        # For the first plaintext block, the previous block is just the iv
-        if i == 0:
-            previousBlock = iv
+def CBCEncrypt(plaintext, key, iv):
+    """
+    Encrypts a plaintext in Cipher Block Chaining (CBC)
+    mode using the key key and initialization vector iv
+    (see CBCEncryptInto()). The output is always padded,
+    so it is one to 16 bytes longer than the plaintext.
+    """
+    ciphertext = bytearray(len(plaintext) - len(plaintext) % blockSize + blockSize)
 
-        # XOR the iv and plaintext
-        plaintextBlockXORpreviousBlock = bitwiseXOR(previousBlock, plaintextBlock)
+    CBCEncryptInto(plaintext, key, iv, ciphertext)
 
-        # Encrypt the block using AES and append to ciphertext
-        ciphertextBlock = ECBEncryptSingleBlock(plaintextBlockXORpreviousBlock, key)
-        ciphertext += ciphertextBlock
+    return bytes(ciphertext)
 
-        # Update the previous block
-        previousBlock = ciphertextBlock
+def checkIV(iv):
+    """
+    Raises ValueError if iv is not one block long.
+    """
+    if len(iv) != blockSize:
+        raise ValueError("The iv must be %i bytes long" % blockSize)
 
-    return bytes(ciphertext)
+def CBCDecryptBlocks(ciphertextView, outputView, key, iv, start, end):
+    """
+    Decrypts the blocks from byte start to byte end of the
+    ciphertext into the same positions of outputView, without
+    removing the padding. Each plaintext block is the decrypted
+    ciphertext block XOR the previous ciphertext block, so the
+    range only reads one block before start, and ranges can be
+    decrypted independently (and at the same time).
+
+    Inputs:
+    ciphertextView [memoryview]: The whole ciphertext
+    outputView [memoryview]: At least len(ciphertextView) bytes
+    key [bytes]
+    iv [bytes]
+    start [int]: Multiple of the block size
+    end [int]: Multiple of the block size, after start
+    """
+    decryptor = ecbDecryptor(key)
+
+    # update_into() needs 15 bytes more than the input, which
+    # the output only lacks for the last block of the ciphertext
+    intoEnd = min(end, len(ciphertextView) - blockSize)
+    if intoEnd > start:
+        decryptor.update_into(ciphertextView[start:intoEnd], outputView[start:])
+    if intoEnd < end:
+        outputView[intoEnd:end] = decryptor.update(ciphertextView[intoEnd:end])
+
+    # XOR with the ciphertext shifted by one block (the iv for the first block)
+    previousBlock = iv if start == 0 else ciphertextView[start-blockSize:start]
+    xorInto(outputView[start:start+blockSize], outputView[start:start+blockSize], previousBlock)
+    if end - start > blockSize:
+        xorInto(outputView[start+blockSize:end], outputView[start+blockSize:end], ciphertextView[start:end-blockSize])
+
+def sharedThreadPool():
+    """
+    Returns the thread pool shared by all calls, with
+    threadPoolSize workers. It is created on the first call,
+    never replaced, and shut down when the interpreter exits.
+    """
+    global threadPool
 
-def CBCDecrypt(ciphertext, key, iv):
+    with threadPoolLock:
+        if threadPool is None:
+            threadPool = ThreadPoolExecutor(threadPoolSize)
+            atexit.register(threadPool.shutdown)
+
+        return threadPool
+
+def CBCDecryptInto(ciphertext, key, iv, output, threads=None, executor=None):
     """
     Decrypts a ciphertext in Cipher Block Chaining (CBC)
-    mode using the key key and 
-    initialization vector iv
-    Calls the ECBDecrypt() function for each 
-    16 byte block in the ciphertext
+    mode using the key key and initialization vector iv,
+    writing the padded plaintext into output.
+
+    The whole ciphertext is decrypted in one ECB pass, and
+    XORed with the ciphertext shifted by one block. Ciphertexts
+    longer than parallelChunkSize are split into chunks, which
+    are decrypted on a pool of threads (each thread has its own
+    cipher contexts). The pool is created once and reused by
+    later calls, unless the caller passes its own executor.
+
+    Inputs:
+    ciphertext [bytes-like]: A whole, non-zero number of blocks
+    key [bytes]
+    iv [bytes]: One block
+    output [writable bytes-like]: At least len(ciphertext) bytes
+    threads [int]: Number of chunks decrypted at a time (default: number of CPUs),
+                   at most threadPoolSize on the shared pool
+    executor [concurrent.futures.Executor]: Pool to decrypt the chunks on (default: a shared thread pool)
+
+    Output:
+    length [int]: Length of the plaintext, without padding
     """
-    
-    blocksize = len(key)
+    ciphertextView = memoryview(ciphertext).cast('B')
+    checkBlocks(ciphertextView)
+    checkIV(iv)
+    if len(ciphertextView) == 0:
+        raise ValueError("Ciphertext is empty, it must hold at least the padding block")
 
-    # This will hold all blocks in the plaintext
-    plaintext = bytearray()
+    length = len(ciphertextView)
+    outputView = memoryview(output).cast('B')
+    if len(outputView) < length:
+        raise ValueError("Output buffer must hold at least %i bytes" % length)
 
-    for i in range(0, len(ciphertext), blocksize):
+    if threads is None:
+        threads = os.cpu_count() or 1
 
-        ciphertextBlock = ciphertext[i:i+blocksize]
+    starts = range(0, length, parallelChunkSize)
 
-        # For the first ciphertext block, the previous block is just the iv
-        if i == 0:
-            previousBlock = iv
-        
-        # Decrypt the ciphertext
-        plaintextBlock = ECBDecryptSingleBlock(ciphertextBlock, key)
+    if threads > 1 and len(starts) > 1:
+        numTasks = min(threads, len(starts))
+        if executor is None:
+            executor = sharedThreadPool()
 
-        # XOR the plaintext block and previous ciphertext (or iv in case it's the first one)
-        plaintextBlockXORpreviousBlock = bitwiseXOR(plaintextBlock, previousBlock)
+        # Task i decrypts every numTasks-th chunk, from chunk i,
+        # so at most threads chunks are decrypted at a time
+        def decryptChunks(firstChunk):
+            for start in starts[firstChunk::numTasks]:
+                CBCDecryptBlocks(ciphertextView, outputView, key, iv, start, min(start + parallelChunkSize, length))
 
-        numberOfBlocks = len(ciphertext) // blocksize - 1
+        list(executor.map(decryptChunks, range(numTasks)))
+    else:
+        CBCDecryptBlocks(ciphertextView, outputView, key, iv, 0, length)
 
-        if i == numberOfBlocks*blocksize: # We are starting the final block
-            plaintextBlockXORpreviousBlock = PKCS7unpadder(plaintextBlockXORpreviousBlock, blocksize)
+    return length - PKCS7paddingLength(outputView[length-blockSize:length], blockSize)
 
-        plaintext += plaintextBlockXORpreviousBlock
+def CBCDecrypt(ciphertext, key, iv, threads=None, executor=None):
+    """
+    Decrypts a ciphertext in Cipher Block Chaining (CBC)
+    mode using the key key and initialization vector iv
+    (see CBCDecryptInto()), and removes the padding.
+    Raises ValueError if the padding is not valid.
+    """
+    plaintext = bytearray(len(ciphertext))
+
+    length = CBCDecryptInto(ciphertext, key, iv, plaintext, threads, executor)
 
-        # Update the previous block
-        previousBlock = ciphertextBlock
+    # Removing the padding in place does not copy the plaintext
+    del plaintext[length:]
 
     return bytes(plaintext)
 
@@ -227,13 +424,18 @@ if __name__ == "__main__":
     def testECB(blocksize, numTests):
         """
         Test function for ECB mode.
+        Plaintext length is random, from empty to
+        several blocks. The ciphertext is compared to
+        padding and encrypting one block at a time.
         Raises AssertionError if original plaintext and 
         decrypted plaintext don't match.
         """
         for _ in range(numTests):
-            randomPlaintext = os.urandom(blocksize)
+            randomPlaintext = os.urandom(random.randint(0, 4*blocksize))
             key = os.urandom(16)
             ciphertext = ECBEncrypt(randomPlaintext, key)
+            paddedPlaintext = PKCS7pad(randomPlaintext, blocksize)
+            assert ciphertext == b"".join(ECBEncryptSingleBlock(paddedPlaintext[i:i+blocksize], key) for i in range(0, len(paddedPlaintext), blocksize))
             decryptedText = ECBDecrypt(ciphertext, key)
             assert randomPlaintext == decryptedText
         print("ECB: All", numTests, "tests passed.")
@@ -256,5 +458,34 @@ if __name__ == "__main__":
             assert randomPlaintext == decryptedText
         print("CBC: All", numTests, "tests passed.")
 
+    def testParallelCBC(numTests):
+        """
+        Test function for decrypting CBC in chunks on several
+        threads, with small chunks so every ciphertext is split.
+        Raises AssertionError if the plaintext does not match
+        decrypting in one piece.
+        """
+        global parallelChunkSize
+        defaultChunkSize, parallelChunkSize = parallelChunkSize, 64
+        pool = sharedThreadPool()
+        try:
+            for _ in range(numTests):
+                randomPlaintext = os.urandom(random.randint(0, 1000))
+                key = os.urandom(16)
+                iv = os.urandom(16)
+                ciphertext = CBCEncrypt(randomPlaintext, key, iv)
+                assert CBCDecrypt(ciphertext, key, iv, threads=4) == randomPlaintext
+                assert CBCDecrypt(ciphertext, key, iv, threads=1) == randomPlaintext
+                with ThreadPoolExecutor(2) as executor:
+                    assert CBCDecrypt(ciphertext, key, iv, threads=2, executor=executor) == randomPlaintext
+        finally:
+            parallelChunkSize = defaultChunkSize
+
+        # All calls shared one pool, which is still open
+        assert sharedThreadPool() is pool
+        assert pool.submit(len, b"open").result() == 4
+        print("Parallel CBC: All", numTests, "tests passed.")
+
     testECB(16, 1000)
-    testCBC(16, 1000)
\ No newline at end of file
+    testCBC(16, 1000)
+    testParallelCBC(100)
\ No newline at end of file
@@ -78,6 +78,67 @@ def PKCS7unpadder(paddedPlaintext, blocksize):
 
     return plaintext
 
+def PKCS7pad(data, blocksize):
+    """
+    Pads data of any length to a multiple of blocksize.
+    When the length already is a multiple of blocksize,
+    a whole block of padding is added, so the padding
+    can always be removed unambiguously.
+
+    Input:
+    data [bytes-like]
+    blocksize [int]: 1 to 255
+
+    Output:
+    paddedData [bytes]
+    """
+    if not 1 <= blocksize <= 255:
+        raise ValueError("PKCS#7 blocksize must be between 1 and 255")
+
+    paddingLength = blocksize - len(data) % blocksize
+
+    return bytes(data) + bytes([paddingLength]) * paddingLength
+
+def PKCS7paddingLength(paddedData, blocksize):
+    """
+    Checks the PKCS#7 padding at the end of paddedData,
+    and returns its length. Only the last block is read.
+    Raises ValueError if the padding is not valid.
+
+    Input:
+    paddedData [bytes-like]: A whole, non-zero number of blocks
+    blocksize [int]
+
+    Output:
+    paddingLength [int]
+    """
+    if len(paddedData) == 0 or len(paddedData) % blocksize:
+        raise ValueError("Padded data must be a non-zero multiple of the blocksize")
+
+    paddingLength = paddedData[-1]
+
+    if not 1 <= paddingLength <= blocksize or bytes(paddedData[-paddingLength:]) != bytes([paddingLength]) * paddingLength:
+        raise ValueError("Invalid PKCS#7 padding")
+
+    return paddingLength
+
+def PKCS7unpad(paddedData, blocksize):
+    """
+    Removes the PKCS#7 padding from data of any
+    number of blocks. Raises ValueError if the
+    padding is not valid.
+
+    Input:
+    paddedData [bytes-like]
+    blocksize [int]
+
+    Output:
+    data [bytes]
+    """
+    paddingLength = PKCS7paddingLength(paddedData, blocksize)
+
+    return bytes(paddedData[:len(paddedData) - paddingLength])
+
 if __name__ == "__main__":
 
     def testPadding(plaintext, blocksize):
@@ -110,4 +171,21 @@ if __name__ == "__main__":
     # Test 4: Plaintext length equal to blocksize
     plaintext = b'YELLOW SUBMARINE'
     blocksize = 16
-    testPadding(plaintext, blocksize)
\ No newline at end of file
+    testPadding(plaintext, blocksize)
+
+    # Test 5: Padding and unpadding data of any length
+    for length in range(50):
+        plaintext = bytes(range(length))
+        paddedPlaintext = PKCS7pad(plaintext, 16)
+        assert len(paddedPlaintext) % 16 == 0 and len(paddedPlaintext) > len(plaintext)
+        assert PKCS7unpad(paddedPlaintext, 16) == plaintext
+
+    # Test 6: Invalid padding is rejected
+    for paddedPlaintext in [b'', b'YELLOW SUBMARINE', b'ICE ICE BABY\x01\x02\x03\x04', b'ICE ICE BABY\x05\x05\x05\x05', b'ICE ICE BABY\x04\x04\x04']:
+        try:
+            PKCS7unpad(paddedPlaintext, 16)
+        except ValueError:
+            continue
+        raise AssertionError("Invalid padding accepted: %r" % paddedPlaintext)
+
+    print("All padding tests passed.")
\ No newline at end of file
@@ -0,0 +1,20 @@
+"""
+Makes the Set1 package importable from the modules of set 2.
+
+The modules of set 2 are also run as scripts from their own
+directory, where the repository root, and so the Set1 package,
+is not on sys.path. Importing this module adds the root once,
+so that set 2 can use package imports of set 1.
+
+Usage:
+import Set1Package
+from Set1 import xorBytes
+"""
+
+# Standard library imports
+import os
+import sys
+
+rootDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if rootDirectory not in sys.path:
+    sys.path.append(rootDirectory)
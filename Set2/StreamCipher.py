@@ -0,0 +1,307 @@
+"""
+Incremental ECB and CBC encryption and decryption, for data
+which does not fit in memory or arrives in pieces.
+
+The objects follow the update()/finalize() pattern: update()
+accepts chunks of any size and returns the output for all whole
+blocks seen so far, carrying the bytes of an incomplete block
+(and, in CBC mode, the last ciphertext block) over to the next
+call. The PKCS#7 padding is only added, or checked and removed,
+by finalize(). The decryptors hold back the last whole block
+until finalize(), since it may hold the padding.
+
+The blocks are processed with the functions in Challenge10, so
+the output is the same as encrypting or decrypting all at once.
+
+The command-line interface encrypts or decrypts a file (or stdin)
+one chunk at a time, decoding Base64 input on the fly if asked,
+so files of any size use constant memory.
+
+Usage:
+python StreamCipher.py decrypt --mode cbc --key "YELLOW SUBMARINE" --base64 10.txt -o 10.plain
+python StreamCipher.py encrypt --mode ecb --key-hex 000102030405060708090a0b0c0d0e0f big.bin -o big.ecb
+"""
+
+# Standard library imports
+import sys
+
+# Custom imports
+import Set1Package
+from Challenge9 import PKCS7pad, PKCS7unpad
+from Challenge10 import CBCDecryptBlocks, CBCEncryptBlocks, blockSize, checkIV, ecbDecryptor, ecbEncryptor
+
+# Default number of bytes read at a time by the command-line interface
+defaultChunkSize = 2**20
+
+class BlockCipherStream:
+    """
+    Base class of the incremental encryptors and decryptors.
+    Subclasses implement processBlocks(), and set holdLastBlock
+    to keep the last whole block until finalize().
+    """
+
+    holdLastBlock = False
+
+    def __init__(self):
+        self.carry = b'' # Bytes not processed yet, less than one block (up to one block if holdLastBlock)
+        self.finalized = False
+
+    def processBlocks(self, blocksView, outputView):
+        """
+        Encrypts or decrypts a whole number of blocks into
+        outputView, which has at least 16 bytes more room.
+        """
+        raise NotImplementedError
+
+    def update(self, data):
+        """
+        Processes data, returns the output for all whole blocks
+        seen so far. The rest is kept until the next call to
+        update() or finalize().
+
+        Input:
+        data [bytes-like]
+
+        Output:
+        output [bytes]
+        """
+        if self.finalized:
+            raise ValueError("Cannot update after finalize()")
+
+        view = memoryview(data).cast('B')
+
+        available = len(self.carry) + len(view)
+        keep = available % blockSize
+        if self.holdLastBlock and keep == 0:
+            keep = min(blockSize, available)
+        length = available - keep
+
+        if length == 0:
+            self.carry += view.tobytes()
+            return b''
+
+        output = bytearray(length + blockSize)
+        outputView = memoryview(output)
+        start = 0
+
+        # Complete the carried block with the start of data
+        if self.carry:
+            fill = blockSize - len(self.carry)
+            self.processBlocks(self.carry + view[:fill].tobytes(), outputView)
+            view = view[fill:]
+            start = blockSize
+
+        if length > start:
+            self.processBlocks(view[:length-start], outputView[start:])
+
+        self.carry = view[length-start:].tobytes()
+
+        return outputView[:length].tobytes()
+
+    def finalize(self):
+        """
+        Processes the carried bytes with the padding, and
+        returns the last of the output. The object cannot
+        be updated afterwards.
+
+        Output:
+        output [bytes]
+        """
+        if self.finalized:
+            raise ValueError("finalize() was already called")
+        self.finalized = True
+
+        return self.finalizeCarry(self.carry)
+
+    def finalizeCarry(self, carry):
+        raise NotImplementedError
+
+class BlockEncryptor(BlockCipherStream):
+    """
+    Base class of the encryptors: finalize() pads
+    the carried bytes to a last block.
+    """
+
+    def finalizeCarry(self, carry):
+        output = bytearray(2 * blockSize)
+        self.processBlocks(PKCS7pad(carry, blockSize), memoryview(output))
+
+        return bytes(output[:blockSize])
+
+class BlockDecryptor(BlockCipherStream):
+    """
+    Base class of the decryptors: finalize() decrypts the
+    held back last block, and checks and removes the padding.
+    Raises ValueError if the ciphertext is not a whole, non-zero
+    number of blocks or the padding is not valid.
+    """
+
+    holdLastBlock = True
+
+    def finalizeCarry(self, carry):
+        if len(carry) != blockSize:
+            raise ValueError("Ciphertext must be a whole, non-zero number of blocks")
+
+        output = bytearray(2 * blockSize)
+        self.processBlocks(carry, memoryview(output))
+
+        return PKCS7unpad(output[:blockSize], blockSize)
+
+class ECBEncryptor(BlockEncryptor):
+    """
+    Incremental AES-ECB encryption with PKCS#7 padding.
+
+    Usage:
+    encryptor = ECBEncryptor(key)
+    ciphertext = encryptor.update(chunk1) + encryptor.update(chunk2) + encryptor.finalize()
+    """
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+
+    def processBlocks(self, blocksView, outputView):
+        ecbEncryptor(self.key).update_into(blocksView, outputView)
+
+class ECBDecryptor(BlockDecryptor):
+    """
+    Incremental AES-ECB decryption, removing the PKCS#7 padding.
+    """
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+
+    def processBlocks(self, blocksView, outputView):
+        ecbDecryptor(self.key).update_into(blocksView, outputView)
+
+class CBCEncryptor(BlockEncryptor):
+    """
+    Incremental AES-CBC encryption with PKCS#7 padding.
+    The last ciphertext block is kept to chain the next call.
+    """
+
+    def __init__(self, key, iv):
+        super().__init__()
+        checkIV(iv)
+        self.key = key
+        self.previousBlock = bytes(iv)
+
+    def processBlocks(self, blocksView, outputView):
+        self.previousBlock = CBCEncryptBlocks(blocksView, outputView, self.key, self.previousBlock)
+
+class CBCDecryptor(BlockDecryptor):
+    """
+    Incremental AES-CBC decryption, removing the PKCS#7 padding.
+    The last ciphertext block is kept to chain the next call.
+    """
+
+    def __init__(self, key, iv):
+        super().__init__()
+        checkIV(iv)
+        self.key = key
+        self.previousBlock = bytes(iv)
+
+    def processBlocks(self, blocksView, outputView):
+        blocksView = memoryview(blocksView)
+        CBCDecryptBlocks(blocksView, outputView, self.key, self.previousBlock, 0, len(blocksView))
+        self.previousBlock = blocksView[-blockSize:].tobytes()
+
+def makeCipher(direction, mode, key, iv=None):
+    """
+    Returns the incremental encryptor or decryptor.
+
+    Inputs:
+    direction [str]: "encrypt" or "decrypt"
+    mode [str]: "ecb" or "cbc"
+    key [bytes]
+    iv [bytes]: Needed for CBC mode
+
+    Output:
+    cipher [BlockCipherStream]
+    """
+    if mode == "ecb":
+        return ECBEncryptor(key) if direction == "encrypt" else ECBDecryptor(key)
+    if mode == "cbc":
+        if iv is None:
+            raise ValueError("CBC mode needs an iv")
+        return CBCEncryptor(key, iv) if direction == "encrypt" else CBCDecryptor(key, iv)
+
+    raise ValueError("Unknown mode: %s" % mode)
+
+def cryptFile(inputFile, outputFile, cipher, chunkSize=defaultChunkSize, base64Input=False):
+    """
+    Encrypts or decrypts the binary file object inputFile,
+    writing to the binary file object outputFile. Only one
+    chunk is held in memory at a time.
+
+    Inputs:
+    inputFile [binary file object]
+    outputFile [binary file object]
+    cipher [BlockCipherStream]
+    chunkSize [int]: Number of bytes read at a time
+    base64Input [bool]: The input is Base64 text, decoded on the fly
+
+    Output:
+    numBytesRead [int]
+    """
+    if base64Input:
+        # Set 1 holds the streaming Base64 decoder
+        from Set1 import Base64Decoder
+        decoder = Base64Decoder()
+
+    numBytesRead = 0
+    for chunk in iter(lambda: inputFile.read(chunkSize), b''):
+        numBytesRead += len(chunk)
+        if base64Input:
+            chunk = decoder.update(chunk)
+        outputFile.write(cipher.update(chunk))
+
+    if base64Input:
+        decoder.finalize()
+    outputFile.write(cipher.finalize())
+
+    return numBytesRead
+
+def main(arguments=None):
+    """
+    Command-line entry point.
+    """
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Encrypt or decrypt a file with AES in ECB or CBC mode, in constant memory.")
+    parser.add_argument("direction", choices=["encrypt", "decrypt"])
+    parser.add_argument("input", help="Input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    parser.add_argument("--mode", choices=["ecb", "cbc"], default="cbc", help="Block cipher mode (default: cbc)")
+    keyGroup = parser.add_mutually_exclusive_group(required=True)
+    keyGroup.add_argument("--key", help="Key as text")
+    keyGroup.add_argument("--key-hex", help="Key as hexadecimal")
+    parser.add_argument("--iv-hex", default=None, help="iv as hexadecimal (default: all zeros)")
+    parser.add_argument("--base64", action="store_true", help="The input is Base64 text")
+    parser.add_argument("--chunk-size", type=int, default=defaultChunkSize, help="Bytes read at a time (default: %i)" % defaultChunkSize)
+    arguments = parser.parse_args(arguments)
+
+    key = arguments.key.encode() if arguments.key is not None else bytes.fromhex(arguments.key_hex)
+    iv = bytes.fromhex(arguments.iv_hex) if arguments.iv_hex is not None else bytes(blockSize)
+
+    cipher = makeCipher(arguments.direction, arguments.mode, key, iv)
+
+    inputFile = sys.stdin.buffer if arguments.input == "-" else open(arguments.input, "rb")
+    outputFile = sys.stdout.buffer if arguments.output == "-" else open(arguments.output, "wb")
+
+    try:
+        startTime = time.perf_counter()
+        numBytesRead = cryptFile(inputFile, outputFile, cipher, arguments.chunk_size, arguments.base64)
+        elapsedTime = time.perf_counter() - startTime
+    finally:
+        if inputFile is not sys.stdin.buffer:
+            inputFile.close()
+        if outputFile is not sys.stdout.buffer:
+            outputFile.close()
+
+    print("%i bytes in %.3f s (%.1f MB/s)" % (numBytesRead, elapsedTime, numBytesRead / max(elapsedTime, 1e-9) / 1e6), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
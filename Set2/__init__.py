@@ -0,0 +1,59 @@
+"""
+Solutions to the Cryptopals challenges in set 2, as a package.
+
+The modules import each other by their plain names (e.g.
+"from Challenge9 import PKCS7padder"), so this directory is
+added to sys.path. The functions below are re-exported lazily:
+importing the package imports none of the modules, and each
+module is imported on first access of one of its names.
+
+Usage:
+import Set2
+Set2.CBCDecrypt(ciphertext, key, iv)
+"""
+
+# Standard library imports
+import importlib
+import os
+import sys
+
+directory = os.path.dirname(os.path.abspath(__file__))
+if directory not in sys.path:
+    sys.path.append(directory)
+
+# Exported name: module it is defined in
+exports = {
+    "PKCS7padder": "Challenge9",
+    "PKCS7unpadder": "Challenge9",
+    "PKCS7pad": "Challenge9",
+    "PKCS7unpad": "Challenge9",
+    "ECBEncrypt": "Challenge10",
+    "ECBDecrypt": "Challenge10",
+    "ECBEncryptInto": "Challenge10",
+    "ECBDecryptInto": "Challenge10",
+    "CBCEncrypt": "Challenge10",
+    "CBCDecrypt": "Challenge10",
+    "CBCEncryptInto": "Challenge10",
+    "CBCDecryptInto": "Challenge10",
+    "ECBEncryptor": "StreamCipher",
+    "ECBDecryptor": "StreamCipher",
+    "CBCEncryptor": "StreamCipher",
+    "CBCDecryptor": "StreamCipher",
+}
+
+__all__ = sorted(exports)
+
+def __getattr__(name):
+    """
+    Imports the module defining name on first access.
+    """
+    if name not in exports:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    value = getattr(importlib.import_module(exports[name]), name)
+    globals()[name] = value # Later accesses skip __getattr__
+
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(exports))